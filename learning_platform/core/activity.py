@@ -0,0 +1,178 @@
+"""
+Append-only learner activity log and its daily rollups.
+
+Views record events with single inserts (``record_*``). ``manage.py
+rollup_activity`` (``rollup_events``) folds the events after the stored
+watermark into DailyStudentActivity, then recomputes the affected
+DailyCourseActivity rows from the student rollups. Reports read only the
+rollup tables.
+"""
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import ActivityEvent, Course, DailyCourseActivity, DailyStudentActivity, RollupWatermark
+
+WATERMARK_NAME = 'activity'
+
+DEFAULT_BATCH_SIZE = 10000
+
+# Events younger than this are left for the next run, so rows from
+# transactions that commit out of id order are not skipped
+DEFAULT_SETTLE_SECONDS = 60
+
+ROLLUP_FIELDS = ['lessons_completed', 'minutes_spent', 'quiz_submissions', 'quiz_passes']
+
+
+def record_lesson_completed(student_id, course_id, lesson_id, occurred_at=None):
+    ActivityEvent.objects.create(
+        event_type=ActivityEvent.LESSON_COMPLETED, student_id=student_id, course_id=course_id,
+        lesson_id=lesson_id, occurred_at=occurred_at or timezone.now(),
+    )
+
+
+def record_quiz_submitted(student_id, course_id, lesson_id, score, passed):
+    ActivityEvent.objects.create(
+        event_type=ActivityEvent.QUIZ_PASSED if passed else ActivityEvent.QUIZ_FAILED,
+        student_id=student_id, course_id=course_id, lesson_id=lesson_id, value=score,
+    )
+
+
+def time_spent_event(student_id, course_id, lesson_id, minutes, occurred_at=None):
+    """Unsaved time event, for callers that insert events in bulk"""
+    return ActivityEvent(
+        event_type=ActivityEvent.TIME_SPENT, student_id=student_id, course_id=course_id,
+        lesson_id=lesson_id, value=minutes, occurred_at=occurred_at or timezone.now(),
+    )
+
+
+def record_events(events):
+    ActivityEvent.objects.bulk_create(events)
+
+
+def _fold_student_rows(totals):
+    """Add aggregated event totals into DailyStudentActivity; returns the touched (day, course) pairs"""
+    keys = {(row['day'], row['student_id'], row['course_id']): row for row in totals}
+    existing = {
+        (row.day, row.student_id, row.course_id): row
+        for row in DailyStudentActivity.objects.filter(
+            day__in={day for day, student, course in keys},
+            student__in={student for day, student, course in keys},
+            course__in={course for day, student, course in keys},
+        )
+    }
+    created, updated = [], []
+    for key, row in keys.items():
+        rollup = existing.get(key)
+        if rollup is None:
+            rollup = DailyStudentActivity(day=key[0], student_id=key[1], course_id=key[2])
+            created.append(rollup)
+        else:
+            updated.append(rollup)
+        for field in ROLLUP_FIELDS:
+            setattr(rollup, field, getattr(rollup, field) + (row[field] or 0))
+    DailyStudentActivity.objects.bulk_create(created)
+    DailyStudentActivity.objects.bulk_update(updated, ROLLUP_FIELDS)
+    return {(day, course) for day, student, course in keys}
+
+
+def _refresh_course_rows(day_courses):
+    """Recompute DailyCourseActivity for (day, course) pairs from the student rollups"""
+    if not day_courses:
+        return
+    totals = (
+        DailyStudentActivity.objects.filter(
+            day__in={day for day, course in day_courses},
+            course__in={course for day, course in day_courses},
+        )
+        .values('day', 'course_id')
+        .annotate(
+            active_students=Count('student'),
+            **{field: Sum(field) for field in ROLLUP_FIELDS},
+        )
+    )
+    DailyCourseActivity.objects.bulk_create(
+        [
+            DailyCourseActivity(
+                day=row['day'], course_id=row['course_id'], active_students=row['active_students'],
+                **{field: row[field] for field in ROLLUP_FIELDS},
+            )
+            for row in totals if (row['day'], row['course_id']) in day_courses
+        ],
+        update_conflicts=True,
+        unique_fields=['day', 'course'],
+        update_fields=['active_students'] + ROLLUP_FIELDS,
+    )
+
+
+def rollup_events(batch_size=DEFAULT_BATCH_SIZE, settle_seconds=DEFAULT_SETTLE_SECONDS):
+    """
+    Fold one batch of events after the watermark into the rollups;
+    returns (events folded, new watermark, whether the watermark moved).
+    Events of deleted students or courses are skipped, so a batch can move
+    the watermark without folding anything; callers loop until it stops
+    moving. Concurrent runs are serialized by a lock on the watermark row.
+    """
+    settled = timezone.now() - timedelta(seconds=settle_seconds)
+    with transaction.atomic():
+        RollupWatermark.objects.get_or_create(name=WATERMARK_NAME)
+        watermark = RollupWatermark.objects.select_for_update().get(name=WATERMARK_NAME)
+
+        ids = list(
+            ActivityEvent.objects.filter(pk__gt=watermark.last_event_id, recorded_at__lte=settled)
+            .order_by('pk')
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            return 0, watermark.last_event_id, False
+        # Stop at the first unsettled event so nothing behind it is skipped
+        high = ids[-1]
+        newer = ActivityEvent.objects.filter(
+            pk__gt=watermark.last_event_id, pk__lt=high, recorded_at__gt=settled
+        ).order_by('pk').values_list('pk', flat=True).first()
+        if newer is not None:
+            high = newer - 1
+        if high <= watermark.last_event_id:
+            return 0, watermark.last_event_id, False
+
+        # The event log keeps no foreign key constraints; events of students or
+        # courses deleted since are dropped, but the watermark still moves past them
+        events = ActivityEvent.objects.filter(
+            pk__gt=watermark.last_event_id, pk__lte=high,
+            student_id__in=User.objects.values('pk'), course_id__in=Course.objects.values('pk'),
+        )
+        totals = (
+            events.annotate(day=TruncDate('occurred_at'))
+            .values('day', 'student_id', 'course_id')
+            .annotate(
+                lessons_completed=Count('pk', filter=Q(event_type=ActivityEvent.LESSON_COMPLETED)),
+                minutes_spent=Sum('value', filter=Q(event_type=ActivityEvent.TIME_SPENT)),
+                quiz_submissions=Count('pk', filter=Q(
+                    event_type__in=[ActivityEvent.QUIZ_PASSED, ActivityEvent.QUIZ_FAILED]
+                )),
+                quiz_passes=Count('pk', filter=Q(event_type=ActivityEvent.QUIZ_PASSED)),
+                events=Count('pk'),
+            )
+            .order_by()
+        )
+        totals = list(totals)
+        _refresh_course_rows(_fold_student_rows(totals))
+
+        folded = sum(row['events'] for row in totals)
+        watermark.last_event_id = high
+        watermark.save(update_fields=['last_event_id', 'updated_at'])
+        return folded, high, True
+
+
+def course_activity(course, start=None, end=None):
+    """Daily course totals between two dates, read from the rollups only"""
+    rows = DailyCourseActivity.objects.filter(course=course)
+    if start:
+        rows = rows.filter(day__gte=start)
+    if end:
+        rows = rows.filter(day__lte=end)
+    return rows.order_by('day').values('day', 'active_students', *ROLLUP_FIELDS)
@@ -1,8 +1,9 @@
 from django.contrib import admin
 from .models import (
-    UserProfile, Category, Course, Module, Lesson, 
+    UserProfile, Category, Tag, Course, Module, Lesson, 
     Enrollment, LessonProgress, Quiz, QuizQuestion, 
-    QuizOption, QuizAttempt
+    QuizOption, QuizAttempt, ActivityEvent, DailyCourseActivity, Job,
+    CourseAnalytics, QuizItemAnalysis
 )
 
 
@@ -20,6 +21,13 @@ class CategoryAdmin(admin.ModelAdmin):
     prepopulated_fields = {'slug': ('name',)}
 
 
+@admin.register(Tag)
+class TagAdmin(admin.ModelAdmin):
+    list_display = ['name', 'slug', 'created_at']
+    search_fields = ['name', 'slug']
+    readonly_fields = ['slug']
+
+
 class ModuleInline(admin.TabularInline):
     model = Module
     extra = 1
@@ -132,3 +140,46 @@ class QuizAttemptAdmin(admin.ModelAdmin):
     list_filter = ['passed', 'started_at', 'quiz']
     search_fields = ['student__username', 'quiz__title']
     readonly_fields = ['started_at']
+
+
+@admin.register(ActivityEvent)
+class ActivityEventAdmin(admin.ModelAdmin):
+    """Read-only view of the append-only activity log"""
+    list_display = ['occurred_at', 'event_type', 'student_id', 'course_id', 'lesson_id', 'value']
+    list_filter = ['event_type']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(DailyCourseActivity)
+class DailyCourseActivityAdmin(admin.ModelAdmin):
+    list_display = ['day', 'course', 'active_students', 'lessons_completed', 'minutes_spent',
+                    'quiz_submissions', 'quiz_passes']
+    list_filter = ['day', 'course']
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'task', 'status', 'attempts', 'run_after', 'created_at', 'finished_at']
+    list_filter = ['status', 'task']
+    readonly_fields = ['locked_by', 'locked_at', 'result', 'last_error', 'created_at', 'started_at',
+                       'finished_at']
+
+
+@admin.register(CourseAnalytics)
+class CourseAnalyticsAdmin(admin.ModelAdmin):
+    list_display = ['course', 'enrollments', 'completion_rate', 'average_quiz_score', 'pass_rate',
+                    'median_days_to_complete', 'refreshed_at']
+
+
+@admin.register(QuizItemAnalysis)
+class QuizItemAnalysisAdmin(admin.ModelAdmin):
+    list_display = ['quiz', 'attempts', 'analyzed_at']
+    readonly_fields = ['results', 'analyzed_at']
@@ -0,0 +1,210 @@
+"""
+Precomputed instructor analytics per course and per module.
+
+CourseAnalytics and ModuleAnalytics hold completion rate, average quiz
+score, pass rate and median time to complete, so
+``GET /api/courses/{slug}/analytics/`` reads a handful of rows however
+many students are enrolled. ``refresh_analytics`` (``manage.py
+refresh_course_analytics``, or the ``analytics.refresh`` job) finds the
+courses with learner activity events (core.activity) or enrollments
+recorded after its watermarks and recomputes only those courses.
+"""
+from datetime import timedelta
+from statistics import median
+
+from django.db import transaction
+from django.db.models import Avg, Count, Max, Q, Sum
+from django.utils import timezone
+
+from .activity import DEFAULT_SETTLE_SECONDS
+from .models import (
+    ActivityEvent, Course, CourseAnalytics, Enrollment, LessonProgress, Module,
+    ModuleAnalytics, QuizAttempt, RollupWatermark
+)
+
+# (watermark name, table whose new rows mark their course as changed, its insert time field)
+SOURCES = [
+    ('analytics-events', ActivityEvent, 'recorded_at'),
+    ('analytics-enrollments', Enrollment, 'enrolled_at'),
+]
+
+QUIZ_FIELDS = ['quiz_attempts', 'quiz_passes', 'average_quiz_score', 'pass_rate']
+
+
+def _percent(part, whole):
+    return round(part * 100 / whole, 2) if whole else None
+
+
+def _median(values):
+    return round(median(values), 2) if values else None
+
+
+def _quiz_stats(row):
+    """Quiz fields from an aggregate row of ``attempts`` / ``passes`` / ``average``"""
+    attempts = row['attempts'] or 0
+    average = row['average']
+    return {
+        'quiz_attempts': attempts,
+        'quiz_passes': row['passes'] or 0,
+        'average_quiz_score': round(average, 2) if average is not None else None,
+        'pass_rate': _percent(row['passes'] or 0, attempts),
+    }
+
+
+def _quiz_aggregates():
+    return {
+        'attempts': Count('pk'),
+        'passes': Count('pk', filter=Q(passed=True)),
+        'average': Avg('score'),
+    }
+
+
+def compute_course_analytics(course):
+    """(CourseAnalytics, [ModuleAnalytics]) of ``course``, unsaved"""
+    enrollments = Enrollment.objects.filter(course=course)
+    completed = list(
+        enrollments.filter(is_completed=True).values_list('student_id', 'enrolled_at', 'completed_at')
+    )
+    enrolled = enrollments.count()
+    completers = {student for student, _, _ in completed}
+
+    # Lesson time and completed lessons per (module, student)
+    progress = (
+        LessonProgress.objects.filter(lesson__module__course=course).order_by()
+        .values('lesson__module', 'student')
+        .annotate(done=Count('pk', filter=Q(is_completed=True)), minutes=Sum('time_spent_minutes'))
+    )
+    course_minutes = {}
+    module_students = {}
+    for row in progress:
+        module_students.setdefault(row['lesson__module'], []).append(row)
+        if row['student'] in completers:
+            course_minutes[row['student']] = course_minutes.get(row['student'], 0) + (row['minutes'] or 0)
+
+    attempts = QuizAttempt.objects.filter(quiz__lesson__module__course=course, completed_at__isnull=False)
+    course_quiz = attempts.aggregate(**_quiz_aggregates())
+    module_quiz = {
+        row['quiz__lesson__module']: row
+        for row in attempts.order_by().values('quiz__lesson__module').annotate(**_quiz_aggregates())
+    }
+
+    days = [
+        (completed_at - enrolled_at).total_seconds() / 86400
+        for _, enrolled_at, completed_at in completed if completed_at
+    ]
+    course_row = CourseAnalytics(
+        course=course,
+        enrollments=enrolled,
+        completions=len(completed),
+        completion_rate=_percent(len(completed), enrolled),
+        median_days_to_complete=_median(days),
+        median_minutes_to_complete=_median(list(course_minutes.values())),
+        **_quiz_stats(course_quiz),
+    )
+
+    module_rows = []
+    for module_id, lesson_count in Module.objects.filter(course=course).values_list('pk', 'lesson_count'):
+        students = module_students.get(module_id, [])
+        finished = [row for row in students if lesson_count and row['done'] >= lesson_count]
+        quiz = module_quiz.get(module_id, {'attempts': 0, 'passes': 0, 'average': None})
+        module_rows.append(ModuleAnalytics(
+            module_id=module_id,
+            course=course,
+            students_started=len(students),
+            students_completed=len(finished),
+            completion_rate=_percent(len(finished), enrolled),
+            median_minutes_to_complete=_median([row['minutes'] or 0 for row in finished]),
+            **_quiz_stats(quiz),
+        ))
+    return course_row, module_rows
+
+
+def refresh_courses(course_ids):
+    """Recompute and store the analytics of the given courses; returns how many were refreshed"""
+    course_fields = [
+        'enrollments', 'completions', 'completion_rate', 'median_days_to_complete',
+        'median_minutes_to_complete', 'refreshed_at', *QUIZ_FIELDS,
+    ]
+    module_fields = [
+        'course', 'students_started', 'students_completed', 'completion_rate',
+        'median_minutes_to_complete', 'refreshed_at', *QUIZ_FIELDS,
+    ]
+    refreshed = 0
+    for course in Course.objects.filter(pk__in=course_ids):
+        course_row, module_rows = compute_course_analytics(course)
+        now = timezone.now()
+        course_row.refreshed_at = now
+        for row in module_rows:
+            row.refreshed_at = now
+        with transaction.atomic():
+            CourseAnalytics.objects.bulk_create(
+                [course_row], update_conflicts=True, unique_fields=['course'], update_fields=course_fields
+            )
+            ModuleAnalytics.objects.bulk_create(
+                module_rows, update_conflicts=True, unique_fields=['module'], update_fields=module_fields
+            )
+        refreshed += 1
+    return refreshed
+
+
+def _changed_courses(watermark, model, time_field, settled):
+    """Course ids of rows after ``watermark``, and the id to move it to (None if nothing settled)"""
+    newer = model.objects.filter(pk__gt=watermark.last_event_id)
+    # Rows may commit out of id order; stop below the first one still settling
+    unsettled = (
+        newer.filter(**{f'{time_field}__gt': settled}).order_by('pk').values_list('pk', flat=True).first()
+    )
+    if unsettled is not None:
+        newer = newer.filter(pk__lt=unsettled)
+    high = newer.aggregate(high=Max('pk'))['high']
+    if high is None:
+        return set(), None
+    courses = newer.filter(pk__lte=high).order_by().values_list('course_id', flat=True).distinct()
+    return set(courses), high
+
+
+def refresh_analytics(settle_seconds=DEFAULT_SETTLE_SECONDS):
+    """
+    Refresh the courses with events or enrollments recorded since the last
+    run and move the watermarks past them; returns the number of courses
+    refreshed. Concurrent runs are serialized by locks on the watermarks.
+    """
+    settled = timezone.now() - timedelta(seconds=settle_seconds)
+    with transaction.atomic():
+        watermarks = []
+        courses = set()
+        for name, model, time_field in SOURCES:
+            RollupWatermark.objects.get_or_create(name=name)
+            watermark = RollupWatermark.objects.select_for_update().get(name=name)
+            changed, high = _changed_courses(watermark, model, time_field, settled)
+            courses |= changed
+            if high is not None:
+                watermark.last_event_id = high
+                watermarks.append(watermark)
+
+        refreshed = refresh_courses(courses)
+        for watermark in watermarks:
+            watermark.save(update_fields=['last_event_id', 'updated_at'])
+    return refreshed
+
+
+def get_course_analytics(course):
+    """The stored analytics of ``course`` and its modules, in module order"""
+    fields = ['enrollments', 'completions', 'completion_rate', 'median_days_to_complete',
+              'median_minutes_to_complete', 'refreshed_at', *QUIZ_FIELDS]
+    row = CourseAnalytics.objects.filter(course=course).values(*fields).first()
+    if row is None:
+        row = {field: None for field in fields}
+        row.update(enrollments=0, completions=0, quiz_attempts=0, quiz_passes=0)
+    modules = (
+        Module.objects.filter(course=course).order_by('order', 'pk')
+        .values('id', 'title', 'order', 'lesson_count', *(f'analytics__{field}' for field in [
+            'students_started', 'students_completed', 'completion_rate',
+            'median_minutes_to_complete', 'refreshed_at', *QUIZ_FIELDS,
+        ]))
+    )
+    row['modules'] = [
+        {name.replace('analytics__', ''): value for name, value in module.items()}
+        for module in modules
+    ]
+    return row
@@ -0,0 +1,300 @@
+"""
+Native async read path for the hottest read endpoints.
+
+With ``ASYNC_READ_ENDPOINTS = True`` (see core.urls) GET/HEAD JSON requests
+to
+
+* ``/api/courses/``                 (CourseViewSet.list)
+* ``/api/courses/{slug}/``          (CourseViewSet.retrieve)
+* ``/api/courses/{slug}/modules/``  (CourseViewSet.modules)
+* ``/api/enrollments/``             (EnrollmentViewSet.list)
+
+are served by coroutines that use the async ORM. They reuse the
+viewsets' querysets, permissions, serializers, pagination, conditional
+GET validators and anonymous response cache, so the responses are the
+same as on the sync path, including the fast serializers of
+core.fast_serializers. Writes, the browsable API, ``?format=``
+suffixes and cursor pagination still go through the sync DRF views.
+
+At most ``ASYNC_READ_CONCURRENCY`` requests per event loop run at once,
+which also bounds the database connections in use. Requests that wait
+longer than ``ASYNC_READ_QUEUE_TIMEOUT`` seconds for a slot get a 503.
+"""
+import asyncio
+import weakref
+from contextlib import asynccontextmanager
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.paginator import InvalidPage
+from django.http import Http404, JsonResponse
+from django.utils.cache import get_conditional_response
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.authentication import SessionAuthentication, TokenAuthentication
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from .conditional import compute_validators, set_validators
+from .fast_serializers import FastModuleSerializer, use_fast_serializers
+from .fieldsets import get_request_shape
+from .models import LessonProgress
+from .response_cache import is_cacheable, lookup, store_response
+from .search import get_search_backend
+from .serializers import CourseDetailSerializer, ModuleSerializer
+from .views import CourseViewSet, EnrollmentViewSet
+
+_semaphores = weakref.WeakKeyDictionary()
+
+# Returned by a handler to hand the request to the sync view
+FALLBACK = object()
+
+
+def get_renderer():
+    """The first JSON renderer of DEFAULT_RENDERER_CLASSES"""
+    for renderer_class in api_settings.DEFAULT_RENDERER_CLASSES:
+        if renderer_class.media_type == 'application/json':
+            return renderer_class()
+    return None
+
+
+def wants_json(request):
+    """Whether the request would be answered with JSON by the sync view"""
+    format_param = request.GET.get(api_settings.URL_FORMAT_OVERRIDE or 'format')
+    if format_param and format_param != 'json':
+        return False
+    return 'text/html' not in request.headers.get('Accept', '')
+
+
+@asynccontextmanager
+async def concurrency_slot():
+    """Wait for one of the ASYNC_READ_CONCURRENCY slots of the running event loop"""
+    loop = asyncio.get_running_loop()
+    semaphore = _semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _semaphores[loop] = asyncio.Semaphore(
+            getattr(settings, 'ASYNC_READ_CONCURRENCY', 8)
+        )
+    # Unlike wait_for, a timeout racing a completed acquire cannot leak the slot
+    async with asyncio.timeout(getattr(settings, 'ASYNC_READ_QUEUE_TIMEOUT', 10)):
+        await semaphore.acquire()
+    try:
+        yield
+    finally:
+        semaphore.release()
+
+
+async def authenticate(request, drf_request):
+    """
+    (authenticator, user, auth) like the request's SessionAuthentication then
+    TokenAuthentication; raises AuthenticationFailed
+    """
+    user = await request.auser()
+    if user.is_authenticated:
+        session = next((a for a in drf_request.authenticators if isinstance(a, SessionAuthentication)), None)
+        return session, user, None
+    # The configured token class: cached only when the cache is shared (settings.AUTH_CACHE_ENABLED)
+    token = next((a for a in drf_request.authenticators if isinstance(a, TokenAuthentication)), None)
+    if token is not None:
+        result = await sync_to_async(token.authenticate, thread_sensitive=False)(drf_request)
+        if result is not None:
+            return (token, *result)
+    return None, user, None
+
+
+async def aconditional(view, query_method):
+    """(etag, last_modified, 304 response or None) from a viewset's *_freshness_query method"""
+    queryset, aggregates = getattr(view, query_method)()
+    freshness = [await queryset.aaggregate(**aggregates)]
+    etag, last_modified = compute_validators(view.request, freshness)
+    not_modified = get_conditional_response(view.request, etag=etag, last_modified=last_modified)
+    return etag, last_modified, not_modified
+
+
+async def aget_object(view):
+    queryset = view.filter_queryset(view.get_queryset())
+    lookup_url_kwarg = view.lookup_url_kwarg or view.lookup_field
+    try:
+        obj = await queryset.aget(**{view.lookup_field: view.kwargs[lookup_url_kwarg]})
+    except queryset.model.DoesNotExist:
+        # The message of the sync view's get_object_or_404
+        raise Http404(f'No {queryset.model._meta.object_name} matches the given query.')
+    view.check_object_permissions(view.request, obj)
+    return obj
+
+
+async def apaginate(view, queryset):
+    """(objects, paginator) for page-number pagination; paginator is None if the view has none"""
+    paginator = view.paginator
+    page_size = paginator.get_page_size(view.request) if paginator is not None else None
+    if not page_size:
+        return [obj async for obj in queryset], None
+
+    django_paginator = paginator.django_paginator_class(queryset, page_size)
+    django_paginator.count = await queryset.acount()
+    page_number = paginator.get_page_number(view.request, django_paginator)
+    try:
+        page = django_paginator.page(page_number)
+    except InvalidPage as exc:
+        raise NotFound(paginator.invalid_page_message.format(page_number=page_number, message=str(exc)))
+    page.object_list = [obj async for obj in page.object_list]
+    paginator.page = page
+    paginator.request = view.request
+    return page.object_list, paginator
+
+
+async def aprogress_context(view, path, **lesson_filter):
+    """Async LessonProgressContextMixin.get_progress_context"""
+    context = view.get_serializer_context()
+    user = view.request.user
+    if user.is_authenticated and get_request_shape(view.request).includes_path(path):
+        progress = LessonProgress.objects.filter(student=user, **lesson_filter)
+        context['lesson_progress'] = {p.lesson_id: p async for p in progress}
+    return context
+
+
+async def amodules(context, course):
+    """A course's modules rendered by FastModuleSerializer"""
+    fast = FastModuleSerializer(context)
+    rows = [row async for row in fast.values(course.modules.all())]
+    # Lessons, quizzes and progress are loaded by prepare() in one sync pass
+    return await sync_to_async(fast.serialize)(rows)
+
+
+def async_read_view(viewset_class, action, sync_view):
+    """Async view for one viewset action, falling back to ``sync_view`` for everything else"""
+    def decorator(handler):
+        @csrf_exempt
+        @wraps(handler)
+        async def view_func(request, **kwargs):
+            renderer = get_renderer()
+            if request.method not in ('GET', 'HEAD') or renderer is None or not wants_json(request):
+                return await sync_to_async(sync_view)(request, **kwargs)
+
+            # The view's authenticators, so a missing login is NotAuthenticated as on the sync view
+            authenticators = [auth() for auth in viewset_class.authentication_classes]
+            drf_request = Request(request, parsers=[], authenticators=authenticators)
+            drf_request.accepted_renderer = renderer
+            drf_request.accepted_media_type = renderer.media_type
+            view = viewset_class(
+                request=drf_request, action=action, args=(), kwargs=kwargs, format_kwarg=None
+            )
+            view.headers = view.default_response_headers
+
+            try:
+                async with concurrency_slot():
+                    try:
+                        authenticator, drf_request.user, drf_request.auth = await authenticate(
+                            request, drf_request
+                        )
+                        # Read by permission_denied; setting it keeps DRF from authenticating again
+                        drf_request._authenticator = authenticator
+                        view.check_permissions(drf_request)
+                        response = await handler(view)
+                    except Exception as exc:
+                        response = view.handle_exception(exc)
+            except asyncio.TimeoutError:
+                response = JsonResponse({'detail': 'Server busy, try again.'}, status=503)
+                response['Retry-After'] = '1'
+                return response
+
+            if response is FALLBACK:
+                return await sync_to_async(sync_view)(request, **kwargs)
+            response = view.finalize_response(drf_request, response)
+            if isinstance(response, Response):
+                response.render()
+            return response
+        return view_func
+    return decorator
+
+
+def get_views(sync_views):
+    """Async views by URL name, given the router's sync views by URL name"""
+
+    @async_read_view(CourseViewSet, 'list', sync_views['course-list'])
+    async def course_list(view):
+        if view.paginator.wants_cursor(view.request, view):
+            return FALLBACK
+        if view.request.query_params.get('search'):
+            # The backend is picked with a query on first use
+            await sync_to_async(get_search_backend)()
+
+        cache_key = None
+        if is_cacheable(view.request):
+            cache_key, cached = await sync_to_async(lookup, thread_sensitive=False)(
+                'course-list', view.request
+            )
+            if cached is not None:
+                return cached
+
+        etag, last_modified, not_modified = await aconditional(view, 'catalog_freshness_query')
+        if not_modified is not None:
+            return set_validators(not_modified, etag, last_modified)
+
+        queryset = view.filter_queryset(view.get_queryset())
+        fast = view.get_fast_serializer()
+        if fast is not None:
+            rows, paginator = await apaginate(view, fast.values(queryset))
+            data = fast.serialize(rows)
+        else:
+            courses, paginator = await apaginate(view, queryset)
+            data = view.get_serializer(courses, many=True).data
+        response = paginator.get_paginated_response(data) if paginator else Response(data)
+        set_validators(response, etag, last_modified)
+        if cache_key is not None:
+            response['X-Cache'] = 'MISS'
+            response.add_post_render_callback(lambda rendered: store_response(cache_key, rendered))
+        return response
+
+    @async_read_view(CourseViewSet, 'retrieve', sync_views['course-detail'])
+    async def course_detail(view):
+        etag, last_modified, not_modified = await aconditional(view, 'course_tree_freshness_query')
+        if not_modified is not None:
+            return set_validators(not_modified, etag, last_modified)
+
+        course = await aget_object(view)
+        if use_fast_serializers(view.request):
+            context = view.get_serializer_context()
+            context['course_modules'] = await amodules(context, course)
+        else:
+            context = await aprogress_context(view, 'modules.lessons.progress', lesson__module__course=course)
+        data = CourseDetailSerializer(course, context=context).data
+        return set_validators(Response(data), etag, last_modified)
+
+    @async_read_view(CourseViewSet, 'modules', sync_views['course-modules'])
+    async def course_modules(view):
+        etag, last_modified, not_modified = await aconditional(view, 'course_tree_freshness_query')
+        if not_modified is not None:
+            return set_validators(not_modified, etag, last_modified)
+
+        course = await aget_object(view)
+        if use_fast_serializers(view.request):
+            data = await amodules(view.get_serializer_context(), course)
+        else:
+            context = await aprogress_context(view, 'lessons.progress', lesson__module__course=course)
+            data = ModuleSerializer(course.modules.all(), many=True, context=context).data
+        return set_validators(Response(data), etag, last_modified)
+
+    @async_read_view(EnrollmentViewSet, 'list', sync_views['enrollment-list'])
+    async def enrollment_list(view):
+        if view.paginator.wants_cursor(view.request, view):
+            return FALLBACK
+
+        queryset = view.filter_queryset(view.get_queryset())
+        fast = view.get_fast_serializer()
+        if fast is not None:
+            rows, paginator = await apaginate(view, fast.values(queryset))
+            data = fast.serialize(rows)
+        else:
+            enrollments, paginator = await apaginate(view, queryset)
+            data = view.get_serializer(enrollments, many=True).data
+        return paginator.get_paginated_response(data) if paginator else Response(data)
+
+    return {
+        'course-list': course_list,
+        'course-detail': course_detail,
+        'course-modules': course_modules,
+        'enrollment-list': enrollment_list,
+    }
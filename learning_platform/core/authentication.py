@@ -0,0 +1,194 @@
+"""
+Cached authentication lookups.
+
+Tokens (with their user) and session users are kept in two tiers: a
+bounded in-process LRU with a TTL, in front of Django's default cache.
+Deleting a token, or saving/deleting a user, deletes that token's or
+user's shared entries and bumps their revocation generations in the
+shared cache (see core.signals); every local hit checks the generation
+of its key, so revocations apply to the next request in every worker
+that shares the cache. A request costs one cache read instead of one or
+two queries. Only enabled with a cache shared by all processes
+(``AUTH_CACHE_ENABLED``, see settings).
+"""
+import copy
+import hashlib
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+KEY_PREFIX = 'auth-cache'
+
+
+class HitCounter:
+    """Thread-safe hit/miss counters of one worker process"""
+
+    def __init__(self, *hit_names):
+        self.hit_names = hit_names or ('hits',)
+        self._lock = threading.Lock()
+        self._counts = Counter()
+
+    def count(self, name):
+        with self._lock:
+            self._counts[name] += 1
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+    def get_stats(self):
+        with self._lock:
+            counts = dict(self._counts)
+        hits = sum(counts.get(name, 0) for name in self.hit_names)
+        lookups = hits + counts.get('misses', 0)
+        stats = {name: counts.get(name, 0) for name in self.hit_names + ('misses',)}
+        stats['hit_ratio'] = round(hits / lookups, 4) if lookups else None
+        return stats
+
+
+class AuthCache:
+    """Two-tier cache for authentication objects, keyed like ``token:<digest>`` or ``user:<pk>``"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.stats = HitCounter('local_hits', 'shared_hits')
+
+    @property
+    def max_entries(self):
+        return getattr(settings, 'AUTH_CACHE_MAX_ENTRIES', 1024)
+
+    @property
+    def timeout(self):
+        return getattr(settings, 'AUTH_CACHE_TIMEOUT', 300)
+
+    def _shared_key(self, key):
+        return f'{KEY_PREFIX}:{key}'
+
+    def _generation_key(self, key):
+        return f'{KEY_PREFIX}:generation:{key}'
+
+    def get_generation(self, key):
+        """Revocation generation of ``key``; a new one (invalidating local entries) once it expires"""
+        generation_key = self._generation_key(key)
+        generation = cache.get(generation_key)
+        if generation is None:
+            generation = time.time_ns()
+            cache.add(generation_key, generation, self.timeout)
+            generation = cache.get(generation_key, generation)
+        return generation
+
+    def get(self, key, loader):
+        """Cached object for ``key``, calling ``loader`` (which may return None) on a miss"""
+        generation = self.get_generation(key)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] == generation and entry[2] > now:
+                self._entries.move_to_end(key)
+                self.stats.count('local_hits')
+                return copy.copy(entry[0])
+
+        value = cache.get(self._shared_key(key))
+        if value is not None:
+            self.stats.count('shared_hits')
+        else:
+            self.stats.count('misses')
+            value = loader()
+            if value is None:
+                return None
+            # Skip the write if a revocation happened while loading
+            if self.get_generation(key) == generation:
+                cache.set(self._shared_key(key), value, self.timeout)
+
+        with self._lock:
+            self._entries[key] = (value, generation, now + self.timeout)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return copy.copy(value)
+
+    def revoke(self, keys):
+        """Forget ``keys`` everywhere, once the current transaction commits"""
+        keys = list(keys)
+
+        def forget():
+            cache.delete_many([self._shared_key(key) for key in keys])
+            # Outlives every local entry loaded under the previous generation
+            cache.set_many({self._generation_key(key): time.time_ns() for key in keys}, self.timeout)
+            with self._lock:
+                for key in keys:
+                    self._entries.pop(key, None)
+
+        transaction.on_commit(forget)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+auth_cache = AuthCache()
+
+
+def token_cache_key(key):
+    return 'token:' + hashlib.sha256(key.encode()).hexdigest()
+
+
+def user_cache_key(user_id):
+    return f'user:{user_id}'
+
+
+def revoke_token(key):
+    auth_cache.revoke([token_cache_key(key)])
+
+
+def revoke_user(user):
+    keys = [user_cache_key(user.pk)]
+    keys += [token_cache_key(key) for key in Token.objects.filter(user=user).values_list('key', flat=True)]
+    auth_cache.revoke(keys)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication served from the auth cache"""
+
+    def load_token(self, key):
+        return self.get_model().objects.select_related('user').filter(key=key).first()
+
+    def authenticate_credentials(self, key):
+        token = auth_cache.get(token_cache_key(key), lambda: self.load_token(key))
+        if token is None:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+        # Requests must not share the cached user instance
+        token.user = copy.copy(token.user)
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+
+        return (token.user, token)
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend whose per-request session user lookup goes through the auth cache"""
+
+    def get_user(self, user_id):
+        UserModel = get_user_model()
+        try:
+            user_id = UserModel._meta.pk.to_python(user_id)
+        except ValidationError:
+            return None
+        user = auth_cache.get(
+            user_cache_key(user_id),
+            lambda: UserModel._default_manager.filter(pk=user_id).first(),
+        )
+        return user if user is not None and self.user_can_authenticate(user) else None
@@ -0,0 +1,244 @@
+"""
+Completion certificates and wallet cards for completed enrollments.
+
+A certificate is rendered from a small dict of plain values
+(``certificate_data``): learner, course, instructor and completion date.
+The PDF is stored under ``MEDIA_ROOT/certificates/`` at a path named by a
+hash of those values and ``TEMPLATE_VERSION``, so a certificate is
+rendered once and every later download is served from disk. A change of
+name, course title or completion date gives a new hash, and so a new PDF.
+Bump ``TEMPLATE_VERSION`` whenever the layout changes.
+
+``GET /api/enrollments/{id}/certificate/`` renders on demand;
+``manage.py generate_certificates`` (``generate_certificates``) renders a
+whole cohort in a process pool.
+"""
+import hashlib
+import io
+import json
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import landscape, letter
+from reportlab.lib.units import inch
+from reportlab.lib.utils import simpleSplit
+from reportlab.pdfgen import canvas
+
+from .models import Enrollment
+
+TEMPLATE_VERSION = 1
+
+CERTIFICATE_DIR = 'certificates'
+
+ORGANIZATION = 'Operator Training'
+
+# kind -> page size; a wallet card is ID-1 / CR80
+KINDS = {
+    'certificate': landscape(letter),
+    'wallet-card': (3.375 * inch, 2.125 * inch),
+}
+
+# Certificates per task handed to a pool worker
+POOL_CHUNK_SIZE = 20
+
+
+class CertificateError(ValueError):
+    """No certificate can be issued"""
+
+
+def certificate_data(enrollment):
+    """The values printed on ``enrollment``'s certificate (it needs student, course and instructor)"""
+    if not enrollment.is_completed:
+        raise CertificateError('The course has not been completed yet')
+    student = enrollment.student
+    course = enrollment.course
+    completed = timezone.localdate(enrollment.completed_at or enrollment.enrolled_at)
+    return {
+        'student_id': student.pk,
+        'student_name': student.get_full_name() or student.username,
+        'course_id': course.pk,
+        'course_title': course.title,
+        'instructor_name': course.instructor.get_full_name() or course.instructor.username,
+        'completed_on': completed.isoformat(),
+    }
+
+
+def certificate_key(data):
+    """Hash of the template version and the certificate's values"""
+    payload = json.dumps([TEMPLATE_VERSION, data], sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def certificate_number(data):
+    """The number printed on a certificate (and its wallet card)"""
+    return certificate_key(data)[:12].upper()
+
+
+def certificate_path(kind, data):
+    """Absolute path of the stored PDF"""
+    key = certificate_key(data)
+    return Path(settings.MEDIA_ROOT) / CERTIFICATE_DIR / kind / key[:2] / f'{key}.pdf'
+
+
+def _centered_lines(pdf, text, font, size, y, width, max_width, leading=1.2):
+    """Draw ``text`` wrapped and centered from ``y`` down; returns the y below it"""
+    for line in simpleSplit(text, font, size, max_width):
+        pdf.setFont(font, size)
+        pdf.drawCentredString(width / 2, y, line)
+        y -= size * leading
+    return y
+
+
+def _draw_certificate(pdf, data, width, height):
+    pdf.setStrokeColor(colors.HexColor('#1f3a5f'))
+    pdf.setLineWidth(4)
+    pdf.rect(0.4 * inch, 0.4 * inch, width - 0.8 * inch, height - 0.8 * inch)
+    pdf.setLineWidth(1)
+    pdf.rect(0.55 * inch, 0.55 * inch, width - 1.1 * inch, height - 1.1 * inch)
+
+    text_width = width - 2 * inch
+    pdf.setFillColor(colors.HexColor('#1f3a5f'))
+    y = _centered_lines(pdf, ORGANIZATION.upper(), 'Helvetica-Bold', 14, height - 1.3 * inch, width, text_width)
+    y = _centered_lines(pdf, 'Certificate of Completion', 'Helvetica-Bold', 34, y - 0.3 * inch, width, text_width)
+    pdf.setFillColor(colors.black)
+    y = _centered_lines(pdf, 'This certifies that', 'Helvetica', 14, y - 0.3 * inch, width, text_width)
+    y = _centered_lines(pdf, data['student_name'], 'Helvetica-Bold', 28, y - 0.15 * inch, width, text_width)
+    y = _centered_lines(pdf, 'has successfully completed', 'Helvetica', 14, y - 0.1 * inch, width, text_width)
+    _centered_lines(pdf, data['course_title'], 'Helvetica-Bold', 22, y - 0.15 * inch, width, text_width)
+
+    pdf.setFont('Helvetica', 12)
+    pdf.drawString(1.2 * inch, 1.5 * inch, f'Completed on {data["completed_on"]}')
+    pdf.drawRightString(width - 1.2 * inch, 1.5 * inch, f'Instructor: {data["instructor_name"]}')
+    pdf.setFont('Helvetica', 9)
+    pdf.setFillColor(colors.grey)
+    pdf.drawCentredString(width / 2, 0.85 * inch, f'Certificate No. {certificate_number(data)}')
+
+
+def _draw_wallet_card(pdf, data, width, height):
+    pdf.setFillColor(colors.HexColor('#1f3a5f'))
+    pdf.rect(0, height - 0.4 * inch, width, 0.4 * inch, stroke=0, fill=1)
+    pdf.setFillColor(colors.white)
+    pdf.setFont('Helvetica-Bold', 10)
+    pdf.drawString(0.15 * inch, height - 0.26 * inch, ORGANIZATION.upper())
+
+    text_width = width - 0.3 * inch
+    pdf.setFillColor(colors.black)
+    y = height - 0.65 * inch
+    for line in simpleSplit(data['student_name'], 'Helvetica-Bold', 11, text_width)[:2]:
+        pdf.setFont('Helvetica-Bold', 11)
+        pdf.drawString(0.15 * inch, y, line)
+        y -= 13
+    for line in simpleSplit(data['course_title'], 'Helvetica', 8, text_width)[:3]:
+        pdf.setFont('Helvetica', 8)
+        pdf.drawString(0.15 * inch, y, line)
+        y -= 10
+
+    pdf.setFont('Helvetica', 7)
+    pdf.drawString(0.15 * inch, 0.3 * inch, f'Completed {data["completed_on"]}')
+    pdf.drawString(0.15 * inch, 0.17 * inch, f'Instructor: {data["instructor_name"]}')
+    pdf.setFillColor(colors.grey)
+    pdf.drawRightString(width - 0.15 * inch, 0.17 * inch, f'No. {certificate_number(data)}')
+
+
+def render_certificate(kind, data):
+    """PDF bytes of a certificate or wallet card; the same data always gives the same bytes"""
+    width, height = KINDS[kind]
+    buffer = io.BytesIO()
+    # invariant: no timestamps or random ids in the file
+    pdf = canvas.Canvas(buffer, pagesize=(width, height), invariant=1, pageCompression=1)
+    pdf.setTitle(f'{data["course_title"]} - {data["student_name"]}')
+    pdf.setAuthor(ORGANIZATION)
+    if kind == 'wallet-card':
+        _draw_wallet_card(pdf, data, width, height)
+    else:
+        _draw_certificate(pdf, data, width, height)
+    pdf.showPage()
+    pdf.save()
+    return buffer.getvalue()
+
+
+def store_certificate(kind, data, force=False):
+    """
+    The stored PDF's path, rendering it first if it is not on disk yet.
+    Returns (path, rendered).
+    """
+    path = certificate_path(kind, data)
+    if path.exists() and not force:
+        return path, False
+    content = render_certificate(kind, data)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Written beside the target and renamed into place, so concurrent
+    # renders of the same certificate never expose a partial file
+    handle, temp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    try:
+        with os.fdopen(handle, 'wb') as temp_file:
+            temp_file.write(content)
+        # mkstemp files are private; stored media is world-readable
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+    return path, True
+
+
+def _store_task(task):
+    kind, data, force = task
+    return store_certificate(kind, data, force)[1]
+
+
+def get_certificate(enrollment, kind='certificate'):
+    """Path of ``enrollment``'s stored certificate PDF, rendered on first use"""
+    if kind not in KINDS:
+        raise CertificateError(f'Unknown certificate kind {kind!r}; choose from {", ".join(KINDS)}')
+    return store_certificate(kind, certificate_data(enrollment))[0]
+
+
+def completed_enrollments(courses=(), users=(), since=None):
+    """Completed enrollments with what ``certificate_data`` reads, optionally filtered"""
+    queryset = Enrollment.objects.filter(is_completed=True).select_related(
+        'student', 'course', 'course__instructor'
+    )
+    if courses:
+        queryset = queryset.filter(course__slug__in=courses)
+    if users:
+        queryset = queryset.filter(student_id__in=users)
+    if since:
+        queryset = queryset.filter(completed_at__date__gte=since)
+    return queryset.order_by('pk')
+
+
+def generate_certificates(enrollments, kinds=tuple(KINDS), workers=None, force=False):
+    """
+    Make sure every enrollment has its stored PDFs of ``kinds``; the
+    missing ones (all of them with ``force``) are rendered in a pool of
+    ``workers`` processes, or in this process when ``workers`` is 1.
+    Returns {'certificates', 'rendered', 'cached'}.
+    """
+    tasks = []
+    cached = 0
+    for enrollment in enrollments.iterator(chunk_size=2000):
+        data = certificate_data(enrollment)
+        for kind in kinds:
+            if not force and certificate_path(kind, data).exists():
+                cached += 1
+            else:
+                tasks.append((kind, data, force))
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(tasks) <= 1:
+        rendered = sum(_store_task(task) for task in tasks)
+    else:
+        # Workers only render; none of them uses the database
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks)), initializer=django.setup) as pool:
+            rendered = sum(pool.map(_store_task, tasks, chunksize=POOL_CHUNK_SIZE))
+    return {'certificates': len(tasks) + cached, 'rendered': rendered, 'cached': cached + len(tasks) - rendered}
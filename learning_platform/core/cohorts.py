@@ -0,0 +1,159 @@
+"""
+Bulk (cohort) enrollment.
+
+``bulk_enroll`` takes a list of student identifiers (emails or user ids)
+and a list of course slugs. Users, courses and the existing enrollments
+are each resolved with one query, and the missing enrollments are
+inserted with ``bulk_create`` in batches. The existing enrollments are
+read under a lock on the course rows, which every enrollment writer takes
+(see ``lock_courses``), so the reported counts are exact. It is used by
+``POST /api/enrollments/bulk/`` and ``manage.py bulk_enroll``.
+"""
+import csv
+import io
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+from .models import Course, Enrollment
+
+DEFAULT_BATCH_SIZE = 500
+
+# Largest cohort accepted by the API in one request
+MAX_API_ROWS = 5000
+
+# Header names recognised in the first CSV row
+CSV_COLUMNS = ('email', 'user_id', 'id', 'user', 'student')
+
+
+def read_identifiers_csv(text):
+    """Student identifiers from CSV text: the email/id column if there is a header, else column one"""
+    rows = [row for row in csv.reader(io.StringIO(text)) if any(cell.strip() for cell in row)]
+    if not rows:
+        return []
+    header = [cell.strip().lower() for cell in rows[0]]
+    column = next((header.index(name) for name in CSV_COLUMNS if name in header), None)
+    if column is None:
+        column = 0
+    else:
+        rows = rows[1:]
+    return [row[column].strip() if len(row) > column else '' for row in rows]
+
+
+def split_identifier(value):
+    """('email', normalized) / ('id', int) / (None, value) for one identifier"""
+    value = str(value).strip()
+    if '@' in value:
+        return 'email', value.lower()
+    if value.isdigit():
+        return 'id', int(value)
+    return None, value
+
+
+def resolve_users(identifiers):
+    """{('email' | 'id', value): user id} for the identifiers, with one query"""
+    parsed = [split_identifier(value) for value in identifiers]
+    emails = {value for kind, value in parsed if kind == 'email'}
+    ids = {value for kind, value in parsed if kind == 'id'}
+    if not emails and not ids:
+        return {}
+
+    resolved = {}
+    rows = (
+        User.objects.annotate(email_lower=Lower('email'))
+        .filter(Q(email_lower__in=emails) | Q(pk__in=ids))
+        .order_by('pk')
+        .values_list('pk', 'email_lower')
+    )
+    for pk, email in rows:
+        if pk in ids:
+            resolved[('id', pk)] = pk
+        # Several accounts may share an address; the oldest one wins
+        if email in emails:
+            resolved.setdefault(('email', email), pk)
+    return resolved
+
+
+def lock_courses(course_ids):
+    """Lock course rows (in id order) before reading or adding their enrollments"""
+    list(
+        Course.objects.select_for_update().filter(pk__in=course_ids)
+        .order_by('pk').values_list('pk', flat=True)
+    )
+
+
+def bulk_enroll(identifiers, courses, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Enroll every identified student in every course, returning a summary
+    with one result per input row
+    """
+    identifiers = list(identifiers)
+    courses = list(courses)
+    resolved = resolve_users(identifiers)
+    course_ids = [course.pk for course in courses]
+    user_ids = set(resolved.values())
+
+    results = []
+    new_enrollments = []
+    with transaction.atomic():
+        # Every enrollment writer locks the course rows first, so the snapshot
+        # below stays exact until the insert
+        lock_courses(course_ids)
+        existing = set(
+            Enrollment.objects.filter(course__in=course_ids, student__in=user_ids)
+            .values_list('student_id', 'course_id')
+        )
+        seen = set()
+        for row, identifier in enumerate(identifiers, start=1):
+            kind, value = split_identifier(identifier)
+            result = {'row': row, 'identifier': identifier, 'user_id': None}
+            results.append(result)
+
+            if kind is None:
+                result['status'] = 'invalid'
+                continue
+            user_id = resolved.get((kind, value))
+            if user_id is None:
+                result['status'] = 'not_found'
+                continue
+            result['user_id'] = user_id
+            if user_id in seen:
+                result['status'] = 'duplicate'
+                continue
+            seen.add(user_id)
+
+            result['enrolled'] = []
+            result['already_enrolled'] = []
+            for course in courses:
+                if (user_id, course.pk) in existing:
+                    result['already_enrolled'].append(course.slug)
+                else:
+                    result['enrolled'].append(course.slug)
+                    new_enrollments.append(Enrollment(student_id=user_id, course=course))
+            result['status'] = 'enrolled' if result['enrolled'] else 'already_enrolled'
+
+        Enrollment.objects.bulk_create(new_enrollments, batch_size=batch_size)
+
+    totals = {'rows': len(results), 'enrollments_created': len(new_enrollments)}
+    for result in results:
+        totals[result['status']] = totals.get(result['status'], 0) + 1
+    return {
+        'courses': [course.slug for course in courses],
+        'totals': totals,
+        'results': results,
+    }
+
+
+def get_cohort_courses(slugs):
+    """(courses, errors) for a list of course slugs; only published courses accept enrollments"""
+    slugs = list(dict.fromkeys(slug.strip() for slug in slugs if slug and slug.strip()))
+    courses = {course.slug: course for course in Course.objects.filter(slug__in=slugs)}
+    errors = {}
+    for slug in slugs:
+        if slug not in courses:
+            errors[slug] = 'Course not found'
+        elif courses[slug].status != 'published':
+            errors[slug] = 'Course is not available for enrollment'
+    return [courses[slug] for slug in slugs if slug in courses], errors
@@ -0,0 +1,100 @@
+"""
+Conditional GET support (ETag / Last-Modified) for the course tree endpoints.
+
+A viewset method decorated with ``conditional_get('<freshness method>')``
+first runs the freshness method, which returns a list of aggregate dicts,
+normally from a single aggregate query (newest ``updated_at`` of every
+table in the served tree, row counts, quiz versions and the user's
+progress version). The validators are derived from those values, and a
+request whose ``If-None-Match`` / ``If-Modified-Since`` still matches
+gets a ``304`` before any object is loaded or serialized.
+"""
+import hashlib
+from datetime import datetime
+from functools import wraps
+
+from django.db.models import Count, IntegerField, Max, OuterRef, Subquery, Sum
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from .models import LessonProgress
+
+
+def latest(queryset, group_field, field):
+    """Correlated subquery for the newest ``field`` of ``queryset``"""
+    return Subquery(
+        queryset.order_by().values(group_field).annotate(value=Max(field)).values('value')
+    )
+
+
+def total(queryset, group_field, field=None):
+    """Correlated subquery for the row count (or the sum of ``field``) of ``queryset``"""
+    aggregate = Sum(field) if field else Count('pk')
+    return Subquery(
+        queryset.order_by().values(group_field).annotate(value=aggregate).values('value'),
+        output_field=IntegerField(),
+    )
+
+
+def progress_aggregates(user, outer_field):
+    """
+    Aggregates over the user's progress on the lessons below each outer row,
+    where ``outer_field`` is the LessonProgress path to the outer model
+    (e.g. ``'lesson__module'`` when aggregating over modules)
+    """
+    if not user.is_authenticated:
+        return {}
+    progress = LessonProgress.objects.filter(student=user, **{outer_field: OuterRef('pk')})
+    return {
+        'progress_updated': Max(latest(progress, outer_field, 'last_accessed')),
+        'progress_rows': Sum(total(progress, outer_field)),
+        'progress_minutes': Sum(total(progress, outer_field, 'time_spent_minutes')),
+    }
+
+
+def compute_validators(request, freshness):
+    """(etag, last_modified timestamp) for a list of aggregate dicts"""
+    values = [sorted(part.items()) for part in freshness]
+    stamps = [
+        value for part in freshness for value in part.values() if isinstance(value, datetime)
+    ]
+    fingerprint = repr((
+        values,
+        request.get_full_path(),
+        request.user.pk,
+        request.META.get('HTTP_ACCEPT', ''),
+    ))
+    etag = quote_etag(hashlib.md5(fingerprint.encode()).hexdigest())
+    last_modified = int(max(stamps).timestamp()) if stamps else None
+    return etag, last_modified
+
+
+def set_validators(response, etag, last_modified):
+    """Add the validator and cache headers to a 200 or 304 response"""
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    # Bodies are per user and per format, clients must revalidate
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ['Accept', 'Authorization', 'Cookie'])
+    return response
+
+
+def conditional_get(freshness_method):
+    """Answer GET/HEAD with 304 when the client's validators are still current"""
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return method(self, request, *args, **kwargs)
+
+            freshness = getattr(self, freshness_method)()
+            etag, last_modified = compute_validators(request, freshness)
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = method(self, request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+            return set_validators(response, etag, last_modified)
+        return wrapper
+    return decorator
@@ -0,0 +1,171 @@
+"""
+Denormalized module/lesson counters on Course and Module, the stored
+lesson progress on Enrollment and the per-student QuizAttemptSummary rows.
+
+Refreshing the counters of a course or module also bumps its
+``updated_at``, so structural changes (including deletions) move the
+conditional GET validators of core.conditional.
+
+The counters are recomputed from the source rows instead of being
+incremented, so a refresh is idempotent and also repairs any drift left
+behind by bulk operations that bypass model signals.
+"""
+from django.db.models import Count, Exists, F, FloatField, IntegerField, Max, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Cast, Coalesce, Least, NullIf, Round
+from django.utils import timezone
+
+from .models import Course, Module, Lesson, Enrollment, LessonProgress, QuizAttempt, QuizAttemptSummary
+
+
+def _count_subquery(queryset, field):
+    """Correlated COUNT(*) subquery grouped on ``field``"""
+    counts = (
+        queryset.order_by()
+        .values(field)
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+def _target_rows(model, pks):
+    """Rows to refresh: all rows when ``pks`` is None, else the given primary keys"""
+    if pks is None:
+        return model.objects.all()
+    pks = {pk for pk in pks if pk is not None}
+    return model.objects.filter(pk__in=pks) if pks else model.objects.none()
+
+
+def refresh_module_counters(module_ids=None):
+    """Recompute Module.lesson_count for the given modules (all modules if None)"""
+    return _target_rows(Module, module_ids).update(
+        lesson_count=_count_subquery(Lesson.objects.filter(module=OuterRef('pk')), 'module'),
+        updated_at=timezone.now(),
+    )
+
+
+def refresh_course_counters(course_ids=None):
+    """Recompute Course.module_count and Course.lesson_count for the given courses (all if None)"""
+    return _target_rows(Course, course_ids).update(
+        module_count=_count_subquery(Module.objects.filter(course=OuterRef('pk')), 'course'),
+        lesson_count=_count_subquery(
+            Lesson.objects.filter(module__course=OuterRef('pk')), 'module__course'
+        ),
+        updated_at=timezone.now(),
+    )
+
+
+def _completed_lessons_subquery():
+    """Completed LessonProgress rows for the enrollment's student and course"""
+    return _count_subquery(
+        LessonProgress.objects.filter(
+            student=OuterRef('student'),
+            lesson__module__course=OuterRef('course'),
+            is_completed=True,
+        ),
+        'student',
+    )
+
+
+def refresh_enrollment_progress(course_ids=None):
+    """
+    Recompute Enrollment.completed_lessons/progress_percentage for every
+    enrollment in the given courses (all courses if None). Needed when the
+    lesson structure of a course changes; lesson completion itself is
+    applied incrementally by LessonViewSet.complete.
+    """
+    enrollments = Enrollment.objects.all()
+    if course_ids is not None:
+        enrollments = enrollments.filter(course__in=_target_rows(Course, course_ids))
+
+    total_lessons = Subquery(
+        Course.objects.filter(pk=OuterRef('course')).values('lesson_count'),
+        output_field=IntegerField(),
+    )
+    updated = enrollments.update(completed_lessons=_completed_lessons_subquery())
+    enrollments.update(
+        progress_percentage=Coalesce(
+            Round(
+                Least(
+                    Cast(F('completed_lessons'), FloatField()) * Value(100.0)
+                    / Cast(NullIf(total_lessons, Value(0)), FloatField()),
+                    Value(100.0),
+                ),
+                2,
+            ),
+            Value(0.0),
+        ),
+    )
+    # Lessons may have been removed, leaving only completed ones behind
+    enrollments.filter(
+        is_completed=False,
+        completed_lessons__gt=0,
+        completed_lessons__gte=total_lessons,
+    ).update(is_completed=True, completed_at=timezone.now())
+    return updated
+
+
+def refresh_attempt_summaries(quiz_ids=None, student_ids=None):
+    """
+    Recompute the QuizAttemptSummary rows of the given quizzes and students
+    (all if None) from their attempts, and drop summaries left without any.
+    Needed when attempts are deleted; submits update the summaries themselves.
+    """
+    attempts = QuizAttempt.objects.all()
+    summaries = QuizAttemptSummary.objects.all()
+    if quiz_ids is not None:
+        attempts = attempts.filter(quiz__in=quiz_ids)
+        summaries = summaries.filter(quiz__in=quiz_ids)
+    if student_ids is not None:
+        attempts = attempts.filter(student__in=student_ids)
+        summaries = summaries.filter(student__in=student_ids)
+
+    rows = attempts.order_by().values('student', 'quiz').annotate(
+        total=Count('pk'),
+        best=Max('score'),
+        passes=Count('pk', filter=Q(passed=True)),
+        last=Max(Coalesce('completed_at', 'started_at')),
+    )
+    refreshed = [
+        QuizAttemptSummary(
+            student_id=row['student'], quiz_id=row['quiz'], attempts=row['total'],
+            best_score=row['best'], passed=row['passes'] > 0, last_attempt_at=row['last'],
+        )
+        for row in rows.iterator()
+    ]
+    QuizAttemptSummary.objects.bulk_create(
+        refreshed, batch_size=1000, update_conflicts=True, unique_fields=['student', 'quiz'],
+        update_fields=['attempts', 'best_score', 'passed', 'last_attempt_at'],
+    )
+    summaries.filter(
+        ~Exists(QuizAttempt.objects.filter(student=OuterRef('student'), quiz=OuterRef('quiz')))
+    ).delete()
+    return len(refreshed)
+
+
+def find_counter_drift():
+    """
+    Return (course_rows, module_rows, enrollment_rows) whose stored counters
+    disagree with the actual number of related rows. Each row is
+    ``(pk, stored_modules, actual_modules, stored_lessons, actual_lessons)``
+    for courses and ``(pk, stored, actual)`` for modules and enrollments.
+    """
+    courses = Course.objects.annotate(
+        actual_modules=_count_subquery(Module.objects.filter(course=OuterRef('pk')), 'course'),
+        actual_lessons=_count_subquery(
+            Lesson.objects.filter(module__course=OuterRef('pk')), 'module__course'
+        ),
+    ).values_list('pk', 'module_count', 'actual_modules', 'lesson_count', 'actual_lessons')
+    course_rows = [row for row in courses if row[1] != row[2] or row[3] != row[4]]
+
+    modules = Module.objects.annotate(
+        actual_lessons=_count_subquery(Lesson.objects.filter(module=OuterRef('pk')), 'module'),
+    ).values_list('pk', 'lesson_count', 'actual_lessons')
+    module_rows = [row for row in modules if row[1] != row[2]]
+
+    enrollments = Enrollment.objects.annotate(
+        actual_completed=_completed_lessons_subquery(),
+    ).values_list('pk', 'completed_lessons', 'actual_completed')
+    enrollment_rows = [row for row in enrollments.iterator() if row[1] != row[2]]
+
+    return course_rows, module_rows, enrollment_rows
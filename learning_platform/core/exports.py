@@ -0,0 +1,247 @@
+"""
+Streaming compliance exports of enrollments, lesson progress and quiz attempts.
+
+Each export is a single query over ``values_list`` columns, with the
+student and course columns joined in, read with ``iterator(chunk_size=...)``
+(a server-side cursor on PostgreSQL) and written out as CSV or NDJSON in
+chunks. Nothing holds more than one chunk of rows, so memory stays flat
+however many rows match. Used by ``GET /api/exports/<kind>.<csv|ndjson>``
+and ``manage.py export_training_records``.
+"""
+import csv
+import io
+from datetime import datetime, time, timedelta
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import BooleanField, DateTimeField
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .cohorts import resolve_users, split_identifier
+from .models import Enrollment, LessonProgress, QuizAttempt
+from .renderers import JSONRenderer
+
+DEFAULT_CHUNK_SIZE = 2000
+
+STUDENT_COLUMNS = [
+    ('user_id', 'student_id'),
+    ('username', 'student__username'),
+    ('email', 'student__email'),
+    ('first_name', 'student__first_name'),
+    ('last_name', 'student__last_name'),
+]
+
+# kind -> (model, course lookup, date lookup, [(column, lookup)])
+EXPORTS = {
+    'enrollments': (Enrollment, 'course', 'enrolled_at', [
+        ('enrollment_id', 'id'),
+        *STUDENT_COLUMNS,
+        ('course_id', 'course_id'),
+        ('course_slug', 'course__slug'),
+        ('course_title', 'course__title'),
+        ('enrolled_at', 'enrolled_at'),
+        ('completed_at', 'completed_at'),
+        ('is_completed', 'is_completed'),
+        ('completed_lessons', 'completed_lessons'),
+        ('progress_percentage', 'progress_percentage'),
+    ]),
+    'progress': (LessonProgress, 'lesson__module__course', 'last_accessed', [
+        ('progress_id', 'id'),
+        *STUDENT_COLUMNS,
+        ('course_id', 'lesson__module__course_id'),
+        ('course_slug', 'lesson__module__course__slug'),
+        ('course_title', 'lesson__module__course__title'),
+        ('module_title', 'lesson__module__title'),
+        ('lesson_id', 'lesson_id'),
+        ('lesson_title', 'lesson__title'),
+        ('is_completed', 'is_completed'),
+        ('completed_at', 'completed_at'),
+        ('time_spent_minutes', 'time_spent_minutes'),
+        ('last_accessed', 'last_accessed'),
+    ]),
+    'quiz-attempts': (QuizAttempt, 'quiz__lesson__module__course', 'started_at', [
+        ('attempt_id', 'id'),
+        *STUDENT_COLUMNS,
+        ('course_id', 'quiz__lesson__module__course_id'),
+        ('course_slug', 'quiz__lesson__module__course__slug'),
+        ('course_title', 'quiz__lesson__module__course__title'),
+        ('quiz_id', 'quiz_id'),
+        ('quiz_title', 'quiz__title'),
+        ('started_at', 'started_at'),
+        ('completed_at', 'completed_at'),
+        ('score', 'score'),
+        ('passed', 'passed'),
+    ]),
+}
+
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+class ExportError(ValueError):
+    """Invalid export parameters"""
+
+
+def _split(values):
+    """A flat list from repeated and/or comma separated values"""
+    items = []
+    for value in values:
+        items.extend(part.strip() for part in str(value).replace('\n', ',').split(','))
+    return [item for item in items if item]
+
+
+def _day_start(value, name):
+    day = None
+    try:
+        day = parse_date(str(value))
+    except ValueError:
+        pass
+    if day is None:
+        raise ExportError(f'{name} must be a date (YYYY-MM-DD)')
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def get_export_queryset(kind, courses=(), date_from=None, date_to=None, users=()):
+    """
+    The rows of export ``kind`` as ``values_list`` tuples, oldest first.
+
+    ``courses`` are course slugs, ``date_from`` / ``date_to`` inclusive
+    YYYY-MM-DD dates matched against the row's main date, ``users`` emails
+    or user ids. Raises ExportError for unknown kinds, bad dates and users
+    that match nobody.
+    """
+    if kind not in EXPORTS:
+        raise ExportError(f'Unknown export {kind!r}; choose from {", ".join(EXPORTS)}')
+    model, course_lookup, date_lookup, columns = EXPORTS[kind]
+    queryset = model.objects.all()
+
+    courses = _split(courses)
+    if courses:
+        queryset = queryset.filter(**{f'{course_lookup}__slug__in': courses})
+    if date_from:
+        queryset = queryset.filter(**{f'{date_lookup}__gte': _day_start(date_from, 'from')})
+    if date_to:
+        end = _day_start(date_to, 'to') + timedelta(days=1)
+        queryset = queryset.filter(**{f'{date_lookup}__lt': end})
+
+    users = _split(users)
+    if users:
+        resolved = resolve_users(users)
+        unknown = [value for value in users if split_identifier(value) not in resolved]
+        if unknown:
+            raise ExportError(f'Unknown users: {", ".join(unknown[:20])}')
+        queryset = queryset.filter(student_id__in=set(resolved.values()))
+
+    return queryset.order_by('pk').values_list(*(lookup for _, lookup in columns))
+
+
+def get_export_columns(kind):
+    return [name for name, _ in EXPORTS[kind][3]]
+
+
+def _model_field(model, lookup):
+    *relations, name = lookup.split('__')
+    for relation in relations:
+        model = model._meta.get_field(relation).related_model
+    return model._meta.get_field(name)
+
+
+def _format_datetime(value):
+    value = value.isoformat()
+    return value[:-6] + 'Z' if value.endswith('+00:00') else value
+
+
+def _format_bool(value):
+    return 'true' if value else 'false'
+
+
+def get_csv_formatters(kind):
+    """[(column index, formatter)] for the CSV columns not written as they are"""
+    model, _, _, columns = EXPORTS[kind]
+    formatters = []
+    for index, (_, lookup) in enumerate(columns):
+        field = _model_field(model, lookup)
+        if isinstance(field, DateTimeField):
+            formatters.append((index, _format_datetime))
+        elif isinstance(field, BooleanField):
+            formatters.append((index, _format_bool))
+    return formatters
+
+
+def csv_chunks(rows, columns, chunk_size=DEFAULT_CHUNK_SIZE, formatters=()):
+    """Encoded CSV, a header and then ``chunk_size`` rows at a time (None is written empty)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    pending = 0
+    for row in rows:
+        if formatters:
+            row = list(row)
+            for index, formatter in formatters:
+                if row[index] is not None:
+                    row[index] = formatter(row[index])
+        writer.writerow(row)
+        pending += 1
+        if pending == chunk_size:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue().encode()
+
+
+def ndjson_chunks(rows, columns, chunk_size=DEFAULT_CHUNK_SIZE):
+    """One JSON object per line, ``chunk_size`` lines at a time"""
+    renderer = JSONRenderer()
+    lines = []
+    for row in rows:
+        lines.append(renderer.render(dict(zip(columns, row))))
+        if len(lines) == chunk_size:
+            lines.append(b'')
+            yield b'\n'.join(lines)
+            lines = []
+    if lines:
+        lines.append(b'')
+        yield b'\n'.join(lines)
+
+
+def export_chunks(kind, export_format, chunk_size=DEFAULT_CHUNK_SIZE, **filters):
+    """
+    Encoded chunks of an export. The queryset is built (and the filters
+    validated) right away; rows are only read as the chunks are consumed.
+    """
+    if export_format not in FORMATS:
+        raise ExportError(f'Unknown format {export_format!r}; choose from {", ".join(FORMATS)}')
+    rows = get_export_queryset(kind, **filters).iterator(chunk_size=chunk_size)
+    columns = get_export_columns(kind)
+    if export_format == 'csv':
+        return csv_chunks(rows, columns, chunk_size, get_csv_formatters(kind))
+    return ndjson_chunks(rows, columns, chunk_size)
+
+
+async def _aiter_chunks(chunks):
+    # All in the one sync thread, which owns the database cursor
+    next_chunk = sync_to_async(next, thread_sensitive=True)
+    while True:
+        chunk = await next_chunk(chunks, None)
+        if chunk is None:
+            return
+        yield chunk
+
+
+def streaming_export_response(request, kind, export_format, chunks):
+    """
+    StreamingHttpResponse for export chunks. Under ASGI the chunks are
+    handed over as an async iterator, which Django streams; a sync iterator
+    would be read into memory in full first.
+    """
+    if isinstance(request, ASGIRequest):
+        chunks = _aiter_chunks(chunks)
+    response = StreamingHttpResponse(chunks, content_type=FORMATS[export_format])
+    filename = f'{kind}-{timezone.now():%Y%m%d}.{export_format}'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -0,0 +1,274 @@
+"""
+Values-based fast path for the hottest read serializers.
+
+Large responses of ``CourseListSerializer``, ``ModuleSerializer``,
+``LessonSerializer`` and ``EnrollmentSerializer`` spend most of their time
+building model instances and going through DRF's per-field machinery. The
+classes here render the same data straight from ``.values()`` rows. Each
+one derives a field map from its DRF serializer once: the column to read
+for every field, and the DRF field's own ``to_representation`` for values
+that need formatting (datetimes, decimals), so the JSON is byte for byte
+the same. core.tests checks that it stays that way.
+
+The views use them for full-shape responses when ``FAST_SERIALIZERS`` is on;
+``?fields=`` / ``?expand=`` responses keep the DRF serializers, as does
+everything when it is off.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.fields import empty
+from rest_framework.settings import api_settings
+
+from .fieldsets import FULL, get_request_shape
+from .models import Lesson, LessonProgress, Quiz
+from .serializers import (
+    CourseListSerializer, EnrollmentSerializer, LessonProgressSerializer,
+    LessonSerializer, ModuleSerializer, QuizSerializer, UserSerializer
+)
+
+# DRF fields whose to_representation returns database values unchanged
+PLAIN_FIELDS = (
+    serializers.BooleanField, serializers.CharField, serializers.ChoiceField,
+    serializers.FloatField, serializers.IntegerField, serializers.PrimaryKeyRelatedField,
+    serializers.ReadOnlyField,
+)
+
+# Marks a field left out of the output, like DRF's SkipField
+SKIP = object()
+
+
+def use_fast_serializers(request):
+    """Whether the response to ``request`` can be rendered by the fast serializers"""
+    return getattr(settings, 'FAST_SERIALIZERS', True) and get_request_shape(request) is FULL
+
+
+def datetime_formatter(field):
+    """DateTimeField.to_representation with the field's timezone looked up once"""
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+    if output_format is None or output_format.lower() != ISO_8601 or field_timezone is None:
+        return field.to_representation
+
+    def format_datetime(value):
+        if isinstance(value, str) or timezone.is_naive(value):
+            return field.to_representation(value)
+        value = value.astimezone(field_timezone).isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+    return format_datetime
+
+
+def _unique(names):
+    return list(dict.fromkeys(names))
+
+
+class FastSerializer:
+    """
+    Renders ``.values()`` rows like ``serializer_class`` renders instances.
+
+    Fields are read from the column named by their source, unless
+    ``sources`` names another lookup. A ``get_<name>(row)`` method renders
+    a field itself, reading the lookups listed in ``method_columns``.
+    Declared nested serializers are rendered from the same, joined row by
+    the fast serializer class given in ``nested``.
+    """
+    serializer_class = None
+    sources = {}
+    method_columns = {}
+    nested = {}
+
+    def __init__(self, context, prefix=''):
+        self.context = context
+        self.request = context.get('request')
+        self.prefix = prefix
+        self.columns = [prefix + column for column in self.get_columns()]
+        self.fields = [(name, self.bind(name, field)) for name, field in self.get_fields().items()]
+
+    @classmethod
+    def get_fields(cls):
+        """The DRF serializer's fields, built once per class"""
+        if '_fields' not in cls.__dict__:
+            cls._fields = cls.serializer_class(shape=FULL).fields
+        return cls._fields
+
+    @classmethod
+    def get_columns(cls):
+        """The ``.values()`` lookups read by this serializer and its nested ones"""
+        if '_columns' in cls.__dict__:
+            return cls._columns
+        columns = []
+        for name, field in cls.get_fields().items():
+            if hasattr(cls, 'get_' + name):
+                columns += cls.method_columns.get(name, [])
+            elif name in cls.nested:
+                columns += [name + '__' + column for column in cls.nested[name].get_columns()]
+            else:
+                lookup = cls.sources.get(name, field.source.replace('.', '__'))
+                relation = lookup.rpartition('__')[0]
+                if relation:
+                    # To tell a null relation from a null value
+                    columns.append(relation)
+                columns.append(lookup)
+        cls._columns = _unique(columns)
+        return cls._columns
+
+    def bind(self, name, field):
+        """Function rendering ``field`` from a row"""
+        method = getattr(self, 'get_' + name, None)
+        if method is not None:
+            return method
+
+        if name in self.nested:
+            child = self.nested[name](self.context, self.prefix + name + '__')
+            child_id = child.prefix + 'id'
+            return lambda row: None if row[child_id] is None else child.to_representation(row)
+
+        lookup = self.sources.get(name, field.source.replace('.', '__'))
+        column = self.prefix + lookup
+        if isinstance(field, serializers.FileField):
+            storage = self.serializer_class.Meta.model._meta.get_field(lookup).storage
+            return lambda row: self.file_url(storage, row[column])
+
+        if isinstance(field, PLAIN_FIELDS):
+            formatter = None
+        elif isinstance(field, serializers.DateTimeField):
+            formatter = datetime_formatter(field)
+        else:
+            formatter = field.to_representation
+
+        def render(row):
+            value = row[column]
+            return value if value is None or formatter is None else formatter(value)
+
+        relation = lookup.rpartition('__')[0]
+        if not relation:
+            return render
+
+        # A source through a null relation falls back like Field.get_attribute
+        if field.default is not empty:
+            missing = field.get_default()
+        elif field.allow_null:
+            missing = None
+        else:
+            missing = SKIP
+        relation = self.prefix + relation
+        return lambda row: missing if row[relation] is None else render(row)
+
+    def file_url(self, storage, name):
+        """FileField.to_representation for a stored file name"""
+        if not name:
+            return None
+        url = storage.url(name)
+        if self.request is not None:
+            return self.request.build_absolute_uri(url)
+        return url
+
+    def values(self, queryset):
+        """``queryset`` as the rows this serializer reads"""
+        return queryset.prefetch_related(None).values(*self.columns)
+
+    def prepare(self, rows):
+        """Load what the method fields of ``rows`` need, before they are rendered"""
+
+    def to_representation(self, row):
+        data = {}
+        for name, render in self.fields:
+            value = render(row)
+            if value is not SKIP:
+                data[name] = value
+        return data
+
+    def serialize(self, rows):
+        rows = list(rows)
+        self.prepare(rows)
+        return [self.to_representation(row) for row in rows]
+
+
+class FastUserSerializer(FastSerializer):
+    serializer_class = UserSerializer
+
+
+class FastCourseListSerializer(FastSerializer):
+    serializer_class = CourseListSerializer
+    sources = {'total_modules': 'module_count', 'total_lessons': 'lesson_count'}
+    method_columns = {'instructor_name': ['instructor__first_name', 'instructor__last_name']}
+
+    def get_instructor_name(self, row):
+        # User.get_full_name
+        first_name = row[self.prefix + 'instructor__first_name']
+        last_name = row[self.prefix + 'instructor__last_name']
+        return f'{first_name} {last_name}'.strip()
+
+
+class FastLessonProgressSerializer(FastSerializer):
+    serializer_class = LessonProgressSerializer
+
+
+class FastLessonSerializer(FastSerializer):
+    serializer_class = LessonSerializer
+    method_columns = {'quiz': ['quiz'], 'progress': ['id']}
+
+    def prepare(self, rows):
+        quiz_ids = [row[self.prefix + 'quiz'] for row in rows if row[self.prefix + 'quiz'] is not None]
+        self.quizzes = {}
+        if quiz_ids:
+            # Quizzes are rare next to lessons, so they keep the DRF serializer
+            quizzes = Quiz.objects.filter(pk__in=quiz_ids).prefetch_related('questions__options')
+            self.quizzes = {
+                quiz.pk: QuizSerializer(quiz, context=self.context, shape=FULL).data
+                for quiz in quizzes
+            }
+
+        self.progress = None
+        if self.request and self.request.user.is_authenticated:
+            progress = FastLessonProgressSerializer(self.context)
+            progress_rows = list(progress.values(LessonProgress.objects.filter(
+                student=self.request.user, lesson__in=[row[self.prefix + 'id'] for row in rows]
+            )))
+            self.progress = dict(zip(
+                [row['lesson'] for row in progress_rows], progress.serialize(progress_rows)
+            ))
+
+    def get_quiz(self, row):
+        quiz_id = row[self.prefix + 'quiz']
+        return None if quiz_id is None else self.quizzes[quiz_id]
+
+    def get_progress(self, row):
+        if self.progress is None:
+            return None
+        return self.progress.get(row[self.prefix + 'id'])
+
+
+class FastModuleSerializer(FastSerializer):
+    serializer_class = ModuleSerializer
+    method_columns = {'lessons': ['id']}
+
+    def prepare(self, rows):
+        lessons = FastLessonSerializer(self.context)
+        lesson_rows = list(Lesson.objects.filter(
+            module__in=[row[self.prefix + 'id'] for row in rows]
+        ).values(*lessons.columns, 'module'))
+        self.lessons = defaultdict(list)
+        for row, data in zip(lesson_rows, lessons.serialize(lesson_rows)):
+            self.lessons[row['module']].append(data)
+
+    def get_lessons(self, row):
+        return self.lessons[row[self.prefix + 'id']]
+
+
+class FastEnrollmentSerializer(FastSerializer):
+    serializer_class = EnrollmentSerializer
+    nested = {'student': FastUserSerializer, 'course': FastCourseListSerializer}
+    method_columns = {
+        'progress_percentage': ['is_completed', 'course__lesson_count', 'progress_percentage'],
+    }
+
+    def get_progress_percentage(self, row):
+        # EnrollmentSerializer.get_progress_percentage
+        if row[self.prefix + 'is_completed']:
+            return 100
+        if row[self.prefix + 'course__lesson_count'] == 0:
+            return 0
+        return row[self.prefix + 'progress_percentage']
@@ -0,0 +1,270 @@
+"""
+Sparse fieldsets (``?fields=``) and explicit expansion (``?expand=``) for
+the read serializers.
+
+``?fields=title,modules.title,modules.lessons.title`` limits every level
+of a response to the named fields; a dotted name reaches into a nested
+relation and expands it. ``?expand=category,modules.lessons`` renders the
+named relations as nested objects. Once either parameter is given,
+relations that are included but not expanded are rendered as primary keys
+(or lists of them). Without either parameter responses keep their full,
+fully expanded shape.
+
+``shape_queryset`` derives ``select_related``, ``prefetch_related`` and
+``defer`` from the same shape, so relations that are not rendered are not
+loaded, and unrequested text columns are not read.
+"""
+from importlib import import_module
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch, TextField
+from rest_framework import serializers
+
+
+class FieldShape:
+    """The requested fields and expanded relations of one serializer level"""
+
+    def __init__(self):
+        # None means every field of the serializer
+        self.fields = None
+        self.expanded = set()
+        self.children = {}
+
+    def includes(self, name):
+        return self.fields is None or name in self.fields
+
+    def expands(self, name):
+        return name in self.expanded
+
+    def child(self, name):
+        return self.children.get(name) or FieldShape()
+
+    def includes_path(self, path):
+        """Whether a dotted path (e.g. ``modules.lessons.progress``) is rendered at all"""
+        shape = self
+        names = path.split('.')
+        for index, name in enumerate(names):
+            if not shape.includes(name):
+                return False
+            if index < len(names) - 1 and not shape.expands(name):
+                return False
+            shape = shape.child(name)
+        return True
+
+    def _select(self, name):
+        if self.fields is None:
+            self.fields = set()
+        self.fields.add(name)
+
+    def _child_node(self, name):
+        if name not in self.children:
+            self.children[name] = FieldShape()
+        return self.children[name]
+
+
+class FullShape(FieldShape):
+    """The default shape: every field, every relation expanded"""
+
+    def expands(self, name):
+        return True
+
+    def child(self, name):
+        return self
+
+
+FULL = FullShape()
+
+
+def _paths(value):
+    return [path.strip() for path in (value or '').split(',') if path.strip()]
+
+
+def parse_shape(fields=None, expand=None):
+    """FieldShape for ``fields`` / ``expand`` query values; FULL when neither is given"""
+    if fields is None and expand is None:
+        return FULL
+    root = FieldShape()
+    for path in _paths(fields):
+        shape = root
+        *parents, leaf = path.split('.')
+        for name in parents:
+            shape._select(name)
+            shape.expanded.add(name)
+            shape = shape._child_node(name)
+        shape._select(leaf)
+    for path in _paths(expand):
+        shape = root
+        for name in path.split('.'):
+            # An expanded relation is rendered even if ``fields`` left it out
+            if shape.fields is not None:
+                shape.fields.add(name)
+            shape.expanded.add(name)
+            shape = shape._child_node(name)
+    return root
+
+
+def get_request_shape(request):
+    """The shape requested by a GET/HEAD request; writes always get the full shape"""
+    if request is None or request.method not in ('GET', 'HEAD'):
+        return FULL
+    params = getattr(request, 'query_params', request.GET)
+    return parse_shape(params.get('fields'), params.get('expand'))
+
+
+class ShapedSerializerMixin:
+    """
+    Renders a serializer in the requested shape.
+
+    ``expandable_fields`` maps each nested relation to (serializer class
+    name in this module, model lookup or None when the relation is not
+    loaded through the ORM). ``related_fields`` maps other fields to the
+    lookups they read through (e.g. ``category_name`` -> ``category``).
+    """
+    expandable_fields = {}
+    related_fields = {}
+
+    def __init__(self, *args, shape=None, **kwargs):
+        self._shape = shape
+        super().__init__(*args, **kwargs)
+
+    @property
+    def shape(self):
+        if self._shape is None:
+            node = self.parent if isinstance(self.parent, serializers.ListSerializer) else self
+            owner = node.parent
+            if owner is None:
+                self._shape = get_request_shape(self.context.get('request'))
+            else:
+                self._shape = getattr(owner, 'shape', FULL).child(node.field_name)
+        return self._shape
+
+    def expands(self, name):
+        return self.shape.expands(name)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        shape = self.shape
+        if shape is FULL:
+            return fields
+        if shape.fields is not None:
+            fields = {name: field for name, field in fields.items() if name in shape.fields}
+        for name, field in fields.items():
+            if name in self.expandable_fields and not shape.expands(name):
+                if isinstance(field, serializers.ListSerializer):
+                    fields[name] = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
+                elif isinstance(field, serializers.BaseSerializer):
+                    fields[name] = serializers.PrimaryKeyRelatedField(read_only=True)
+                # SerializerMethodFields collapse themselves through nested()
+        return fields
+
+    def nested(self, name, instance, many=False):
+        """Data for a relation rendered by a SerializerMethodField, or its primary key(s)"""
+        if not self.expands(name):
+            if many:
+                return [obj.pk for obj in instance]
+            return instance.pk if instance is not None else None
+        serializer_class = getattr(import_module(type(self).__module__), self.expandable_fields[name][0])
+        return serializer_class(
+            instance, many=many, context=self.context, shape=self.shape.child(name)
+        ).data
+
+
+def _relation(model, lookup):
+    try:
+        return model._meta.get_field(lookup)
+    except FieldDoesNotExist:
+        return None
+
+
+def _deferred_fields(serializer_class, shape, model):
+    """Text columns of the serializer that the shape leaves out"""
+    if shape.fields is None:
+        return []
+    return [
+        field.name for field in model._meta.concrete_fields
+        if isinstance(field, TextField)
+        and field.name in serializer_class.Meta.fields
+        and not shape.includes(field.name)
+    ]
+
+
+def get_related_lookups(serializer_class, shape, prefix='', joined=True):
+    """
+    (select_related, prefetch_related, defer) arguments for rendering
+    ``serializer_class`` in ``shape``; ``prefix`` is the lookup path to the
+    serialized model and ``joined`` whether it is reached through joins
+    (select_related) rather than a prefetch
+    """
+    model = serializer_class.Meta.model
+    module = import_module(serializer_class.__module__)
+    selects, prefetches = [], []
+    deferred = [prefix + name for name in _deferred_fields(serializer_class, shape, model)] if joined else []
+
+    for name, (child_name, lookup) in getattr(serializer_class, 'expandable_fields', {}).items():
+        relation = _relation(model, lookup) if lookup else None
+        if relation is None or not shape.includes(name):
+            continue
+        path = prefix + lookup
+        single = relation.many_to_one or relation.one_to_one
+        if not shape.expands(name):
+            if not relation.concrete:
+                # Only the primary keys are rendered
+                related = relation.related_model
+                queryset = related._default_manager.only(related._meta.pk.name, relation.field.name)
+                prefetches.append(Prefetch(path, queryset=queryset))
+            continue
+
+        child_class = getattr(module, child_name)
+        child_shape = shape.child(name)
+        if single and relation.concrete and joined:
+            selects.append(path)
+            child = get_related_lookups(child_class, child_shape, path + '__', joined=True)
+            selects += child[0]
+            prefetches += child[1]
+            deferred += child[2]
+        else:
+            child_deferred = _deferred_fields(child_class, child_shape, relation.related_model)
+            if child_deferred:
+                queryset = relation.related_model._default_manager.defer(*child_deferred)
+                prefetches.append(Prefetch(path, queryset=queryset))
+            else:
+                prefetches.append(path)
+            child = get_related_lookups(child_class, child_shape, path + '__', joined=False)
+            prefetches += child[0] + child[1]
+
+    seen = {lookup if isinstance(lookup, str) else lookup.prefetch_through for lookup in prefetches}
+    for name, lookups in getattr(serializer_class, 'related_fields', {}).items():
+        if not shape.includes(name):
+            continue
+        for lookup in lookups:
+            path = prefix + lookup
+            relation = _relation(model, lookup)
+            if joined and relation.concrete and (relation.many_to_one or relation.one_to_one):
+                if path not in selects:
+                    selects.append(path)
+            elif path not in seen:
+                seen.add(path)
+                prefetches.append(path)
+    return selects, prefetches, deferred
+
+
+def shape_queryset(queryset, serializer_class, request, through=None):
+    """
+    ``queryset`` with the joins, prefetches and deferred columns needed to
+    render it with ``serializer_class`` in the request's shape. With
+    ``through`` the serializer renders that relation of each row instead
+    (e.g. a course's ``modules``).
+    """
+    shape = get_request_shape(request)
+    if through is None:
+        selects, prefetches, deferred = get_related_lookups(serializer_class, shape)
+        queryset = queryset.defer(*deferred) if deferred else queryset
+        return queryset.select_related(*selects).prefetch_related(*prefetches)
+
+    model = serializer_class.Meta.model
+    deferred = _deferred_fields(serializer_class, shape, model)
+    through_lookup = (
+        Prefetch(through, queryset=model._default_manager.defer(*deferred)) if deferred else through
+    )
+    selects, prefetches, _ = get_related_lookups(serializer_class, shape, through + '__', joined=False)
+    return queryset.prefetch_related(through_lookup, *selects, *prefetches)
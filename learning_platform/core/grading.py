@@ -0,0 +1,186 @@
+"""
+Compiled answer keys for quiz grading.
+
+An answer key maps every question of a quiz (in question order) to its
+type, points, option ids and the ids (and, for short answers, the
+normalized texts) of its correct options. Keys are built with a single
+query, kept in a small in-process LRU and in the shared cache, and are
+keyed by ``Quiz.version`` so that editing a question or option (see
+core.signals) makes the old key unreachable.
+
+``pack_responses`` packs the answers of one attempt into a single array
+of little-endian uint32, one per question of the key: bits 0-29 are the
+selected options by position, bit 30 a free-text answer and bit 31 a
+correct answer. ``QuizResponseLayout`` records which question and
+options each position meant for a quiz version (core.item_analysis).
+"""
+import struct
+from collections import namedtuple
+from functools import lru_cache
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import QuizQuestion, QuizResponseLayout
+
+ANSWER_KEY_CACHE_TIMEOUT = 60 * 60 * 24
+
+# (quiz id, version) -> QuizResponseLayout id, in process
+LAYOUT_CACHE_SIZE = 256
+_layout_ids = {}
+
+# Bumped when the shape of a cached answer key changes
+ANSWER_KEY_FORMAT = 2
+
+# Packed response bits
+MAX_PACKED_OPTIONS = 30
+TEXT_ANSWER = 1 << 30
+CORRECT = 1 << 31
+
+QuestionKey = namedtuple(
+    'QuestionKey', ['question_type', 'points', 'options', 'correct_options', 'correct_texts']
+)
+GradeResult = namedtuple('GradeResult', ['score', 'earned_points', 'total_points', 'correct_questions'])
+
+
+def _normalize_text(text):
+    return ' '.join(str(text).split()).casefold()
+
+
+def build_answer_key(quiz_id):
+    """Compile the answer key of a quiz with one query"""
+    rows = QuizQuestion.objects.filter(quiz_id=quiz_id).order_by(
+        'order', 'id', 'options__order', 'options__id'
+    ).values_list(
+        'id', 'question_type', 'points', 'options__id', 'options__is_correct', 'options__option_text'
+    )
+    questions = {}
+    for question_id, question_type, points, option_id, is_correct, option_text in rows:
+        question = questions.setdefault(question_id, (question_type, points, [], set(), set()))
+        if option_id is not None:
+            question[2].append(option_id)
+            if is_correct:
+                question[3].add(option_id)
+                question[4].add(_normalize_text(option_text))
+
+    return {
+        question_id: QuestionKey(question_type, points, tuple(options), frozenset(correct), frozenset(texts))
+        for question_id, (question_type, points, options, correct, texts) in questions.items()
+    }
+
+
+@lru_cache(maxsize=256)
+def _cached_answer_key(quiz_id, version):
+    cache_key = f'quiz-answer-key:{ANSWER_KEY_FORMAT}:{quiz_id}:{version}'
+    answer_key = cache.get(cache_key)
+    if answer_key is None:
+        answer_key = build_answer_key(quiz_id)
+        cache.set(cache_key, answer_key, ANSWER_KEY_CACHE_TIMEOUT)
+    return answer_key
+
+
+def get_answer_key(quiz):
+    """Answer key for the current version of ``quiz``"""
+    return _cached_answer_key(quiz.pk, quiz.version)
+
+
+def _remember_layout(key, layout_id):
+    if len(_layout_ids) >= LAYOUT_CACHE_SIZE:
+        _layout_ids.clear()
+    _layout_ids[key] = layout_id
+
+
+def get_response_layout(quiz, answer_key):
+    """Stored id of the packed response layout of ``quiz``'s current version"""
+    key = (quiz.pk, quiz.version)
+    layout_id = _layout_ids.get(key)
+    if layout_id is None:
+        layout = [[question_id, list(question.options)] for question_id, question in answer_key.items()]
+        layout_id = QuizResponseLayout.objects.get_or_create(
+            quiz_id=quiz.pk, version=quiz.version, defaults={'questions': layout}
+        )[0].pk
+        # Only ids of committed rows are remembered; a rolled back one would dangle
+        transaction.on_commit(lambda: _remember_layout(key, layout_id))
+    return layout_id
+
+
+def _as_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _selected_options(answer):
+    """Option ids chosen in a submitted answer (``option_id`` or ``option_ids``)"""
+    values = answer.get('option_ids')
+    if values is None:
+        values = [answer.get('option_id')]
+    elif not isinstance(values, (list, tuple)):
+        values = [values]
+    return frozenset(pk for pk in map(_as_id, values) if pk is not None)
+
+
+def _is_correct(question, answer):
+    if question.question_type == 'short_answer':
+        text = answer.get('answer', answer.get('text'))
+        if text is not None:
+            return _normalize_text(text) in question.correct_texts
+        # Clients that render short answers as options submit an option id
+    return bool(question.correct_options) and _selected_options(answer) == question.correct_options
+
+
+def _submitted_answers(answer_key, answers):
+    """{question id: answer} of the answers to questions in the key (last wins)"""
+    submitted = {}
+    for answer in answers or []:
+        if not isinstance(answer, dict):
+            continue
+        question_id = _as_id(answer.get('question_id'))
+        if question_id in answer_key:
+            submitted[question_id] = answer
+    return submitted
+
+
+def grade_answers(answer_key, answers):
+    """
+    Grade submitted answers against a compiled answer key, in memory.
+
+    ``answers`` is the list posted to QuizViewSet.submit; answers to unknown
+    questions are ignored and a repeated question counts once (last wins).
+    Multiple choice and true/false questions are correct when the selected
+    options match the correct options exactly; short answers are compared
+    case-insensitively with the text of the correct options.
+    """
+    submitted = _submitted_answers(answer_key, answers)
+    total_points = sum(question.points for question in answer_key.values())
+    earned_points = 0
+    correct_questions = 0
+    for question_id, answer in submitted.items():
+        question = answer_key[question_id]
+        if _is_correct(question, answer):
+            earned_points += question.points
+            correct_questions += 1
+
+    score = round((earned_points / total_points) * 100) if total_points > 0 else 0
+    return GradeResult(score, earned_points, total_points, correct_questions)
+
+
+def pack_responses(answer_key, answers):
+    """The submitted answers as packed uint32 bytes, one value per question of the key"""
+    submitted = _submitted_answers(answer_key, answers)
+    values = []
+    for question_id, question in answer_key.items():
+        answer = submitted.get(question_id)
+        value = 0
+        if answer is not None:
+            selected = _selected_options(answer)
+            for position, option_id in enumerate(question.options[:MAX_PACKED_OPTIONS]):
+                if option_id in selected:
+                    value |= 1 << position
+            if question.question_type == 'short_answer' and answer.get('answer', answer.get('text')) is not None:
+                value |= TEXT_ANSWER
+            if _is_correct(question, answer):
+                value |= CORRECT
+        values.append(value)
+    return struct.pack(f'<{len(values)}I', *values)
@@ -0,0 +1,201 @@
+"""
+Item analysis of quiz questions from the packed attempt responses.
+
+Every attempt's answers are stored as one uint32 per question
+(core.grading.pack_responses). ``analyze_quiz`` loads the attempts of a
+quiz into one NumPy array per response layout (quiz version) and computes,
+with whole-array operations:
+
+- difficulty: the share of attempts answering the question correctly
+- discrimination index: difficulty in the top 27% of attempts by score
+  minus difficulty in the bottom 27%
+- per option: the share of attempts selecting it, and the same
+  upper-minus-lower difference (a distractor chosen more by strong
+  students than weak ones usually means a badly worded question)
+
+Counts from different versions of a quiz are added up per question and
+option id. ``refresh_item_analysis`` stores the result in
+QuizItemAnalysis; it runs as the ``quizzes.item_analysis`` job.
+"""
+import numpy as np
+from django.utils import timezone
+
+from .grading import CORRECT, MAX_PACKED_OPTIONS
+from .models import QuizAttempt, QuizItemAnalysis, QuizQuestion, QuizResponseLayout
+
+# Share of attempts in each of the upper and lower score groups
+GROUP_FRACTION = 0.27
+
+# Difficulty / discrimination limits for flagging questions
+TOO_EASY = 0.9
+TOO_HARD = 0.3
+LOW_DISCRIMINATION = 0.2
+
+FETCH_CHUNK_SIZE = 5000
+
+
+def load_responses(quiz_id):
+    """{layout id: (scores, responses)}: float scores and a (attempts, questions) uint32 array"""
+    blobs = {}
+    scores = {}
+    rows = (
+        QuizAttempt.objects.filter(quiz_id=quiz_id, layout__isnull=False, responses__isnull=False)
+        .order_by().values_list('layout_id', 'score', 'responses')
+        .iterator(chunk_size=FETCH_CHUNK_SIZE)
+    )
+    for layout_id, score, responses in rows:
+        blobs.setdefault(layout_id, []).append(bytes(responses))
+        scores.setdefault(layout_id, []).append(score or 0)
+
+    loaded = {}
+    for layout_id, layout_blobs in blobs.items():
+        width = len(layout_blobs[0])
+        kept = [index for index, blob in enumerate(layout_blobs) if len(blob) == width]
+        if len(kept) < len(layout_blobs):
+            layout_blobs = [layout_blobs[index] for index in kept]
+        layout_scores = np.asarray(scores[layout_id], dtype=np.float64)[kept]
+        responses = np.frombuffer(b''.join(layout_blobs), dtype='<u4').reshape(len(layout_blobs), width // 4)
+        loaded[layout_id] = (layout_scores, responses)
+    return loaded
+
+
+def _score_groups(loaded):
+    """{layout id: (upper mask, lower mask)} for the top and bottom GROUP_FRACTION of all attempts"""
+    layout_ids = list(loaded)
+    scores = np.concatenate([loaded[layout_id][0] for layout_id in layout_ids])
+    size = max(int(round(len(scores) * GROUP_FRACTION)), 1)
+    order = np.argsort(scores, kind='stable')
+    upper = np.zeros(len(scores), dtype=bool)
+    lower = np.zeros(len(scores), dtype=bool)
+    upper[order[-size:]] = True
+    lower[order[:size]] = True
+
+    groups = {}
+    start = 0
+    for layout_id in layout_ids:
+        end = start + len(loaded[layout_id][0])
+        groups[layout_id] = (upper[start:end], lower[start:end])
+        start = end
+    return groups, int(upper.sum()), int(lower.sum())
+
+
+def _rate(count, total):
+    return round(count / total, 4) if total else None
+
+
+def analyze_quiz(quiz_id):
+    """Item analysis of every question of a quiz that has packed attempt responses"""
+    loaded = load_responses(quiz_id)
+    if not loaded:
+        return {'attempts': 0, 'questions': []}
+    groups, upper_size, lower_size = _score_groups(loaded)
+    layouts = dict(QuizResponseLayout.objects.filter(pk__in=loaded).values_list('pk', 'questions'))
+
+    # question id -> summed counts; option counts are [selected, upper, lower]
+    questions = {}
+    for layout_id, (scores, responses) in loaded.items():
+        upper, lower = groups[layout_id]
+        correct = (responses & CORRECT) != 0
+        answered = responses != 0
+        correct_counts = correct.sum(axis=0)
+        upper_correct = correct[upper].sum(axis=0)
+        lower_correct = correct[lower].sum(axis=0)
+        answered_counts = answered.sum(axis=0)
+        upper_count, lower_count = int(upper.sum()), int(lower.sum())
+
+        positions = min(max((len(options) for _, options in layouts[layout_id]), default=0), MAX_PACKED_OPTIONS)
+        option_counts = []
+        for position in range(positions):
+            selected = (responses >> np.uint32(position)) & np.uint32(1)
+            option_counts.append((
+                selected.sum(axis=0), selected[upper].sum(axis=0), selected[lower].sum(axis=0)
+            ))
+
+        for column, (question_id, option_ids) in enumerate(layouts[layout_id]):
+            question = questions.setdefault(question_id, {
+                'attempts': 0, 'correct': 0, 'answered': 0, 'upper': 0, 'upper_correct': 0,
+                'lower': 0, 'lower_correct': 0, 'options': {},
+            })
+            question['attempts'] += len(scores)
+            question['correct'] += int(correct_counts[column])
+            question['answered'] += int(answered_counts[column])
+            question['upper'] += upper_count
+            question['upper_correct'] += int(upper_correct[column])
+            question['lower'] += lower_count
+            question['lower_correct'] += int(lower_correct[column])
+            for position, option_id in enumerate(option_ids[:MAX_PACKED_OPTIONS]):
+                counts = question['options'].setdefault(option_id, [0, 0, 0, 0, 0, 0])
+                selected, selected_upper, selected_lower = option_counts[position]
+                counts[0] += int(selected[column])
+                counts[1] += int(selected_upper[column])
+                counts[2] += int(selected_lower[column])
+                counts[3] += len(scores)
+                counts[4] += upper_count
+                counts[5] += lower_count
+
+    current = {
+        question.pk: question
+        for question in QuizQuestion.objects.filter(quiz_id=quiz_id).prefetch_related('options')
+    }
+    ordered = sorted(
+        questions, key=lambda pk: (pk not in current, current[pk].order if pk in current else 0, pk)
+    )
+    results = []
+    for question_id in ordered:
+        counts = questions[question_id]
+        question = current.get(question_id)
+        options = {option.pk: option for option in question.options.all()} if question else {}
+        difficulty = _rate(counts['correct'], counts['attempts'])
+        upper_rate = _rate(counts['upper_correct'], counts['upper'])
+        lower_rate = _rate(counts['lower_correct'], counts['lower'])
+        discrimination = round(upper_rate - lower_rate, 4) if upper_rate is not None and lower_rate is not None else None
+
+        option_results = []
+        for option_id, (selected, selected_upper, selected_lower, total, upper, lower) in counts['options'].items():
+            option = options.get(option_id)
+            upper_share, lower_share = _rate(selected_upper, upper), _rate(selected_lower, lower)
+            option_results.append({
+                'option_id': option_id,
+                'option_text': option.option_text if option else None,
+                'is_correct': option.is_correct if option else None,
+                'selection_rate': _rate(selected, total),
+                'discrimination': (
+                    round(upper_share - lower_share, 4)
+                    if upper_share is not None and lower_share is not None else None
+                ),
+            })
+
+        flags = []
+        if difficulty is not None and difficulty >= TOO_EASY:
+            flags.append('too_easy')
+        if difficulty is not None and difficulty <= TOO_HARD:
+            flags.append('too_hard')
+        if discrimination is not None and discrimination < LOW_DISCRIMINATION:
+            flags.append('low_discrimination')
+        if any(not option['is_correct'] and (option['discrimination'] or 0) > 0 for option in option_results
+               if option['is_correct'] is not None):
+            flags.append('distractor_favoured_by_upper_group')
+
+        results.append({
+            'question_id': question_id,
+            'question_text': question.question_text if question else None,
+            'attempts': counts['attempts'],
+            'difficulty': difficulty,
+            'discrimination': discrimination,
+            'omitted_rate': _rate(counts['attempts'] - counts['answered'], counts['attempts']),
+            'options': option_results,
+            'flags': flags,
+        })
+
+    attempts = sum(len(scores) for scores, _ in loaded.values())
+    return {'attempts': attempts, 'upper_group': upper_size, 'lower_group': lower_size, 'questions': results}
+
+
+def refresh_item_analysis(quiz_id):
+    """Analyze a quiz and store the result; returns the stored QuizItemAnalysis"""
+    results = analyze_quiz(quiz_id)
+    analysis, _ = QuizItemAnalysis.objects.update_or_create(
+        quiz_id=quiz_id,
+        defaults={'attempts': results['attempts'], 'results': results, 'analyzed_at': timezone.now()},
+    )
+    return analysis
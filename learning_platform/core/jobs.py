@@ -0,0 +1,259 @@
+"""
+Background jobs stored in the database.
+
+``enqueue`` inserts a Job row naming a registered task (``@task``, see
+core.tasks) and its keyword arguments, so a view can hand off slow work
+and return straight away. ``manage.py run_worker`` runs a ``Worker``:
+it claims due jobs and runs them in a thread or process pool.
+
+Jobs are claimed with ``SELECT ... FOR UPDATE SKIP LOCKED`` where the
+database supports it (PostgreSQL), so any number of workers can poll the
+same table without blocking each other or taking the same job. SQLite
+has no row locks; there each job is claimed with a conditional UPDATE
+(``status = 'queued'``), which only one worker can win. A failed job is
+retried with exponential backoff until ``max_attempts`` runs have
+failed. A job left running by a worker that died is queued again once it
+has been locked for longer than the stale timeout.
+"""
+import inspect
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+import traceback
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+import django
+from django.db import close_old_connections, connection, connections, transaction
+from django.db.models import Avg, Count, F, Min
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ATTEMPTS = 3
+
+# Retry n waits RETRY_BACKOFF_SECONDS * 2 ** (n - 1), at most MAX_BACKOFF_SECONDS
+RETRY_BACKOFF_SECONDS = 30
+MAX_BACKOFF_SECONDS = 3600
+
+# Running jobs locked for longer than this are assumed lost with their worker
+DEFAULT_STALE_SECONDS = 3600
+
+DEFAULT_POLL_SECONDS = 2
+
+TASKS = {}
+
+
+class JobError(ValueError):
+    """Invalid job request; raised by a task, it fails the job without retries"""
+
+
+def task(name):
+    """Register the decorated function as the task ``name``; it is called with the job's payload"""
+    def register(func):
+        TASKS[name] = func
+        return func
+    return register
+
+
+def enqueue(task_name, payload=None, delay=0, max_attempts=DEFAULT_MAX_ATTEMPTS, created_by=None):
+    """Queue a run of ``task_name(**payload)``, ``delay`` seconds from now at the earliest"""
+    if task_name not in TASKS:
+        raise JobError(f'Unknown task {task_name!r}; choose from {", ".join(sorted(TASKS))}')
+    if payload is not None and not isinstance(payload, dict):
+        raise JobError('payload must be an object of task arguments')
+    try:
+        inspect.signature(TASKS[task_name]).bind(**(payload or {}))
+    except TypeError as e:
+        raise JobError(f'Invalid payload for {task_name}: {e}')
+    return Job.objects.create(
+        task=task_name,
+        payload=payload or {},
+        max_attempts=max(max_attempts, 1),
+        run_after=timezone.now() + timedelta(seconds=delay),
+        created_by=created_by,
+    )
+
+
+def retry_delay(attempts):
+    """Seconds before the retry that follows failed run number ``attempts``"""
+    return min(RETRY_BACKOFF_SECONDS * 2 ** (attempts - 1), MAX_BACKOFF_SECONDS)
+
+
+def claim_jobs(worker, limit):
+    """Mark up to ``limit`` due jobs as running for ``worker``; returns their ids, oldest first"""
+    if limit < 1:
+        return []
+    now = timezone.now()
+    due = Job.objects.filter(status=Job.QUEUED, run_after__lte=now).order_by('run_after', 'id')
+    claimed = {
+        'status': Job.RUNNING, 'locked_by': worker, 'locked_at': now, 'started_at': now,
+        'attempts': F('attempts') + 1,
+    }
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(due.select_for_update(skip_locked=True).values_list('pk', flat=True)[:limit])
+            Job.objects.filter(pk__in=ids).update(**claimed)
+        return ids
+
+    # No row locks: take each candidate only if it is still queued
+    ids = []
+    for pk in due.values_list('pk', flat=True)[:limit]:
+        if Job.objects.filter(pk=pk, status=Job.QUEUED).update(**claimed):
+            ids.append(pk)
+    return ids
+
+
+def run_job(job_id, worker):
+    """Run a claimed job and record the outcome: 'succeeded', 'retried' or 'failed'"""
+    close_old_connections()
+    try:
+        job = Job.objects.get(pk=job_id)
+        func = TASKS.get(job.task)
+        try:
+            if func is None:
+                raise JobError(f'Unknown task {job.task!r}')
+            result = func(**job.payload)
+        except Exception as e:
+            error = traceback.format_exc()
+            logger.warning('Job %s (%s) failed on attempt %s:\n%s', job.pk, job.task, job.attempts, error)
+            now = timezone.now()
+            if job.attempts < job.max_attempts and not isinstance(e, JobError):
+                outcome = 'retried'
+                changes = {
+                    'status': Job.QUEUED,
+                    'run_after': now + timedelta(seconds=retry_delay(job.attempts)),
+                }
+            else:
+                outcome = 'failed'
+                changes = {'status': Job.FAILED}
+            changes.update(last_error=error, finished_at=now, locked_by='', locked_at=None)
+        else:
+            outcome = 'succeeded'
+            changes = {
+                'status': Job.SUCCEEDED, 'result': result, 'finished_at': timezone.now(),
+                'locked_by': '', 'locked_at': None,
+            }
+        # A job requeued as stale meanwhile belongs to another worker now
+        Job.objects.filter(pk=job.pk, status=Job.RUNNING, locked_by=worker).update(**changes)
+        return outcome
+    finally:
+        close_old_connections()
+
+
+def requeue_stale_jobs(stale_seconds=DEFAULT_STALE_SECONDS):
+    """Queue again (or fail, when out of attempts) jobs locked for longer than ``stale_seconds``"""
+    now = timezone.now()
+    stale = Job.objects.filter(status=Job.RUNNING, locked_at__lt=now - timedelta(seconds=stale_seconds))
+    released = {'locked_by': '', 'locked_at': None, 'last_error': 'The worker stopped while running the job'}
+    requeued = stale.filter(attempts__lt=F('max_attempts')).update(status=Job.QUEUED, run_after=now, **released)
+    failed = stale.update(status=Job.FAILED, finished_at=now, **released)
+    return requeued, failed
+
+
+def queue_stats():
+    """Job counts per status, the age of the oldest due job and per-task totals"""
+    now = timezone.now()
+    by_status = dict(Job.objects.order_by().values_list('status').annotate(Count('pk')))
+    oldest = Job.objects.filter(status=Job.QUEUED, run_after__lte=now).aggregate(oldest=Min('run_after'))['oldest']
+    tasks = {}
+    for row in Job.objects.order_by().values('task', 'status').annotate(jobs=Count('pk')):
+        tasks.setdefault(row['task'], {})[row['status']] = row['jobs']
+    durations = (
+        Job.objects.filter(status=Job.SUCCEEDED).order_by().values('task')
+        .annotate(average=Avg(F('finished_at') - F('started_at')))
+    )
+    for row in durations:
+        if row['average'] is not None:
+            tasks[row['task']]['average_seconds'] = round(row['average'].total_seconds(), 3)
+    return {
+        'jobs': {status: by_status.get(status, 0) for status, _ in Job.STATUS_CHOICES},
+        'oldest_due_seconds': round((now - oldest).total_seconds(), 1) if oldest else None,
+        'tasks': tasks,
+    }
+
+
+class Worker:
+    """
+    Polls for due jobs and runs up to ``concurrency`` at once in a thread
+    or process pool. With ``burst`` it stops once the queue is empty.
+    """
+
+    def __init__(self, concurrency=1, pool='thread', poll_seconds=DEFAULT_POLL_SECONDS,
+                 stale_seconds=DEFAULT_STALE_SECONDS, burst=False):
+        self.concurrency = max(concurrency, 1)
+        self.pool = pool
+        self.poll_seconds = poll_seconds
+        self.stale_seconds = stale_seconds
+        self.burst = burst
+        self.name = f'{socket.gethostname()}:{os.getpid()}'
+        self.stats = Counter()
+        self.task_seconds = Counter()
+        self._stopping = threading.Event()
+
+    def stop(self, *args):
+        """Claim no more jobs; the running ones are finished first"""
+        self._stopping.set()
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['task_seconds'] = {name: round(seconds, 3) for name, seconds in self.task_seconds.items()}
+        return stats
+
+    def make_executor(self):
+        if self.pool == 'process':
+            # Children open their own connections
+            connections.close_all()
+            return ProcessPoolExecutor(max_workers=self.concurrency, initializer=django.setup)
+        return ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='job')
+
+    def collect(self, done, running):
+        for future in done:
+            job_id, task_name, started = running.pop(future)
+            self.task_seconds[task_name] += time.monotonic() - started
+            try:
+                self.stats[future.result()] += 1
+            except Exception:
+                logger.exception('Recording the outcome of job %s failed', job_id)
+                self.stats['errors'] += 1
+
+    def run(self, install_signal_handlers=True):
+        if install_signal_handlers:
+            signal.signal(signal.SIGTERM, self.stop)
+            signal.signal(signal.SIGINT, self.stop)
+        running = {}
+        last_stale_check = 0
+        with self.make_executor() as executor:
+            while not self._stopping.is_set():
+                if time.monotonic() - last_stale_check >= min(self.stale_seconds, 60):
+                    requeued, failed = requeue_stale_jobs(self.stale_seconds)
+                    self.stats['stale_requeued'] += requeued
+                    self.stats['stale_failed'] += failed
+                    last_stale_check = time.monotonic()
+
+                ids = claim_jobs(self.name, self.concurrency - len(running))
+                tasks = dict(Job.objects.filter(pk__in=ids).values_list('pk', 'task')) if ids else {}
+                for job_id in ids:
+                    future = executor.submit(run_job, job_id, self.name)
+                    running[future] = (job_id, tasks[job_id], time.monotonic())
+                self.stats['claimed'] += len(ids)
+
+                if not running:
+                    if self.burst and not ids:
+                        break
+                    self._stopping.wait(self.poll_seconds)
+                    continue
+                # Poll again as soon as a slot frees up, or after poll_seconds
+                timeout = 0 if ids and len(running) < self.concurrency else self.poll_seconds
+                done, _ = wait(list(running), timeout=timeout, return_when=FIRST_COMPLETED)
+                self.collect(done, running)
+
+            done, _ = wait(list(running))
+            self.collect(done, running)
+        return self.get_stats()
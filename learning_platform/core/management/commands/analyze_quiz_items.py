@@ -0,0 +1,43 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.item_analysis import refresh_item_analysis
+from core.models import Quiz
+
+
+class Command(BaseCommand):
+    help = (
+        'Compute and store the item analysis (difficulty, discrimination and option '
+        'selection rates per question) of quizzes from their attempts\' stored responses.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('quiz_ids', nargs='*', type=int, help='Quiz ids (default: every quiz)')
+        parser.add_argument('--json', action='store_true', help='Print the analysis as JSON')
+
+    def handle(self, *args, **options):
+        quizzes = Quiz.objects.order_by('pk')
+        if options['quiz_ids']:
+            quizzes = quizzes.filter(pk__in=options['quiz_ids'])
+            missing = set(options['quiz_ids']) - set(quizzes.values_list('pk', flat=True))
+            if missing:
+                raise CommandError(f'Unknown quizzes: {", ".join(map(str, sorted(missing)))}')
+
+        for quiz in quizzes:
+            started = time.perf_counter()
+            analysis = refresh_item_analysis(quiz.pk)
+            seconds = time.perf_counter() - started
+            if options['json']:
+                self.stdout.write(json.dumps({'quiz': quiz.pk, **analysis.results}, indent=2))
+                continue
+            self.stdout.write(self.style.SUCCESS(
+                f'{quiz.title} (quiz {quiz.pk}): {analysis.attempts} attempt(s) analyzed in {seconds:.2f}s'
+            ))
+            for question in analysis.results['questions']:
+                flags = f' [{", ".join(question["flags"])}]' if question['flags'] else ''
+                self.stdout.write(
+                    f'  question {question["question_id"]}: difficulty {question["difficulty"]}, '
+                    f'discrimination {question["discrimination"]}, omitted {question["omitted_rate"]}{flags}'
+                )
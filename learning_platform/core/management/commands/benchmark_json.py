@@ -0,0 +1,80 @@
+import io
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from rest_framework import parsers, renderers
+
+from core import parsers as core_parsers, renderers as core_renderers
+from core.models import Course
+from core.serializers import CourseDetailSerializer
+
+
+def throughput(func, payload, iterations):
+    """Calls per second of ``func(payload)``"""
+    func(payload)
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func(payload)
+    elapsed = time.perf_counter() - started
+    return iterations / elapsed
+
+
+class Command(BaseCommand):
+    help = (
+        'Micro-benchmark JSON rendering and parsing of a large course tree with DRF\'s '
+        'stdlib renderer/parser and the project\'s (orjson when installed).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--course', help='Course slug (default: the course with the most lessons)')
+        parser.add_argument(
+            '--copies',
+            type=int,
+            default=10,
+            help='Repeat the course\'s modules this many times to make a larger tree (default 10)',
+        )
+        parser.add_argument('--iterations', type=int, default=200, help='Timed runs of each (default 200)')
+
+    def handle(self, *args, **options):
+        courses = Course.objects.all()
+        if options['course']:
+            courses = courses.filter(slug=options['course'])
+        course = courses.annotate(lessons=Count('modules__lessons')).order_by('-lessons').first()
+        if course is None:
+            raise CommandError('No such course')
+
+        data = dict(CourseDetailSerializer(course, context={}).data)
+        data['modules'] = list(data['modules']) * max(options['copies'], 1)
+        lessons = sum(len(module['lessons']) for module in data['modules'])
+
+        stdlib_renderer = renderers.JSONRenderer()
+        project_renderer = core_renderers.JSONRenderer()
+        body = stdlib_renderer.render(data)
+        same = project_renderer.render(data) == body
+        self.stdout.write(
+            f'{course.slug}: {len(data["modules"])} modules, {lessons} lessons, '
+            f'{len(body) / 1024:.0f} KB of JSON; orjson '
+            f'{"installed" if core_renderers.orjson is not None else "not installed"}; '
+            f'identical output: {"yes" if same else "NO"}'
+        )
+
+        context = {'encoding': 'utf-8'}
+        cases = [
+            ('render', stdlib_renderer.render, project_renderer.render, data),
+            (
+                'parse',
+                lambda raw: parsers.JSONParser().parse(io.BytesIO(raw), parser_context=context),
+                lambda raw: core_parsers.JSONParser().parse(io.BytesIO(raw), parser_context=context),
+                body,
+            ),
+        ]
+        self.stdout.write(f'{"":<8}{"stdlib/s":>12}{"project/s":>12}{"MB/s":>10}{"speedup":>10}')
+        for label, baseline, candidate, payload in cases:
+            baseline_rate = throughput(baseline, payload, options['iterations'])
+            candidate_rate = throughput(candidate, payload, options['iterations'])
+            megabytes = candidate_rate * len(body) / 1024 / 1024
+            self.stdout.write(
+                f'{label:<8}{baseline_rate:>12.1f}{candidate_rate:>12.1f}{megabytes:>10.1f}'
+                f'{candidate_rate / baseline_rate:>9.1f}x'
+            )
@@ -0,0 +1,192 @@
+import asyncio
+import statistics
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+DEFAULT_PATHS = ['/api/courses/']
+
+
+def read_rss_kb(pid):
+    """Resident memory of a process and all its descendants (e.g. a server master and its workers)"""
+    total = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            for line in Path(f'/proc/{current}/status').read_text().splitlines():
+                if line.startswith('VmRSS:'):
+                    total += int(line.split()[1])
+            for task in Path(f'/proc/{current}/task').iterdir():
+                pending += [int(child) for child in (task / 'children').read_text().split()]
+        except (OSError, ValueError):
+            continue
+    return total
+
+
+async def read_body(reader, headers, slow_seconds):
+    """Read a response body, in small pieces with pauses if the client is slow"""
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if not size:
+                return
+    remaining = int(headers.get('content-length', 0))
+    while remaining:
+        chunk = await reader.readexactly(min(remaining, 4096))
+        remaining -= len(chunk)
+        if slow_seconds and remaining:
+            await asyncio.sleep(slow_seconds)
+
+
+async def send_request(reader, writer, request, slow_seconds):
+    """(status, keep-alive) for one GET on an open connection"""
+    if slow_seconds:
+        # Trickle the request like a client on a poor connection
+        middle = len(request) // 2
+        writer.write(request[:middle])
+        await writer.drain()
+        await asyncio.sleep(slow_seconds)
+        writer.write(request[middle:])
+    else:
+        writer.write(request)
+    await writer.drain()
+
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionResetError('Connection closed by the server')
+    status = int(status_line.split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    await read_body(reader, headers, slow_seconds)
+    return status, headers.get('connection', '').lower() != 'close'
+
+
+async def client(base_url, paths, headers, deadline, slow_seconds, results):
+    parts = urlsplit(base_url)
+    host, port = parts.hostname, parts.port or 80
+    requests = [
+        '\r\n'.join([f'GET {path} HTTP/1.1', f'Host: {parts.netloc}', *headers, '', '']).encode()
+        for path in paths
+    ]
+    reader = writer = None
+    index = 0
+    while time.monotonic() < deadline:
+        request = requests[index % len(requests)]
+        index += 1
+        started = time.monotonic()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            status, keep_alive = await send_request(reader, writer, request, slow_seconds)
+        except (OSError, ValueError, IndexError, asyncio.IncompleteReadError):
+            results['errors'] += 1
+            keep_alive = False
+            await asyncio.sleep(0.05)
+        else:
+            results['latencies'].append(time.monotonic() - started)
+            if status >= 400:
+                results['errors'] += 1
+        if not keep_alive and writer is not None:
+            writer.close()
+            reader = writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def sample_memory(pid, deadline, results):
+    while time.monotonic() < deadline:
+        results['peak_rss_kb'] = max(results['peak_rss_kb'], read_rss_kb(pid))
+        await asyncio.sleep(0.5)
+
+
+async def run_load(base_url, paths, headers, connections, duration, slow_seconds, pid):
+    results = {'latencies': [], 'errors': 0, 'peak_rss_kb': 0}
+    deadline = time.monotonic() + duration
+    tasks = [
+        client(base_url, paths, headers, deadline, slow_seconds, results)
+        for _ in range(connections)
+    ]
+    if pid:
+        tasks.append(sample_memory(pid, deadline, results))
+    started = time.monotonic()
+    await asyncio.gather(*tasks)
+    results['elapsed'] = time.monotonic() - started
+    return results
+
+
+class Command(BaseCommand):
+    help = (
+        'Load-test the sync (gunicorn/WSGI) and async (uvicorn/ASGI) deployments of the '
+        'read endpoints with many concurrent, optionally slow, keep-alive clients and '
+        'report throughput, latency percentiles, errors and server memory.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sync-url', help='Base URL of the WSGI server, e.g. http://127.0.0.1:8000')
+        parser.add_argument('--async-url', help='Base URL of the ASGI server, e.g. http://127.0.0.1:8001')
+        parser.add_argument('--sync-pid', type=int, help='PID of the WSGI master, to sample its memory')
+        parser.add_argument('--async-pid', type=int, help='PID of the ASGI master, to sample its memory')
+        parser.add_argument(
+            '--path',
+            action='append',
+            dest='paths',
+            default=[],
+            help=f'Path to request (repeat for several; default {", ".join(DEFAULT_PATHS)})',
+        )
+        parser.add_argument('--connections', type=int, default=200, help='Concurrent clients (default 200)')
+        parser.add_argument('--duration', type=float, default=20, help='Seconds per server (default 20)')
+        parser.add_argument(
+            '--slow-ms',
+            type=int,
+            default=0,
+            help='Pause in ms while sending each request and between 4 KB reads of the response',
+        )
+        parser.add_argument('--token', help='API token, to benchmark authenticated requests')
+
+    def handle(self, *args, **options):
+        targets = [
+            (label, options[f'{label}_url'], options[f'{label}_pid'])
+            for label in ('sync', 'async')
+            if options[f'{label}_url']
+        ]
+        if not targets:
+            raise CommandError('Give --sync-url and/or --async-url')
+
+        headers = ['Accept: application/json']
+        if options['token']:
+            headers.append(f'Authorization: Token {options["token"]}')
+        paths = options['paths'] or DEFAULT_PATHS
+        slow_seconds = options['slow_ms'] / 1000
+
+        self.stdout.write(
+            f'{options["connections"]} connections for {options["duration"]:g}s each, '
+            f'slow client pause {options["slow_ms"]} ms, paths: {", ".join(paths)}'
+        )
+        self.stdout.write(
+            f'{"server":<8}{"requests":>10}{"req/s":>10}{"p50 ms":>10}{"p95 ms":>10}'
+            f'{"p99 ms":>10}{"errors":>8}{"peak RSS MB":>13}'
+        )
+        for label, url, pid in targets:
+            results = asyncio.run(run_load(
+                url, paths, headers, options['connections'], options['duration'], slow_seconds, pid
+            ))
+            latencies = sorted(results['latencies'])
+            if len(latencies) >= 2:
+                centiles = statistics.quantiles(latencies, n=100)
+                p50, p95, p99 = (centiles[i - 1] * 1000 for i in (50, 95, 99))
+            else:
+                p50 = p95 = p99 = 0
+            rss = f'{results["peak_rss_kb"] / 1024:.0f}' if pid else '-'
+            self.stdout.write(
+                f'{label:<8}{len(latencies):>10}{len(latencies) / results["elapsed"]:>10.1f}'
+                f'{p50:>10.1f}{p95:>10.1f}{p99:>10.1f}{results["errors"]:>8}{rss:>13}'
+            )
@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand, CommandError
+from core.cohorts import DEFAULT_BATCH_SIZE, bulk_enroll, get_cohort_courses, read_identifiers_csv
+
+
+class Command(BaseCommand):
+    help = (
+        'Enroll a cohort of students, given by email or user id on the command line '
+        'or in a CSV file, in one or more courses.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('students', nargs='*', help='Student emails or user ids')
+        parser.add_argument(
+            '--course',
+            action='append',
+            dest='courses',
+            default=[],
+            help='Course slug (repeat for several courses)',
+        )
+        parser.add_argument(
+            '--csv',
+            help='CSV file with an email or user_id column (or the identifiers in the first column)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f'Rows per INSERT (default {DEFAULT_BATCH_SIZE})',
+        )
+
+    def handle(self, *args, **options):
+        courses, errors = get_cohort_courses(options['courses'])
+        for slug, error in errors.items():
+            self.stderr.write(f'{slug}: {error}')
+        if errors or not courses:
+            raise CommandError('Give one or more published course slugs with --course')
+
+        students = list(options['students'])
+        if options['csv']:
+            try:
+                with open(options['csv'], encoding='utf-8-sig', newline='') as csv_file:
+                    students += read_identifiers_csv(csv_file.read())
+            except OSError as e:
+                raise CommandError(f'Cannot read {options["csv"]}: {e}')
+        if not students:
+            raise CommandError('No students given')
+
+        summary = bulk_enroll(students, courses, batch_size=options['batch_size'])
+
+        for result in summary['results']:
+            if result['status'] in ('invalid', 'not_found', 'duplicate'):
+                self.stdout.write(f'Row {result["row"]} ({result["identifier"]}): {result["status"]}')
+
+        totals = summary['totals']
+        self.stdout.write(self.style.SUCCESS(
+            f'{totals["enrollments_created"]} enrollment(s) created for {totals["rows"]} row(s) in '
+            f'{", ".join(summary["courses"])}: ' +
+            ', '.join(f'{count} {name}' for name, count in totals.items() if name not in ('rows', 'enrollments_created'))
+        ))
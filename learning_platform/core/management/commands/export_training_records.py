@@ -0,0 +1,80 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.cohorts import read_identifiers_csv
+from core.exports import DEFAULT_CHUNK_SIZE, EXPORTS, FORMATS, ExportError, export_chunks
+
+
+class Command(BaseCommand):
+    help = (
+        'Stream enrollments, lesson progress or quiz attempts, with student and course '
+        'columns, as CSV or NDJSON to a file or stdout.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=list(EXPORTS), help='What to export')
+        parser.add_argument('--format', dest='export_format', choices=list(FORMATS), default='csv')
+        parser.add_argument(
+            '--course',
+            action='append',
+            dest='courses',
+            default=[],
+            help='Course slug (repeat for several courses)',
+        )
+        parser.add_argument('--from', dest='date_from', help='First day, YYYY-MM-DD')
+        parser.add_argument('--to', dest='date_to', help='Last day, YYYY-MM-DD')
+        parser.add_argument(
+            '--user',
+            action='append',
+            dest='users',
+            default=[],
+            help='Student email or user id (repeat for several)',
+        )
+        parser.add_argument(
+            '--users-csv',
+            help='CSV file with an email or user_id column (or the identifiers in the first column)',
+        )
+        parser.add_argument('--output', '-o', help='File to write (default stdout)')
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help=f'Rows fetched and written at a time (default {DEFAULT_CHUNK_SIZE})',
+        )
+
+    def handle(self, *args, **options):
+        users = list(options['users'])
+        if options['users_csv']:
+            try:
+                with open(options['users_csv'], encoding='utf-8-sig', newline='') as csv_file:
+                    users += read_identifiers_csv(csv_file.read())
+            except OSError as e:
+                raise CommandError(f'Cannot read {options["users_csv"]}: {e}')
+
+        try:
+            chunks = export_chunks(
+                options['kind'],
+                options['export_format'],
+                chunk_size=max(options['chunk_size'], 1),
+                courses=options['courses'],
+                date_from=options['date_from'],
+                date_to=options['date_to'],
+                users=users,
+            )
+        except ExportError as e:
+            raise CommandError(str(e))
+
+        output = open(options['output'], 'wb') if options['output'] else sys.stdout.buffer
+        try:
+            written = 0
+            for chunk in chunks:
+                output.write(chunk)
+                written += len(chunk)
+        finally:
+            if options['output']:
+                output.close()
+            else:
+                output.flush()
+        if options['output']:
+            self.stderr.write(f'Wrote {written / 1024:.0f} KB to {options["output"]}')
@@ -0,0 +1,66 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from core.certificates import KINDS, completed_enrollments, generate_certificates
+from core.cohorts import read_identifiers_csv, resolve_users, split_identifier
+
+
+class Command(BaseCommand):
+    help = (
+        'Render the completion certificates and wallet cards of completed enrollments '
+        'in a process pool. PDFs already stored under MEDIA_ROOT are not rendered again.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--course', action='append', default=[], help='Course slug (repeatable)')
+        parser.add_argument('--user', action='append', default=[], help='Student email or user id (repeatable)')
+        parser.add_argument('--users-csv', help='CSV of students (an email or user_id column)')
+        parser.add_argument('--since', help='Only enrollments completed on or after this date (YYYY-MM-DD)')
+        parser.add_argument(
+            '--kind',
+            action='append',
+            choices=list(KINDS),
+            help='certificate and/or wallet-card (default both)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Rendering processes (default: one per CPU; 1 renders in this process)',
+        )
+        parser.add_argument('--force', action='store_true', help='Render again even if stored')
+
+    def handle(self, *args, **options):
+        users = list(options['user'])
+        if options['users_csv']:
+            with open(options['users_csv'], encoding='utf-8-sig') as csv_file:
+                users += read_identifiers_csv(csv_file.read())
+        user_ids = []
+        if users:
+            resolved = resolve_users(users)
+            unknown = [value for value in users if split_identifier(value) not in resolved]
+            if unknown:
+                raise CommandError(f'Unknown users: {", ".join(unknown[:20])}')
+            user_ids = set(resolved.values())
+
+        since = None
+        if options['since']:
+            since = parse_date(options['since'])
+            if since is None:
+                raise CommandError('--since must be a date (YYYY-MM-DD)')
+
+        if options['workers'] is not None and options['workers'] < 1:
+            raise CommandError('--workers must be at least 1')
+
+        enrollments = completed_enrollments(options['course'], user_ids, since)
+        started = time.perf_counter()
+        summary = generate_certificates(
+            enrollments, options['kind'] or list(KINDS), options['workers'], options['force']
+        )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'{summary["certificates"]} certificate(s): {summary["rendered"]} rendered, '
+            f'{summary["cached"]} already stored ({elapsed:.1f}s)'
+        ))
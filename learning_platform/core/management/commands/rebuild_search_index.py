@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from core.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the course full-text search index'
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        backend.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(f'Rebuilt course search index ({backend.__class__.__name__})')
+        )
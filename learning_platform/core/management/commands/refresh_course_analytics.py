@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.activity import DEFAULT_SETTLE_SECONDS
+from core.analytics import refresh_analytics, refresh_courses
+from core.models import Course
+
+
+class Command(BaseCommand):
+    help = (
+        'Refresh the precomputed instructor analytics of the courses with activity or '
+        'enrollments since the last run. Safe to run from cron at any interval.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--course', action='append', default=[], help='Refresh this course slug (repeatable)')
+        parser.add_argument('--all', action='store_true', help='Refresh every course')
+        parser.add_argument(
+            '--settle-seconds',
+            type=int,
+            default=DEFAULT_SETTLE_SECONDS,
+            help=(
+                'Leave rows recorded within this many seconds for the next run '
+                f'(default {DEFAULT_SETTLE_SECONDS})'
+            ),
+        )
+
+    def handle(self, *args, **options):
+        if options['all'] or options['course']:
+            courses = Course.objects.all()
+            if options['course']:
+                courses = courses.filter(slug__in=options['course'])
+                missing = set(options['course']) - set(courses.values_list('slug', flat=True))
+                if missing:
+                    raise CommandError(f'Unknown courses: {", ".join(sorted(missing))}')
+            refreshed = refresh_courses(list(courses.values_list('pk', flat=True)))
+        else:
+            refreshed = refresh_analytics(options['settle_seconds'])
+        self.stdout.write(self.style.SUCCESS(f'Refreshed analytics of {refreshed} course(s)'))
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from core.activity import DEFAULT_BATCH_SIZE, DEFAULT_SETTLE_SECONDS, rollup_events
+
+
+class Command(BaseCommand):
+    help = (
+        'Fold new learner activity events (since the last watermark) into the daily '
+        'per-student and per-course rollup tables. Safe to run from cron at any interval.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f'Events folded per transaction (default {DEFAULT_BATCH_SIZE})',
+        )
+        parser.add_argument(
+            '--settle-seconds',
+            type=int,
+            default=DEFAULT_SETTLE_SECONDS,
+            help=(
+                'Leave events recorded within this many seconds for the next run '
+                f'(default {DEFAULT_SETTLE_SECONDS})'
+            ),
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            folded, watermark, moved = rollup_events(options['batch_size'], options['settle_seconds'])
+            if not moved:
+                break
+            total += folded
+            self.stdout.write(f'Folded {folded} event(s), watermark at {watermark}')
+        self.stdout.write(self.style.SUCCESS(f'Rolled up {total} event(s)'))
@@ -0,0 +1,69 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.jobs import DEFAULT_POLL_SECONDS, DEFAULT_STALE_SECONDS, Worker, queue_stats
+
+
+class Command(BaseCommand):
+    help = (
+        'Run queued background jobs (core.jobs) in a thread or process pool until stopped '
+        '(SIGTERM/Ctrl-C finishes the running jobs first). Run as many workers as needed.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=2,
+            help='Jobs run at once (default 2)',
+        )
+        parser.add_argument(
+            '--pool',
+            choices=['thread', 'process'],
+            default='thread',
+            help='Run jobs in threads (default) or in processes, for CPU-bound tasks',
+        )
+        parser.add_argument(
+            '--poll-seconds',
+            type=float,
+            default=DEFAULT_POLL_SECONDS,
+            help=f'Seconds between polls of an empty queue (default {DEFAULT_POLL_SECONDS})',
+        )
+        parser.add_argument(
+            '--stale-seconds',
+            type=int,
+            default=DEFAULT_STALE_SECONDS,
+            help=(
+                'Requeue jobs another worker has been running for longer than this '
+                f'(default {DEFAULT_STALE_SECONDS})'
+            ),
+        )
+        parser.add_argument('--burst', action='store_true', help='Exit once the queue is empty')
+        parser.add_argument('--stats', action='store_true', help='Print the queue statistics and exit')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self.stdout.write(json.dumps(queue_stats(), indent=2))
+            return
+        if options['concurrency'] < 1:
+            raise CommandError('--concurrency must be at least 1')
+
+        worker = Worker(
+            concurrency=options['concurrency'],
+            pool=options['pool'],
+            poll_seconds=options['poll_seconds'],
+            stale_seconds=options['stale_seconds'],
+            burst=options['burst'],
+        )
+        self.stdout.write(
+            f'Worker {worker.name}: {worker.concurrency} {worker.pool}(s), '
+            f'polling every {worker.poll_seconds}s'
+        )
+        stats = worker.run()
+        self.stdout.write(self.style.SUCCESS(
+            f'Stopped: {stats.get("claimed", 0)} job(s) claimed, {stats.get("succeeded", 0)} succeeded, '
+            f'{stats.get("retried", 0)} to retry, {stats.get("failed", 0)} failed'
+        ))
+        if stats['task_seconds']:
+            self.stdout.write(f'Seconds per task: {json.dumps(stats["task_seconds"])}')
@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand, CommandError
+from core.counters import (
+    find_counter_drift, refresh_attempt_summaries, refresh_course_counters, refresh_module_counters,
+    refresh_enrollment_progress
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Backfill or verify the denormalized module/lesson counters on courses and modules, '
+        'the stored lesson progress on enrollments and the per-student quiz attempt summaries. '
+        'Run after bulk imports or raw SQL edits, which bypass the model signals.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only report counters that are out of date; exit with an error if any are found',
+        )
+
+    def handle(self, *args, **options):
+        course_rows, module_rows, enrollment_rows = find_counter_drift()
+
+        for pk, stored_modules, actual_modules, stored_lessons, actual_lessons in course_rows:
+            self.stdout.write(
+                f'Course {pk}: modules {stored_modules} -> {actual_modules}, '
+                f'lessons {stored_lessons} -> {actual_lessons}'
+            )
+        for pk, stored_lessons, actual_lessons in module_rows:
+            self.stdout.write(f'Module {pk}: lessons {stored_lessons} -> {actual_lessons}')
+        for pk, stored_completed, actual_completed in enrollment_rows:
+            self.stdout.write(
+                f'Enrollment {pk}: completed lessons {stored_completed} -> {actual_completed}'
+            )
+
+        if options['check']:
+            if course_rows or module_rows or enrollment_rows:
+                raise CommandError(
+                    f'{len(course_rows)} course(s), {len(module_rows)} module(s) and '
+                    f'{len(enrollment_rows)} enrollment(s) have stale counters'
+                )
+            self.stdout.write(self.style.SUCCESS('All counters are up to date'))
+            return
+
+        modules_updated = refresh_module_counters()
+        courses_updated = refresh_course_counters()
+        enrollments_updated = refresh_enrollment_progress()
+        summaries_updated = refresh_attempt_summaries()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Refreshed counters on {courses_updated} course(s), {modules_updated} module(s), '
+                f'{enrollments_updated} enrollment(s) and {summaries_updated} quiz attempt summary(ies) '
+                f'({len(course_rows)} course(s), {len(module_rows)} module(s) and '
+                f'{len(enrollment_rows)} enrollment(s) were stale)'
+            )
+        )
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.7 on 2026-10-18 04:49
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_counters(apps, schema_editor):
+    Course = apps.get_model('core', 'Course')
+    Module = apps.get_model('core', 'Module')
+    Lesson = apps.get_model('core', 'Lesson')
+
+    for row in Lesson.objects.order_by().values('module').annotate(total=Count('pk')):
+        Module.objects.filter(pk=row['module']).update(lesson_count=row['total'])
+
+    module_totals = Module.objects.order_by().values('course').annotate(total=Count('pk'))
+    for row in module_totals:
+        Course.objects.filter(pk=row['course']).update(module_count=row['total'])
+
+    lesson_totals = Lesson.objects.order_by().values('module__course').annotate(total=Count('pk'))
+    for row in lesson_totals:
+        Course.objects.filter(pk=row['module__course']).update(lesson_count=row['total'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='lesson_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='module_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='module',
+            name='lesson_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
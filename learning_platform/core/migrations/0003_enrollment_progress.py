@@ -0,0 +1,51 @@
+# Generated by Django 5.2.7 on 2026-10-18 04:51
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_progress(apps, schema_editor):
+    Enrollment = apps.get_model('core', 'Enrollment')
+    LessonProgress = apps.get_model('core', 'LessonProgress')
+
+    completed = (
+        LessonProgress.objects.filter(is_completed=True)
+        .order_by()
+        .values('student', 'lesson__module__course')
+        .annotate(total=Count('pk'))
+    )
+    completed = {
+        (row['student'], row['lesson__module__course']): row['total'] for row in completed.iterator()
+    }
+
+    enrollments = Enrollment.objects.select_related('course').only(
+        'id', 'student_id', 'course__lesson_count'
+    )
+    for enrollment in enrollments.iterator():
+        done = completed.get((enrollment.student_id, enrollment.course_id), 0)
+        total = enrollment.course.lesson_count
+        percentage = round(min(done / total, 1) * 100, 2) if total else 0
+        Enrollment.objects.filter(pk=enrollment.pk).update(
+            completed_lessons=done, progress_percentage=percentage
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_course_module_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='enrollment',
+            name='completed_lessons',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='enrollment',
+            name='progress_percentage',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_progress, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 04:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_enrollment_progress'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quiz',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+    ]
@@ -0,0 +1,71 @@
+from django.db import migrations
+
+# The SQL is copied from core.search as it was when this migration was
+# written, so later changes to the app code cannot change what it does
+
+POSTGRES_SETUP_SQL = [
+    """
+    ALTER TABLE core_course ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(tags, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'C')
+    ) STORED
+    """,
+    'CREATE INDEX IF NOT EXISTS core_course_search_vector_idx ON core_course USING GIN (search_vector)',
+]
+
+POSTGRES_TEARDOWN_SQL = [
+    'DROP INDEX IF EXISTS core_course_search_vector_idx',
+    'ALTER TABLE core_course DROP COLUMN IF EXISTS search_vector',
+]
+
+SQLITE_SETUP_SQL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS core_course_fts
+    USING fts5(title, tags, description, tokenize='porter unicode61')
+    """,
+    'INSERT INTO core_course_fts (rowid, title, tags, description) '
+    "SELECT id, title, coalesce(tags, ''), description FROM core_course",
+]
+
+SQLITE_TEARDOWN_SQL = [
+    'DROP TABLE IF EXISTS core_course_fts',
+]
+
+
+def sqlite_has_fts5(connection):
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        return 'ENABLE_FTS5' in {row[0] for row in cursor.fetchall()}
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        for sql in POSTGRES_SETUP_SQL:
+            schema_editor.execute(sql)
+    elif connection.vendor == 'sqlite' and sqlite_has_fts5(connection):
+        for sql in SQLITE_SETUP_SQL:
+            schema_editor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        for sql in POSTGRES_TEARDOWN_SQL:
+            schema_editor.execute(sql)
+    elif connection.vendor == 'sqlite':
+        for sql in SQLITE_TEARDOWN_SQL:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_quiz_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 5.2.7 on 2026-10-18 04:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils.text import slugify
+
+
+def split_course_tags(apps, schema_editor):
+    Course = apps.get_model('core', 'Course')
+    Tag = apps.get_model('core', 'Tag')
+    CourseTag = apps.get_model('core', 'CourseTag')
+
+    tag_names = {}
+    course_slugs = []
+    for course_id, value in Course.objects.exclude(tags=None).values_list('id', 'tags').iterator():
+        slugs = []
+        for name in value.split(','):
+            name = ' '.join(name.split())[:100]
+            slug = slugify(name)
+            if slug and slug not in slugs:
+                slugs.append(slug)
+                tag_names.setdefault(slug, name)
+        course_slugs.append((course_id, slugs))
+
+    Tag.objects.bulk_create([Tag(slug=slug, name=name) for slug, name in tag_names.items()])
+    tag_ids = dict(Tag.objects.values_list('slug', 'id'))
+    CourseTag.objects.bulk_create(
+        [
+            CourseTag(course_id=course_id, tag_id=tag_ids[slug])
+            for course_id, slugs in course_slugs
+            for slug in slugs
+        ],
+        batch_size=1000,
+    )
+
+
+def remove_course_tags(apps, schema_editor):
+    apps.get_model('core', 'CourseTag').objects.all().delete()
+    apps.get_model('core', 'Tag').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_course_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('slug', models.SlugField(max_length=100, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='CourseTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='course_tags', to='core.course')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='course_tags', to='core.tag')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='normalized_tags',
+            field=models.ManyToManyField(blank=True, related_name='courses', through='core.CourseTag', to='core.tag'),
+        ),
+        migrations.AddIndex(
+            model_name='coursetag',
+            index=models.Index(fields=['tag', 'course'], name='core_coursetag_tag_course_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='coursetag',
+            unique_together={('course', 'tag')},
+        ),
+        migrations.RunPython(split_course_tags, remove_course_tags),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-18 04:56
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_normalized_tags'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='enrollment',
+            index=models.Index(fields=['student', '-enrolled_at', '-id'], name='core_enroll_student_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quizattempt',
+            index=models.Index(fields=['student', '-started_at', '-id'], name='core_attempt_student_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userprofile',
+            index=models.Index(fields=['-created_at', '-id'], name='core_profile_created_idx'),
+        ),
+    ]
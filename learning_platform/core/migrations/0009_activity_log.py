@@ -0,0 +1,77 @@
+# Generated by Django 5.2.7 on 2026-10-18 05:07
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_category_quiz_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('last_event_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ActivityEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_type', models.CharField(choices=[('lesson_completed', 'Lesson completed'), ('time_spent', 'Time spent'), ('quiz_passed', 'Quiz passed'), ('quiz_failed', 'Quiz failed')], max_length=20)),
+                ('value', models.PositiveIntegerField(default=0)),
+                ('occurred_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('recorded_at', models.DateTimeField(auto_now_add=True)),
+                ('course', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='core.course')),
+                ('lesson', models.ForeignKey(blank=True, db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='core.lesson')),
+                ('student', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyCourseActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('active_students', models.PositiveIntegerField(default=0)),
+                ('lessons_completed', models.PositiveIntegerField(default=0)),
+                ('minutes_spent', models.PositiveIntegerField(default=0)),
+                ('quiz_submissions', models.PositiveIntegerField(default=0)),
+                ('quiz_passes', models.PositiveIntegerField(default=0)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_activity', to='core.course')),
+            ],
+            options={
+                'ordering': ['-day'],
+                'unique_together': {('day', 'course')},
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyStudentActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('lessons_completed', models.PositiveIntegerField(default=0)),
+                ('minutes_spent', models.PositiveIntegerField(default=0)),
+                ('quiz_submissions', models.PositiveIntegerField(default=0)),
+                ('quiz_passes', models.PositiveIntegerField(default=0)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_student_activity', to='core.course')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_activity', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-day'],
+                'indexes': [models.Index(fields=['student', '-day'], name='core_daily_student_idx'), models.Index(fields=['course', '-day'], name='core_daily_student_course_idx')],
+                'unique_together': {('day', 'student', 'course')},
+            },
+        ),
+    ]
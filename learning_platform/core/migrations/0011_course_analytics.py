@@ -0,0 +1,48 @@
+# Generated by Django 5.2.7 on 2026-10-18 05:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_job_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseAnalytics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('enrollments', models.PositiveIntegerField(default=0)),
+                ('completions', models.PositiveIntegerField(default=0)),
+                ('completion_rate', models.FloatField(blank=True, null=True)),
+                ('quiz_attempts', models.PositiveIntegerField(default=0)),
+                ('quiz_passes', models.PositiveIntegerField(default=0)),
+                ('average_quiz_score', models.FloatField(blank=True, null=True)),
+                ('pass_rate', models.FloatField(blank=True, null=True)),
+                ('median_days_to_complete', models.FloatField(blank=True, null=True)),
+                ('median_minutes_to_complete', models.FloatField(blank=True, null=True)),
+                ('refreshed_at', models.DateTimeField(auto_now=True)),
+                ('course', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='analytics', to='core.course')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ModuleAnalytics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('students_started', models.PositiveIntegerField(default=0)),
+                ('students_completed', models.PositiveIntegerField(default=0)),
+                ('completion_rate', models.FloatField(blank=True, null=True)),
+                ('quiz_attempts', models.PositiveIntegerField(default=0)),
+                ('quiz_passes', models.PositiveIntegerField(default=0)),
+                ('average_quiz_score', models.FloatField(blank=True, null=True)),
+                ('pass_rate', models.FloatField(blank=True, null=True)),
+                ('median_minutes_to_complete', models.FloatField(blank=True, null=True)),
+                ('refreshed_at', models.DateTimeField(auto_now=True)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='module_analytics', to='core.course')),
+                ('module', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='analytics', to='core.module')),
+            ],
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.7 on 2026-10-18 05:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_course_analytics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizattempt',
+            name='responses',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='QuizItemAnalysis',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('results', models.JSONField(default=dict)),
+                ('analyzed_at', models.DateTimeField(blank=True, null=True)),
+                ('quiz', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='item_analysis', to='core.quiz')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='QuizResponseLayout',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveIntegerField()),
+                ('questions', models.JSONField()),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='response_layouts', to='core.quiz')),
+            ],
+            options={
+                'unique_together': {('quiz', 'version')},
+            },
+        ),
+        migrations.AddField(
+            model_name='quizattempt',
+            name='layout',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.quizresponselayout'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.7 on 2026-10-18 05:58
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, Q
+from django.db.models.functions import Coalesce
+
+
+def backfill_summaries(apps, schema_editor):
+    QuizAttempt = apps.get_model('core', 'QuizAttempt')
+    QuizAttemptSummary = apps.get_model('core', 'QuizAttemptSummary')
+
+    rows = QuizAttempt.objects.order_by().values('student', 'quiz').annotate(
+        total=Count('pk'),
+        best=Max('score'),
+        passes=Count('pk', filter=Q(passed=True)),
+        last=Max(Coalesce('completed_at', 'started_at')),
+    )
+    QuizAttemptSummary.objects.bulk_create(
+        (
+            QuizAttemptSummary(
+                student_id=row['student'], quiz_id=row['quiz'], attempts=row['total'],
+                best_score=row['best'], passed=row['passes'] > 0, last_attempt_at=row['last'],
+            )
+            for row in rows.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_quiz_responses'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuizAttemptSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('best_score', models.PositiveIntegerField(blank=True, null=True)),
+                ('passed', models.BooleanField(default=False)),
+                ('last_attempt_at', models.DateTimeField(blank=True, null=True)),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attempt_summaries', to='core.quiz')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='quiz_summaries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('student', 'quiz')},
+            },
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
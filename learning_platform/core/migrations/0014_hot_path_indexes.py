@@ -0,0 +1,81 @@
+# Generated by Django 5.2.7 on 2026-10-18 06:01
+
+from django.conf import settings
+from django.db import migrations, models
+
+# Partial indexes of the published catalog; PostgreSQL only, as SQLite cannot
+# match its partial indexes against the bound parameters of Django's queries
+POSTGRES_PARTIAL_INDEXES = [
+    ('core_course_published_idx', 'core_course (created_at DESC)', "status = 'published'"),
+    ('core_course_pub_featured_idx', 'core_course (created_at DESC)', "status = 'published' AND is_featured"),
+]
+
+
+class AddIndexConcurrently(migrations.AddIndex):
+    """AddIndex that builds the index CONCURRENTLY on PostgreSQL, so writes to the table go on"""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != 'postgresql':
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            schema_editor.add_index(model, self.index, concurrently=True)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != 'postgresql':
+            return super().database_backwards(app_label, schema_editor, from_state, to_state)
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            schema_editor.remove_index(model, self.index, concurrently=True)
+
+
+def create_raw_indexes(apps, schema_editor):
+    concurrently = 'CONCURRENTLY ' if schema_editor.connection.vendor == 'postgresql' else ''
+    # LoginView looks users up by email on every login; auth_user has no index on it
+    schema_editor.execute(f'CREATE INDEX {concurrently}IF NOT EXISTS core_user_email_idx ON auth_user (email)')
+    if schema_editor.connection.vendor == 'postgresql':
+        for name, columns, condition in POSTGRES_PARTIAL_INDEXES:
+            schema_editor.execute(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {columns} WHERE {condition}')
+
+
+def drop_raw_indexes(apps, schema_editor):
+    concurrently = 'CONCURRENTLY ' if schema_editor.connection.vendor == 'postgresql' else ''
+    names = ['core_user_email_idx']
+    if schema_editor.connection.vendor == 'postgresql':
+        names += [name for name, _, _ in POSTGRES_PARTIAL_INDEXES]
+    for name in names:
+        schema_editor.execute(f'DROP INDEX {concurrently}IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('core', '0013_quiz_attempt_summary'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='course',
+            index=models.Index(fields=['status', '-created_at'], name='core_course_status_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='course',
+            index=models.Index(fields=['is_featured', 'status', '-created_at'], name='core_course_featured_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='enrollment',
+            index=models.Index(fields=['course', 'is_completed'], name='core_enroll_course_done_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='lessonprogress',
+            index=models.Index(fields=['student', 'is_completed'], name='core_progress_student_done_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='quizattempt',
+            index=models.Index(fields=['student', 'quiz', '-started_at'], name='core_attempt_student_quiz_idx'),
+        ),
+        migrations.RunPython(create_raw_indexes, drop_raw_indexes),
+    ]
@@ -23,6 +23,9 @@ class UserProfile(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='core_profile_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.get_full_name()} ({self.get_user_type_display()})"
@@ -34,6 +37,7 @@ class Category(models.Model):
     description = models.TextField(blank=True, null=True)
     slug = models.SlugField(unique=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         verbose_name_plural = "Categories"
@@ -43,6 +47,19 @@ class Category(models.Model):
         return self.name
 
 
+class Tag(models.Model):
+    """Normalized course tags, parsed from Course.tags"""
+    name = models.CharField(max_length=100)
+    slug = models.SlugField(max_length=100, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['name']
+    
+    def __str__(self):
+        return self.name
+
+
 class Course(models.Model):
     """Main course model"""
     STATUS_CHOICES = [
@@ -79,23 +96,47 @@ class Course(models.Model):
     # SEO and social
     meta_description = models.CharField(max_length=160, blank=True, null=True)
     tags = models.CharField(max_length=500, blank=True, null=True)  # Comma-separated tags
+    normalized_tags = models.ManyToManyField(
+        Tag, through='CourseTag', related_name='courses', blank=True
+    )  # Kept in sync with `tags` by core.signals
+    
+    # Denormalized counters, maintained by core.signals
+    module_count = models.PositiveIntegerField(default=0, editable=False)
+    lesson_count = models.PositiveIntegerField(default=0, editable=False)
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # The catalog; PostgreSQL also gets partial indexes of published courses (0014)
+            models.Index(fields=['status', '-created_at'], name='core_course_status_created_idx'),
+            models.Index(fields=['is_featured', 'status', '-created_at'], name='core_course_featured_idx'),
+        ]
     
     def __str__(self):
         return self.title
     
     @property
     def total_modules(self):
-        return self.modules.count()
+        return self.module_count
     
     @property
     def total_lessons(self):
-        total = 0
-        for module in self.modules.all():
-            total += module.lessons.count()
-        return total
+        return self.lesson_count
+
+
+class CourseTag(models.Model):
+    """Through table between courses and their normalized tags"""
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='course_tags')
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='course_tags')
+    
+    class Meta:
+        unique_together = ['course', 'tag']
+        indexes = [
+            models.Index(fields=['tag', 'course'], name='core_coursetag_tag_course_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.course.title} - {self.tag.name}"
 
 
 class Module(models.Model):
@@ -104,6 +145,7 @@ class Module(models.Model):
     title = models.CharField(max_length=200)
     description = models.TextField(blank=True, null=True)
     order = models.PositiveIntegerField(default=1)
+    lesson_count = models.PositiveIntegerField(default=0, editable=False)  # Maintained by core.signals
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -153,12 +195,32 @@ class Enrollment(models.Model):
     completed_at = models.DateTimeField(blank=True, null=True)
     is_completed = models.BooleanField(default=False)
     
+    # Stored progress, updated by LessonViewSet.complete and core.counters
+    completed_lessons = models.PositiveIntegerField(default=0, editable=False)
+    progress_percentage = models.FloatField(default=0, editable=False)
+    
     class Meta:
         unique_together = ['student', 'course']
         ordering = ['-enrolled_at']
+        indexes = [
+            models.Index(fields=['student', '-enrolled_at', '-id'], name='core_enroll_student_date_idx'),
+            models.Index(fields=['course', 'is_completed'], name='core_enroll_course_done_idx'),
+        ]
     
     def __str__(self):
         return f"{self.student.get_full_name()} - {self.course.title}"
+    
+    def set_progress(self, completed_lessons, total_lessons):
+        """Store lesson progress and mark the enrollment completed once every lesson is done"""
+        self.completed_lessons = completed_lessons
+        if total_lessons:
+            self.progress_percentage = round(min(completed_lessons / total_lessons, 1) * 100, 2)
+        else:
+            self.progress_percentage = 0
+        
+        if total_lessons and completed_lessons >= total_lessons and not self.is_completed:
+            self.is_completed = True
+            self.completed_at = timezone.now()
 
 
 class LessonProgress(models.Model):
@@ -172,6 +234,9 @@ class LessonProgress(models.Model):
     
     class Meta:
         unique_together = ['student', 'lesson']
+        indexes = [
+            models.Index(fields=['student', 'is_completed'], name='core_progress_student_done_idx'),
+        ]
     
     def __str__(self):
         status = "Completed" if self.is_completed else "In Progress"
@@ -189,7 +254,9 @@ class Quiz(models.Model):
         validators=[MinValueValidator(0), MaxValueValidator(100)]
     )
     max_attempts = models.PositiveIntegerField(default=3)
+    version = models.PositiveIntegerField(default=1, editable=False)  # Bumped when questions/options change
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return f"{self.lesson.title} - {self.title}"
@@ -238,9 +305,244 @@ class QuizAttempt(models.Model):
     completed_at = models.DateTimeField(blank=True, null=True)
     score = models.PositiveIntegerField(blank=True, null=True)
     passed = models.BooleanField(default=False)
+    # The submitted answers packed by core.grading.pack_responses, laid out as in the layout
+    layout = models.ForeignKey(
+        'QuizResponseLayout', on_delete=models.SET_NULL, blank=True, null=True, related_name='+'
+    )
+    responses = models.BinaryField(blank=True, null=True, editable=False)
     
     class Meta:
         ordering = ['-started_at']
+        indexes = [
+            models.Index(fields=['student', '-started_at', '-id'], name='core_attempt_student_date_idx'),
+            models.Index(fields=['student', 'quiz', '-started_at'], name='core_attempt_student_quiz_idx'),
+        ]
     
     def __str__(self):
         return f"{self.student.get_full_name()} - {self.quiz.title} - Attempt {self.id}"
+
+
+class QuizAttemptSummary(models.Model):
+    """
+    A student's attempts at a quiz so far, updated with each attempt under a
+    row lock (QuizViewSet.submit) and recomputed by core.counters
+    """
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='quiz_summaries')
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='attempt_summaries')
+    attempts = models.PositiveIntegerField(default=0)
+    best_score = models.PositiveIntegerField(blank=True, null=True)
+    passed = models.BooleanField(default=False)
+    last_attempt_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        unique_together = ['student', 'quiz']
+
+    def __str__(self):
+        return f"{self.student.get_full_name()} - {self.quiz.title} ({self.attempts} attempts)"
+
+    def add_attempt(self, attempt):
+        """Count a new attempt, keeping the best score and whether any attempt passed"""
+        self.attempts += 1
+        if attempt.score is not None and (self.best_score is None or attempt.score > self.best_score):
+            self.best_score = attempt.score
+        self.passed = self.passed or attempt.passed
+        self.last_attempt_at = attempt.completed_at or attempt.started_at
+
+
+class QuizResponseLayout(models.Model):
+    """The question and option ids behind each position of a quiz version's packed responses"""
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='response_layouts')
+    version = models.PositiveIntegerField()
+    # [[question id, [option id, ...]], ...] in packed order
+    questions = models.JSONField()
+    
+    class Meta:
+        unique_together = ['quiz', 'version']
+    
+    def __str__(self):
+        return f"{self.quiz.title} - version {self.version}"
+
+
+class QuizItemAnalysis(models.Model):
+    """The latest per-question item analysis of a quiz (see core.item_analysis)"""
+    quiz = models.OneToOneField(Quiz, on_delete=models.CASCADE, related_name='item_analysis')
+    attempts = models.PositiveIntegerField(default=0)
+    results = models.JSONField(default=dict)
+    analyzed_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"Item analysis - quiz {self.quiz_id}"
+
+
+class ActivityEvent(models.Model):
+    """
+    Append-only learner activity log (lesson completions, tracked time, quiz
+    submissions). Rows are never updated; references are kept without
+    foreign key constraints or secondary indexes so inserts stay cheap and
+    history survives deletions. Reporting reads the daily rollups instead.
+    """
+    LESSON_COMPLETED = 'lesson_completed'
+    TIME_SPENT = 'time_spent'
+    QUIZ_PASSED = 'quiz_passed'
+    QUIZ_FAILED = 'quiz_failed'
+    EVENT_TYPE_CHOICES = [
+        (LESSON_COMPLETED, 'Lesson completed'),
+        (TIME_SPENT, 'Time spent'),
+        (QUIZ_PASSED, 'Quiz passed'),
+        (QUIZ_FAILED, 'Quiz failed'),
+    ]
+    
+    event_type = models.CharField(max_length=20, choices=EVENT_TYPE_CHOICES)
+    student = models.ForeignKey(
+        User, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False, related_name='+'
+    )
+    course = models.ForeignKey(
+        Course, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False, related_name='+'
+    )
+    lesson = models.ForeignKey(
+        Lesson, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False,
+        related_name='+', blank=True, null=True
+    )
+    # Minutes for time_spent, the score for quiz events
+    value = models.PositiveIntegerField(default=0)
+    # When it happened (client time for replayed offline events) and when it was stored
+    occurred_at = models.DateTimeField(default=timezone.now)
+    recorded_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['id']
+    
+    def __str__(self):
+        return f"{self.get_event_type_display()} - student {self.student_id} - {self.occurred_at}"
+
+
+class DailyStudentActivity(models.Model):
+    """Per-day, per-student, per-course activity totals (see core.activity)"""
+    day = models.DateField()
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_activity')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='daily_student_activity')
+    lessons_completed = models.PositiveIntegerField(default=0)
+    minutes_spent = models.PositiveIntegerField(default=0)
+    quiz_submissions = models.PositiveIntegerField(default=0)
+    quiz_passes = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        unique_together = ['day', 'student', 'course']
+        ordering = ['-day']
+        indexes = [
+            models.Index(fields=['student', '-day'], name='core_daily_student_idx'),
+            models.Index(fields=['course', '-day'], name='core_daily_student_course_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.day} - student {self.student_id} - course {self.course_id}"
+
+
+class DailyCourseActivity(models.Model):
+    """Per-day, per-course activity totals, derived from DailyStudentActivity"""
+    day = models.DateField()
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='daily_activity')
+    active_students = models.PositiveIntegerField(default=0)
+    lessons_completed = models.PositiveIntegerField(default=0)
+    minutes_spent = models.PositiveIntegerField(default=0)
+    quiz_submissions = models.PositiveIntegerField(default=0)
+    quiz_passes = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        unique_together = ['day', 'course']
+        ordering = ['-day']
+    
+    def __str__(self):
+        return f"{self.day} - course {self.course_id}"
+
+
+class RollupWatermark(models.Model):
+    """Last event id folded into the rollups, per rollup name"""
+    name = models.CharField(max_length=50, unique=True)
+    last_event_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.name}: {self.last_event_id}"
+
+
+class CourseAnalytics(models.Model):
+    """Precomputed instructor statistics of a course (see core.analytics)"""
+    course = models.OneToOneField(Course, on_delete=models.CASCADE, related_name='analytics')
+    enrollments = models.PositiveIntegerField(default=0)
+    completions = models.PositiveIntegerField(default=0)
+    # Percentages (0-100); null when there is nothing to measure yet
+    completion_rate = models.FloatField(blank=True, null=True)
+    quiz_attempts = models.PositiveIntegerField(default=0)
+    quiz_passes = models.PositiveIntegerField(default=0)
+    average_quiz_score = models.FloatField(blank=True, null=True)
+    pass_rate = models.FloatField(blank=True, null=True)
+    # Over the students who completed the course
+    median_days_to_complete = models.FloatField(blank=True, null=True)
+    median_minutes_to_complete = models.FloatField(blank=True, null=True)
+    refreshed_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Analytics - course {self.course_id}"
+
+
+class ModuleAnalytics(models.Model):
+    """Precomputed instructor statistics of a module (see core.analytics)"""
+    module = models.OneToOneField(Module, on_delete=models.CASCADE, related_name='analytics')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='module_analytics')
+    students_started = models.PositiveIntegerField(default=0)
+    students_completed = models.PositiveIntegerField(default=0)
+    # Of the course's enrolled students
+    completion_rate = models.FloatField(blank=True, null=True)
+    quiz_attempts = models.PositiveIntegerField(default=0)
+    quiz_passes = models.PositiveIntegerField(default=0)
+    average_quiz_score = models.FloatField(blank=True, null=True)
+    pass_rate = models.FloatField(blank=True, null=True)
+    # Lesson time of the students who completed the module
+    median_minutes_to_complete = models.FloatField(blank=True, null=True)
+    refreshed_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Analytics - module {self.module_id}"
+
+
+class Job(models.Model):
+    """A unit of background work, run by ``manage.py run_worker`` (see core.jobs)"""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    ]
+    
+    task = models.CharField(max_length=100)
+    # Keyword arguments of the task
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    # Not claimed before this time (retries back off through it)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True, default='')
+    locked_at = models.DateTimeField(blank=True, null=True)
+    result = models.JSONField(blank=True, null=True)
+    last_error = models.TextField(blank=True, default='')
+    created_by = models.ForeignKey(
+        User, on_delete=models.SET_NULL, blank=True, null=True, related_name='+'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    
+    class Meta:
+        ordering = ['-id']
+        indexes = [
+            models.Index(fields=['status', 'run_after', 'id'], name='core_job_claim_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.task} #{self.id} ({self.status})"
@@ -0,0 +1,158 @@
+from base64 import b64decode, b64encode
+from urllib import parse
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, PageNumberPagination, _reverse_ordering
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination over a view's ``cursor_ordering``.
+
+    Unlike DRF's cursor, which keeps only the first ordering field and an
+    offset among its ties, the cursor holds the value of every ordering field,
+    and pages are filtered with a row comparison on the whole key. Runs of
+    equal timestamps are then paged by ``id`` instead of by ``OFFSET``.
+    """
+
+    def __init__(self, ordering):
+        self.ordering = ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        reverse, position = self.decode_cursor(request)
+
+        if reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+        if position is not None:
+            queryset = queryset.filter(self.keyset_filter(position, reverse))
+
+        # Fetch an extra row to tell whether there is a page after this one
+        results = list(queryset[:self.page_size + 1])
+        page = results[:self.page_size]
+        has_following = len(results) > len(page)
+        if reverse:
+            page.reverse()
+        self.page = page
+
+        first = self._get_position_from_instance(page[0], self.ordering) if page else position
+        last = self._get_position_from_instance(page[-1], self.ordering) if page else position
+        if reverse:
+            self.has_next = position is not None
+            self.has_previous = has_following
+        else:
+            self.has_next = has_following
+            self.has_previous = position is not None
+        self.next_position = last
+        self.previous_position = first
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def keyset_filter(self, position, reverse):
+        """Rows strictly after ``position`` in the (possibly reversed) ordering"""
+        condition = Q(pk__in=[])
+        equal = Q()
+        for order, value in zip(self.ordering, position):
+            field = order.lstrip('-')
+            descending = order.startswith('-') != reverse
+            lookup = '__lt' if descending else '__gt'
+            condition |= equal & Q(**{field + lookup: value})
+            equal &= Q(**{field: value})
+        return condition
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(False, self.next_position)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(True, self.previous_position)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return False, None
+        try:
+            querystring = b64decode(encoded.encode('ascii')).decode('ascii')
+            tokens = parse.parse_qs(querystring, keep_blank_values=True)
+            reverse = bool(int(tokens.get('r', ['0'])[0]))
+            position = tokens['p']
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return reverse, position
+
+    def encode_cursor(self, reverse, position):
+        tokens = {'p': position}
+        if reverse:
+            tokens['r'] = '1'
+        querystring = parse.urlencode(tokens, doseq=True)
+        encoded = b64encode(querystring.encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def _get_position_from_instance(self, instance, ordering):
+        position = []
+        for order in ordering:
+            field = order.lstrip('-')
+            value = instance[field] if isinstance(instance, dict) else getattr(instance, field)
+            position.append(str(value))
+        return position
+
+
+class OptionalCursorPagination(PageNumberPagination):
+    """
+    Page-number pagination, with opt-in cursor (keyset) pagination.
+
+    Views that define ``cursor_ordering`` (a unique ordering ending with an
+    ``id`` tie-breaker, backed by a matching index) switch to cursor mode
+    when the request asks for ``?pagination=cursor`` or carries a
+    ``?cursor=`` token from a previous page. Cursor pages skip the
+    ``COUNT(*)`` and the deep ``OFFSET`` scan, so deep pages cost about the
+    same as the first one. Everything else keeps the existing page-number
+    behaviour.
+
+    The cursor encodes the full ordering key, ``id`` included, so rows with
+    equal timestamps are neither repeated nor skipped, in either direction.
+    """
+    mode_query_param = 'pagination'
+    cursor_query_param = 'cursor'
+
+    def __init__(self):
+        self.keyset = None
+
+    def wants_cursor(self, request, view):
+        if not getattr(view, 'cursor_ordering', None):
+            return False
+        params = request.query_params
+        return params.get(self.mode_query_param) == 'cursor' or self.cursor_query_param in params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.wants_cursor(request, view):
+            self.keyset = KeysetPagination(view.cursor_ordering)
+            return self.keyset.paginate_queryset(queryset, request, view)
+        self.keyset = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def to_html(self):
+        if self.keyset is not None:
+            return self.keyset.to_html()
+        return super().to_html()
@@ -0,0 +1,35 @@
+"""
+JSON parser backed by orjson when it is installed.
+
+Bodies orjson cannot read (invalid JSON, integers beyond 64 bits) are
+handed to DRF's stdlib parser, so what is accepted and the messages of
+the resulting ``400`` stay the same.
+"""
+import codecs
+import io
+
+from django.conf import settings
+from rest_framework import parsers
+
+from .renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # Optional, see requirements.txt
+    orjson = None
+
+
+class JSONParser(parsers.JSONParser):
+    renderer_class = JSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+
+        body = stream.read()
+        encoding = (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+        try:
+            text = body if codecs.lookup(encoding).name == 'utf-8' else body.decode(encoding)
+            return orjson.loads(text)
+        except (orjson.JSONDecodeError, UnicodeDecodeError, LookupError):
+            return super().parse(io.BytesIO(body), media_type, parser_context)
@@ -0,0 +1,164 @@
+"""
+Batched progress events for offline clients.
+
+A device that was offline replays its lesson completions and tracked time
+as one ordered list of events. ``apply_progress_events`` checks every
+event, loads the lessons, the enrollments (locked) and the existing
+progress rows with one query each, applies the completions in order in
+memory and writes them with one bulk upsert, all in one transaction.
+Tracked time is added with database-side increments
+(core.time_tracking.apply_increments), so minutes written concurrently by
+heartbeats are never overwritten. Applied events are appended to the
+activity log with their client timestamps.
+"""
+from datetime import timezone as dt_timezone
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .activity import record_events, time_spent_event
+from .models import ActivityEvent, Enrollment, Lesson, LessonProgress
+from .time_tracking import apply_increments
+
+MAX_EVENTS = 1000
+
+EVENT_TYPES = ('complete', 'time')
+
+
+def parse_event(event):
+    """(lesson id, type, minutes, timestamp) for one event, or raise ValueError"""
+    if not isinstance(event, dict):
+        raise ValueError('Event must be an object')
+    event_type = event.get('type')
+    if event_type not in EVENT_TYPES:
+        raise ValueError(f'type must be one of: {", ".join(EVENT_TYPES)}')
+    try:
+        lesson_id = int(event.get('lesson'))
+    except (TypeError, ValueError):
+        raise ValueError('lesson must be a lesson id')
+
+    minutes = 0
+    if event_type == 'time':
+        try:
+            minutes = int(event.get('time_spent_minutes', 0))
+        except (TypeError, ValueError):
+            minutes = -1
+        if minutes < 0:
+            raise ValueError('time_spent_minutes must be a non-negative integer')
+
+    now = timezone.now()
+    timestamp = event.get('timestamp')
+    if timestamp:
+        timestamp = parse_datetime(str(timestamp))
+        if timestamp is None:
+            raise ValueError('timestamp must be an ISO 8601 date and time')
+        if timezone.is_naive(timestamp):
+            timestamp = timezone.make_aware(timestamp, dt_timezone.utc)
+        # Device clocks drift; never record a completion in the future
+        timestamp = min(timestamp, now)
+    return lesson_id, event_type, minutes, timestamp or now
+
+
+def apply_progress_events(user, events):
+    """
+    Apply ``events`` for ``user`` in order; returns (per-event results,
+    the resulting progress rows of the touched lessons)
+    """
+    results = []
+    parsed = []
+    for index, event in enumerate(events):
+        result = {'index': index}
+        if isinstance(event, dict) and 'id' in event:
+            result['id'] = event['id']
+        results.append(result)
+        try:
+            parsed.append((result, parse_event(event)))
+        except ValueError as e:
+            result.update(status='rejected', error=str(e))
+
+    lesson_ids = {values[0] for result, values in parsed}
+    lessons = Lesson.objects.select_related('module').only(
+        'id', 'title', 'order', 'module__course_id'
+    ).in_bulk(lesson_ids)
+
+    with transaction.atomic():
+        course_ids = {lesson.module.course_id for lesson in lessons.values()}
+        enrollments = {
+            enrollment.course_id: enrollment
+            for enrollment in Enrollment.objects.select_for_update(of=('self',))
+            .select_related('course')
+            .filter(student=user, course__in=course_ids)
+        }
+        progress_rows = {
+            progress.lesson_id: progress
+            for progress in LessonProgress.objects.select_for_update()
+            .filter(student=user, lesson__in=lesson_ids)
+        }
+
+        touched = set()
+        completed = {}
+        increments = {}
+        newly_completed = {}
+        activity = []
+        for result, (lesson_id, event_type, minutes, timestamp) in parsed:
+            lesson = lessons.get(lesson_id)
+            if lesson is None:
+                result.update(status='rejected', error='Lesson not found')
+                continue
+            course_id = lesson.module.course_id
+            if course_id not in enrollments:
+                result.update(status='rejected', error='Not enrolled in this course')
+                continue
+
+            touched.add(lesson_id)
+            if event_type == 'time':
+                key = (user.pk, lesson_id, course_id)
+                increments[key] = increments.get(key, 0) + minutes
+                result['status'] = 'applied'
+                if minutes:
+                    activity.append(time_spent_event(user.pk, course_id, lesson_id, minutes, timestamp))
+                continue
+
+            progress = progress_rows.get(lesson_id)
+            if progress is None:
+                progress = progress_rows[lesson_id] = LessonProgress(student=user, lesson=lesson)
+            if progress.is_completed:
+                result['status'] = 'already_completed'
+            else:
+                progress.is_completed = True
+                progress.completed_at = timestamp
+                completed[lesson_id] = progress
+                newly_completed[course_id] = newly_completed.get(course_id, 0) + 1
+                result['status'] = 'applied'
+                activity.append(ActivityEvent(
+                    event_type=ActivityEvent.LESSON_COMPLETED, student=user, course_id=course_id,
+                    lesson_id=lesson_id, occurred_at=timestamp,
+                ))
+
+        if completed:
+            LessonProgress.objects.bulk_create(
+                completed.values(),
+                update_conflicts=True,
+                unique_fields=['student', 'lesson'],
+                update_fields=['is_completed', 'completed_at', 'last_accessed'],
+            )
+        apply_increments(increments, record_activity=False)
+
+        updated = []
+        for course_id, count in newly_completed.items():
+            enrollment = enrollments[course_id]
+            enrollment.set_progress(enrollment.completed_lessons + count, enrollment.course.lesson_count)
+            updated.append(enrollment)
+        if updated:
+            Enrollment.objects.bulk_update(
+                updated, ['completed_lessons', 'progress_percentage', 'is_completed', 'completed_at']
+            )
+        record_events(activity)
+
+    progress = list(
+        LessonProgress.objects.filter(student=user, lesson__in=touched)
+        .select_related('lesson')
+        .order_by('lesson_id')
+    ) if touched else []
+    return results, progress
@@ -0,0 +1,56 @@
+"""
+JSON renderer backed by orjson when it is installed.
+
+``JSONRenderer`` writes the same bytes as DRF's renderer for the
+project's compact responses, a few times faster on large course trees.
+Values orjson does not handle itself (``Decimal``, ``datetime``, lazy
+strings, files) go through ``JSONEncoder.default``, so they come out as
+they do with the stdlib encoder. Indented output (the browsable API,
+``Accept: application/json; indent=4``), integers beyond 64 bits and
+anything orjson rejects fall back to DRF's stdlib rendering. The only
+difference left is the exponent form of very large or small floats
+(``1e16`` rather than ``1e+16``), which parses to the same number.
+"""
+from django.db.models.fields.files import FieldFile
+from rest_framework import renderers
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:  # Optional, see requirements.txt
+    orjson = None
+
+ORJSON_OPTIONS = (
+    orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_NON_STR_KEYS
+    if orjson is not None else 0
+)
+
+
+class JSONEncoder(encoders.JSONEncoder):
+    """DRF's encoder, plus file values (e.g. an ImageField) as their URL"""
+
+    def default(self, obj):
+        if isinstance(obj, FieldFile):
+            # Like FileField.to_representation without a request
+            return obj.url if obj else None
+        return super().default(obj)
+
+
+class JSONRenderer(renderers.JSONRenderer):
+    encoder_class = JSONEncoder
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Escaped like DRF does, to keep the output a strict JavaScript subset
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
@@ -0,0 +1,170 @@
+"""
+Shared response cache for the anonymous catalog endpoints.
+
+Rendered responses are stored in Django's default cache, keyed on the
+endpoint group, the request path, the normalized query string and the
+negotiated format. Every group has a generation number that is part of
+the key; saving or deleting a model the group depends on bumps the
+generation (see core.signals), which makes all of its entries
+unreachable at once. Only plain cache get/set/incr are used, so this works
+with the local-memory and file backends as well as with any shared
+backend configured in ``CACHES``.
+"""
+import hashlib
+import time
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.template.response import SimpleTemplateResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+
+KEY_PREFIX = 'catalog-response'
+
+# Endpoint group -> models whose changes invalidate it
+GROUP_DEPENDENCIES = {
+    # Course lists show the instructor's name
+    'course-list': ('course', 'category', 'module', 'lesson', 'user'),
+    'category-list': ('course', 'category'),
+    'category-courses': ('course', 'category', 'module', 'lesson', 'user'),
+}
+
+CACHED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified', 'Cache-Control', 'Vary')
+
+
+def get_timeout():
+    return getattr(settings, 'CATALOG_CACHE_TIMEOUT', 300)
+
+
+def _generation_key(group):
+    return f'{KEY_PREFIX}:generation:{group}'
+
+
+def get_generation(group):
+    generation = cache.get(_generation_key(group))
+    if generation is None:
+        # Start from a fresh value so entries written before an eviction stay unreachable
+        generation = time.time_ns()
+        cache.add(_generation_key(group), generation, None)
+        generation = cache.get(_generation_key(group), generation)
+    return generation
+
+
+def bump_generation(group):
+    try:
+        cache.incr(_generation_key(group))
+    except ValueError:
+        cache.set(_generation_key(group), time.time_ns(), None)
+
+
+def invalidate_for_model(model_name):
+    """Invalidate every group depending on ``model_name``, once the transaction commits"""
+    groups = [group for group, models in GROUP_DEPENDENCIES.items() if model_name in models]
+
+    def bump():
+        for group in groups:
+            bump_generation(group)
+
+    transaction.on_commit(bump)
+
+
+def _count(name):
+    key = f'{KEY_PREFIX}:stats:{name}'
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            pass
+
+
+def get_stats():
+    """Hit/miss counters of the response cache"""
+    hits = cache.get(f'{KEY_PREFIX}:stats:hits', 0)
+    misses = cache.get(f'{KEY_PREFIX}:stats:misses', 0)
+    lookups = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / lookups, 4) if lookups else None,
+    }
+
+
+def reset_stats():
+    cache.delete_many([f'{KEY_PREFIX}:stats:hits', f'{KEY_PREFIX}:stats:misses'])
+
+
+def is_cacheable(request):
+    """Anonymous GET/HEAD requests without any credentials"""
+    return (
+        request.method in ('GET', 'HEAD')
+        and not request.META.get('HTTP_AUTHORIZATION')
+        and settings.SESSION_COOKIE_NAME not in request.COOKIES
+        and not request.user.is_authenticated
+    )
+
+
+def cache_key(group, request):
+    query = urlencode(sorted(
+        (key, value) for key, values in request.query_params.lists() for value in values
+    ))
+    renderer = getattr(request, 'accepted_renderer', None)
+    fingerprint = '|'.join([
+        request.path, query, getattr(renderer, 'format', '') or '',
+    ])
+    digest = hashlib.md5(fingerprint.encode()).hexdigest()
+    return f'{KEY_PREFIX}:{group}:{get_generation(group)}:{digest}'
+
+
+def store_response(key, response):
+    """Store a rendered 200 response under ``key``"""
+    headers = {name: response[name] for name in CACHED_HEADERS if response.has_header(name)}
+    cache.set(key, (response.status_code, headers, response.content), get_timeout())
+
+
+def replay_response(request, cached):
+    """Response for a cache entry, honouring the request's conditional headers"""
+    status_code, headers, content = cached
+    response = HttpResponse(content, status=status_code)
+    for name, value in headers.items():
+        response[name] = value
+    response['X-Cache'] = 'HIT'
+    last_modified = parse_http_date_safe(headers.get('Last-Modified', ''))
+    return get_conditional_response(
+        request, etag=headers.get('ETag'), last_modified=last_modified, response=response
+    )
+
+
+def lookup(group, request):
+    """(cache key, cached response or None) for a cacheable request; counts the hit or miss"""
+    key = cache_key(group, request)
+    cached = cache.get(key)
+    if cached is None:
+        _count('misses')
+        return key, None
+    _count('hits')
+    return key, replay_response(request, cached)
+
+
+def cache_anonymous_response(group):
+    """Serve a viewset method from the shared cache for anonymous requests"""
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            if not is_cacheable(request):
+                return method(self, request, *args, **kwargs)
+
+            key, cached = lookup(group, request)
+            if cached is not None:
+                return cached
+
+            response = method(self, request, *args, **kwargs)
+            if response.status_code == 200 and isinstance(response, SimpleTemplateResponse):
+                response['X-Cache'] = 'MISS'
+                response.add_post_render_callback(lambda rendered: store_response(key, rendered))
+            return response
+        return wrapper
+    return decorator
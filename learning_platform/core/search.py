@@ -0,0 +1,183 @@
+"""
+Ranked full-text search for the course catalog.
+
+``get_search_backend()`` returns the backend for the configured database:
+
+* PostgreSQL: a generated, weighted ``tsvector`` column on ``core_course``
+  with a GIN index (title > tags > description), ranked with ``ts_rank``.
+* SQLite: an FTS5 shadow table ``core_course_fts`` kept in sync on Course
+  save/delete (core.signals), ranked with ``bm25``.
+* Anything else, or SQLite without FTS5: the old ``icontains`` filter.
+
+The database objects are created by migration 0005 and can be rebuilt with
+``manage.py rebuild_search_index``. Every backend annotates matching
+courses with ``search_rank`` (higher is better).
+"""
+import re
+
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+MAX_SEARCH_TERMS = 10
+
+POSTGRES_SEARCH_CONFIG = 'english'
+
+POSTGRES_SETUP_SQL = [
+    f"""
+    ALTER TABLE core_course ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('{POSTGRES_SEARCH_CONFIG}', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('{POSTGRES_SEARCH_CONFIG}', coalesce(tags, '')), 'B') ||
+        setweight(to_tsvector('{POSTGRES_SEARCH_CONFIG}', coalesce(description, '')), 'C')
+    ) STORED
+    """,
+    'CREATE INDEX IF NOT EXISTS core_course_search_vector_idx ON core_course USING GIN (search_vector)',
+]
+
+POSTGRES_TEARDOWN_SQL = [
+    'DROP INDEX IF EXISTS core_course_search_vector_idx',
+    'ALTER TABLE core_course DROP COLUMN IF EXISTS search_vector',
+]
+
+SQLITE_SETUP_SQL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS core_course_fts
+    USING fts5(title, tags, description, tokenize='porter unicode61')
+    """,
+]
+
+SQLITE_TEARDOWN_SQL = [
+    'DROP TABLE IF EXISTS core_course_fts',
+]
+
+
+def search_terms(query):
+    """Split a user query into lower-cased word terms"""
+    return re.findall(r'\w+', query.lower())[:MAX_SEARCH_TERMS]
+
+
+class CourseSearchBackend:
+    """Interface shared by the course search implementations"""
+
+    def search(self, queryset, query):
+        """Filter ``queryset`` to courses matching ``query``, annotated with ``search_rank``"""
+        raise NotImplementedError
+
+    def index_course(self, course):
+        """Bring the index entry of ``course`` up to date"""
+
+    def no_results(self, queryset):
+        return queryset.none().annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+    def remove_course(self, course_id):
+        """Drop the index entry of a deleted course"""
+
+    def rebuild(self):
+        """Re-create the search structures and index every course"""
+
+
+class BasicCourseSearch(CourseSearchBackend):
+    """Unranked substring search, used when no full-text engine is available"""
+
+    def search(self, queryset, query):
+        return queryset.filter(
+            Q(title__icontains=query) |
+            Q(description__icontains=query) |
+            Q(tags__icontains=query)
+        ).annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+class PostgresCourseSearch(CourseSearchBackend):
+    """Weighted tsvector search with prefix matching"""
+
+    def search(self, queryset, query):
+        terms = search_terms(query)
+        if not terms:
+            return self.no_results(queryset)
+        tsquery = ' & '.join(f'{term}:*' for term in terms)
+        match = RawSQL(
+            f'"core_course"."search_vector" @@ to_tsquery(\'{POSTGRES_SEARCH_CONFIG}\', %s)',
+            [tsquery],
+            output_field=BooleanField(),
+        )
+        rank = RawSQL(
+            f'ts_rank("core_course"."search_vector", to_tsquery(\'{POSTGRES_SEARCH_CONFIG}\', %s))',
+            [tsquery],
+            output_field=FloatField(),
+        )
+        return queryset.filter(match).annotate(search_rank=rank)
+
+    def rebuild(self):
+        # The column is generated by the database, recreating it re-indexes every row
+        with connection.cursor() as cursor:
+            for sql in POSTGRES_TEARDOWN_SQL + POSTGRES_SETUP_SQL:
+                cursor.execute(sql)
+
+
+class SQLiteCourseSearch(CourseSearchBackend):
+    """FTS5 search with prefix matching, ranked by bm25"""
+
+    # bm25 column weights for (title, tags, description)
+    RANK_SQL = 'bm25(core_course_fts, 10.0, 5.0, 1.0)'
+
+    def search(self, queryset, query):
+        terms = search_terms(query)
+        if not terms:
+            return self.no_results(queryset)
+        match_query = ' '.join(f'"{term}"*' for term in terms)
+        matches = RawSQL(
+            'SELECT rowid FROM core_course_fts WHERE core_course_fts MATCH %s',
+            [match_query],
+        )
+        rank = RawSQL(
+            f'SELECT -{self.RANK_SQL} FROM core_course_fts '
+            'WHERE core_course_fts MATCH %s AND rowid = "core_course"."id"',
+            [match_query],
+            output_field=FloatField(),
+        )
+        return queryset.filter(pk__in=matches).annotate(search_rank=rank)
+
+    def index_course(self, course):
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM core_course_fts WHERE rowid = %s', [course.pk])
+            cursor.execute(
+                'INSERT INTO core_course_fts (rowid, title, tags, description) VALUES (%s, %s, %s, %s)',
+                [course.pk, course.title, course.tags or '', course.description],
+            )
+
+    def remove_course(self, course_id):
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM core_course_fts WHERE rowid = %s', [course_id])
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            for sql in SQLITE_TEARDOWN_SQL + SQLITE_SETUP_SQL:
+                cursor.execute(sql)
+            cursor.execute(
+                'INSERT INTO core_course_fts (rowid, title, tags, description) '
+                "SELECT id, title, coalesce(tags, ''), description FROM core_course"
+            )
+
+
+def sqlite_has_fts5(using=None):
+    """Whether the SQLite library was compiled with FTS5"""
+    with (using or connection).cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        return 'ENABLE_FTS5' in {row[0] for row in cursor.fetchall()}
+
+
+_backend = None
+
+
+def get_search_backend():
+    """Course search backend for the default database"""
+    global _backend
+    if _backend is None:
+        if connection.vendor == 'postgresql':
+            _backend = PostgresCourseSearch()
+        elif connection.vendor == 'sqlite' and sqlite_has_fts5():
+            _backend = SQLiteCourseSearch()
+        else:
+            _backend = BasicCourseSearch()
+    return _backend
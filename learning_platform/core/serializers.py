@@ -3,11 +3,12 @@ from django.contrib.auth.models import User
 from .models import (
     UserProfile, Category, Course, Module, Lesson, 
     Enrollment, LessonProgress, Quiz, QuizQuestion, 
-    QuizOption, QuizAttempt
+    QuizOption, QuizAttempt, QuizAttemptSummary, Job
 )
+from .fieldsets import ShapedSerializerMixin
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(ShapedSerializerMixin, serializers.ModelSerializer):
     """User serializer for API responses"""
     class Meta:
         model = User
@@ -15,9 +16,10 @@ class UserSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'date_joined']
 
 
-class UserProfileSerializer(serializers.ModelSerializer):
+class UserProfileSerializer(ShapedSerializerMixin, serializers.ModelSerializer):
     """User profile serializer with user data"""
     user = UserSerializer(read_only=True)
+    expandable_fields = {'user': ('UserSerializer', 'user')}
     
     class Meta:
         model = UserProfile
@@ -26,7 +28,7 @@ class UserProfileSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(ShapedSerializerMixin, serializers.ModelSerializer):
     """Category serializer"""
     course_count = serializers.SerializerMethodField()
     
@@ -36,15 +38,18 @@ class CategorySerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'course_count', 'created_at']
     
     def get_course_count(self, obj):
+        if hasattr(obj, 'course_total'):
+            return obj.course_total or 0
         return obj.course_set.count()
 
 
-class CourseListSerializer(serializers.ModelSerializer):
+class CourseListSerializer(ShapedSerializerMixin, serializers.ModelSerializer):
     """Course serializer for list views (lightweight)"""
     instructor_name = serializers.CharField(source='instructor.get_full_name', read_only=True)
     category_name = serializers.CharField(source='category.name', read_only=True)
     total_modules = serializers.ReadOnlyField()
     total_lessons = serializers.ReadOnlyField()
+    related_fields = {'instructor_name': ['instructor'], 'category_name': ['category']}
     
     class Meta:
         model = Course
@@ -55,12 +60,17 @@ class CourseListSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'total_modules', 'total_lessons', 'created_at']
 
 
-class CourseDetailSerializer(serializers.ModelSerializer):
+class CourseDetailSerializer(ShapedSerializerMixin, serializers.ModelSerializer):
     """Course serializer for detail views (full data)"""
     instructor = UserSerializer(read_only=True)
-    category = CategorySerializer(read_only=True)
+    category = serializers.SerializerMethodField()
     modules = serializers.SerializerMethodField()
     enrollment_count = serializers.SerializerMethodField()
+    expandable_fields = {
+        'instructor': ('UserSerializer', 'instructor'),
+        'category': ('CategorySerializer', 'category'),
+        'modules': ('ModuleSerializer', 'modules'),
+    }
     
     class Meta:
         model = Course
@@ -70,17 +80,30 @@ class CourseDetailSerializer(serializers.ModelSerializer):
                  'modules', 'enrollment_count', 'created_at', 'updated_at']
         read_only_fields = ['id', 'created_at', 'updated_at']
     
+    def get_category(self, obj):
+        if obj.category_id is None or not self.expands('category'):
+            return obj.category_id
+        if hasattr(obj, 'category_course_total'):
+            # Annotated by CourseViewSet.get_queryset
+            obj.category.course_total = obj.category_course_total
+        return self.nested('category', obj.category)
+    
     def get_modules(self, obj):
-        modules = obj.modules.all()
-        return ModuleSerializer(modules, many=True, context=self.context).data
+        if 'course_modules' in self.context:
+            # Already rendered by core.fast_serializers
+            return self.context['course_modules']
+        return self.nested('modules', obj.modules.all(), many=True)
     
     def get_enrollment_count(self, obj):
+        if hasattr(obj, 'enrollment_total'):
+            return obj.enrollment_total or 0
         return obj.enrollments.count()
 
 
-class ModuleSerializer(serializers.ModelSerializer):
+class ModuleSerializer(ShapedSerializerMixin, serializers.ModelSerializer):
     """Module serializer"""
     lessons = serializers.SerializerMethodField()
+    expandable_fields = {'lessons': ('LessonSerializer', 'lessons')}
     
     class Meta:
         model = Module
@@ -88,14 +111,18 @@ class ModuleSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
     
     def get_lessons(self, obj):
-        lessons = obj.lessons.all()
-        return LessonSerializer(lessons, many=True, context=self.context).data
+        return self.nested('lessons', obj.lessons.all(), many=True)
 
 
-class LessonSerializer(serializers.ModelSerializer):
+class LessonSerializer(ShapedSerializerMixin, serializers.ModelSerializer):
     """Lesson serializer"""
     quiz = serializers.SerializerMethodField()
     progress = serializers.SerializerMethodField()
+    # Progress comes from the lesson_progress context, not a prefetch
+    expandable_fields = {
+        'quiz': ('QuizSerializer', 'quiz'),
+        'progress': ('LessonProgressSerializer', None),
+    }
     
     class Meta:
         model = Lesson
@@ -106,54 +133,59 @@ class LessonSerializer(serializers.ModelSerializer):
     
     def get_quiz(self, obj):
         if hasattr(obj, 'quiz'):
-            return QuizSerializer(obj.quiz, context=self.context).data
+            return self.nested('quiz', obj.quiz)
         return None
     
     def get_progress(self, obj):
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            try:
-                progress = obj.progress.get(student=request.user)
-                return LessonProgressSerializer(progress).data
-            except LessonProgress.DoesNotExist:
-                return None
+            # Views serializing a whole course tree preload the user's progress
+            # as {lesson_id: LessonProgress} to avoid one query per lesson
+            progress_map = self.context.get('lesson_progress')
+            if progress_map is not None:
+                progress = progress_map.get(obj.pk)
+                if progress is None:
+                    return None
+            else:
+                try:
+                    progress = obj.progress.get(student=request.user)
+                except LessonProgress.DoesNotExist:
+                    return None
+            progress.lesson = obj
+            return self.nested('progress', progress)
         return None
 
 
-class EnrollmentSerializer(serializers.ModelSerializer):
+class EnrollmentSerializer(ShapedSerializerMixin, serializers.ModelSerializer):
     """Enrollment serializer"""
     student = UserSerializer(read_only=True)
     course = CourseListSerializer(read_only=True)
     progress_percentage = serializers.SerializerMethodField()
+    expandable_fields = {
+        'student': ('UserSerializer', 'student'),
+        'course': ('CourseListSerializer', 'course'),
+    }
+    related_fields = {'progress_percentage': ['course']}
     
     class Meta:
         model = Enrollment
         fields = ['id', 'student', 'course', 'enrolled_at', 'completed_at', 
-                 'is_completed', 'progress_percentage']
-        read_only_fields = ['id', 'enrolled_at']
+                 'is_completed', 'completed_lessons', 'progress_percentage']
+        read_only_fields = ['id', 'enrolled_at', 'completed_lessons']
     
     def get_progress_percentage(self, obj):
         if obj.is_completed:
             return 100
-        
-        course = obj.course
-        total_lessons = course.total_lessons
-        if total_lessons == 0:
+        if obj.course.total_lessons == 0:
             return 0
-        
-        completed_lessons = LessonProgress.objects.filter(
-            student=obj.student,
-            lesson__module__course=course,
-            is_completed=True
-        ).count()
-        
-        return round((completed_lessons / total_lessons) * 100, 2)
+        return obj.progress_percentage
 
 
-class LessonProgressSerializer(serializers.ModelSerializer):
+class LessonProgressSerializer(ShapedSerializerMixin, serializers.ModelSerializer):
     """Lesson progress serializer"""
     lesson_title = serializers.CharField(source='lesson.title', read_only=True)
     lesson_order = serializers.IntegerField(source='lesson.order', read_only=True)
+    related_fields = {'lesson_title': ['lesson'], 'lesson_order': ['lesson']}
     
     class Meta:
         model = LessonProgress
@@ -162,26 +194,29 @@ class LessonProgressSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'last_accessed']
 
 
-class QuizOptionSerializer(serializers.ModelSerializer):
+class QuizOptionSerializer(ShapedSerializerMixin, serializers.ModelSerializer):
     """Quiz option serializer"""
     class Meta:
         model = QuizOption
         fields = ['id', 'option_text', 'is_correct', 'order']
 
 
-class QuizQuestionSerializer(serializers.ModelSerializer):
+class QuizQuestionSerializer(ShapedSerializerMixin, serializers.ModelSerializer):
     """Quiz question serializer"""
     options = QuizOptionSerializer(many=True, read_only=True)
+    expandable_fields = {'options': ('QuizOptionSerializer', 'options')}
     
     class Meta:
         model = QuizQuestion
         fields = ['id', 'question_text', 'question_type', 'points', 'order', 'options']
 
 
-class QuizSerializer(serializers.ModelSerializer):
+class QuizSerializer(ShapedSerializerMixin, serializers.ModelSerializer):
     """Quiz serializer"""
     questions = QuizQuestionSerializer(many=True, read_only=True)
     questions_count = serializers.SerializerMethodField()
+    expandable_fields = {'questions': ('QuizQuestionSerializer', 'questions')}
+    related_fields = {'questions_count': ['questions']}
     
     class Meta:
         model = Quiz
@@ -193,10 +228,11 @@ class QuizSerializer(serializers.ModelSerializer):
         return obj.questions.count()
 
 
-class QuizAttemptSerializer(serializers.ModelSerializer):
+class QuizAttemptSerializer(ShapedSerializerMixin, serializers.ModelSerializer):
     """Quiz attempt serializer"""
     student_name = serializers.CharField(source='student.get_full_name', read_only=True)
     quiz_title = serializers.CharField(source='quiz.title', read_only=True)
+    related_fields = {'student_name': ['student'], 'quiz_title': ['quiz']}
     
     class Meta:
         model = QuizAttempt
@@ -205,6 +241,30 @@ class QuizAttemptSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'started_at']
 
 
+class QuizAttemptSummarySerializer(serializers.ModelSerializer):
+    """A student's attempt count, best score and pass status for one quiz"""
+    quiz_title = serializers.CharField(source='quiz.title', read_only=True)
+    attempts_remaining = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = QuizAttemptSummary
+        fields = ['quiz', 'quiz_title', 'attempts', 'attempts_remaining', 'best_score', 'passed',
+                 'last_attempt_at']
+        read_only_fields = fields
+    
+    def get_attempts_remaining(self, obj):
+        return max(obj.quiz.max_attempts - obj.attempts, 0)
+
+
+class JobSerializer(serializers.ModelSerializer):
+    """Background job serializer (see core.jobs)"""
+    class Meta:
+        model = Job
+        fields = ['id', 'task', 'payload', 'status', 'attempts', 'max_attempts', 'run_after',
+                 'result', 'last_error', 'created_by', 'created_at', 'started_at', 'finished_at']
+        read_only_fields = fields
+
+
 # Serializers for creating/updating objects
 class CourseCreateUpdateSerializer(serializers.ModelSerializer):
     """Serializer for creating/updating courses"""
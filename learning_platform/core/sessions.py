@@ -0,0 +1,26 @@
+"""
+Session engine: Django's cached_db sessions, with hit/miss counters.
+
+Enable with ``SESSION_ENGINE = 'core.sessions'``. Session reads come from
+the default cache and only fall back to ``django_session`` on a miss.
+"""
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+
+from .authentication import HitCounter
+
+stats = HitCounter()
+
+
+class SessionStore(CachedDBStore):
+    """cached_db session store that records cache hits and misses"""
+
+    def load(self):
+        self._loaded_from_db = False
+        data = super().load()
+        if self.session_key:
+            stats.count('misses' if self._loaded_from_db else 'hits')
+        return data
+
+    def _get_session_from_db(self):
+        self._loaded_from_db = True
+        return super()._get_session_from_db()
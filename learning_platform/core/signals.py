@@ -0,0 +1,181 @@
+from django.contrib.auth.models import User
+from django.db.models import F, QuerySet
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from .authentication import revoke_token, revoke_user
+from .counters import (
+    refresh_attempt_summaries, refresh_course_counters, refresh_module_counters,
+    refresh_enrollment_progress
+)
+from .models import Category, Course, Module, Lesson, Quiz, QuizAttempt, QuizQuestion, QuizOption
+from .response_cache import invalidate_for_model
+from .search import get_search_backend
+from .tags import sync_course_tags
+
+
+def _deleted_with(origin, *models):
+    """Whether a delete started from (a queryset of) one of ``models`` and cascaded from there"""
+    return isinstance(origin, models) or isinstance(origin, QuerySet) and issubclass(origin.model, models)
+
+
+def _refresh_courses(course_ids):
+    """Refresh course counters and the stored progress of their enrollments"""
+    course_ids = {pk for pk in course_ids if pk is not None}
+    refresh_course_counters(course_ids)
+    refresh_enrollment_progress(course_ids)
+
+
+@receiver(post_save, sender=Course)
+def index_course_for_search(sender, instance, **kwargs):
+    get_search_backend().index_course(instance)
+
+
+@receiver(post_save, sender=Course)
+def sync_normalized_tags(sender, instance, raw=False, **kwargs):
+    """Mirror the comma-separated Course.tags into Tag/CourseTag rows"""
+    if raw:
+        return
+    sync_course_tags(instance)
+
+
+@receiver(post_delete, sender=Course)
+def remove_course_from_search(sender, instance, **kwargs):
+    get_search_backend().remove_course(instance.pk)
+
+
+@receiver(pre_save, sender=Module)
+def remember_module_course(sender, instance, raw=False, **kwargs):
+    """Remember the course a module belonged to before it is saved"""
+    instance._previous_course_id = None
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    instance._previous_course_id = (
+        Module.objects.filter(pk=instance.pk).values_list('course_id', flat=True).first()
+    )
+
+
+@receiver(post_save, sender=Module)
+def update_counters_on_module_save(sender, instance, created, raw=False, **kwargs):
+    """Keep Course.module_count/lesson_count correct when modules are added or moved"""
+    if raw:
+        return
+    previous_course_id = getattr(instance, '_previous_course_id', None)
+    if created or previous_course_id != instance.course_id:
+        _refresh_courses([instance.course_id, previous_course_id])
+
+
+@receiver(post_delete, sender=Module)
+def update_counters_on_module_delete(sender, instance, origin=None, **kwargs):
+    # Nothing is left to count when the whole course is deleted
+    if _deleted_with(origin, Course):
+        return
+    _refresh_courses([instance.course_id])
+
+
+@receiver(pre_save, sender=Lesson)
+def remember_lesson_module(sender, instance, raw=False, **kwargs):
+    """Remember the module/course a lesson belonged to before it is saved"""
+    instance._previous_module = (None, None)
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    previous = (
+        Lesson.objects.filter(pk=instance.pk)
+        .values_list('module_id', 'module__course_id')
+        .first()
+    )
+    if previous:
+        instance._previous_module = previous
+
+
+@receiver(post_save, sender=Lesson)
+def update_counters_on_lesson_save(sender, instance, created, raw=False, **kwargs):
+    """Keep Module.lesson_count and Course.lesson_count correct when lessons are added or moved"""
+    if raw:
+        return
+    previous_module_id, previous_course_id = getattr(instance, '_previous_module', (None, None))
+    if created or previous_module_id != instance.module_id:
+        refresh_module_counters([instance.module_id, previous_module_id])
+        _refresh_courses([instance.module.course_id, previous_course_id])
+
+
+@receiver(post_delete, sender=Lesson)
+def update_counters_on_lesson_delete(sender, instance, origin=None, **kwargs):
+    # Deleting a module refreshes its course once, after all of its lessons are gone
+    if _deleted_with(origin, Course, Module):
+        return
+    refresh_module_counters([instance.module_id])
+    _refresh_courses(
+        Module.objects.filter(pk=instance.module_id).values_list('course_id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=QuizAttempt)
+def update_summary_on_attempt_delete(sender, instance, **kwargs):
+    """A deleted attempt no longer counts towards the limit or the best score"""
+    refresh_attempt_summaries([instance.quiz_id], [instance.student_id])
+
+
+@receiver(post_save, sender=QuizQuestion)
+@receiver(post_delete, sender=QuizQuestion)
+def bump_quiz_version_on_question_change(sender, instance, raw=False, **kwargs):
+    """Invalidate compiled answer keys (core.grading) when a question changes"""
+    if raw:
+        return
+    Quiz.objects.filter(pk=instance.quiz_id).update(
+        version=F('version') + 1, updated_at=timezone.now()
+    )
+
+
+@receiver(post_save, sender=QuizOption)
+@receiver(post_delete, sender=QuizOption)
+def bump_quiz_version_on_option_change(sender, instance, raw=False, **kwargs):
+    """Invalidate compiled answer keys (core.grading) when an option changes"""
+    if raw:
+        return
+    Quiz.objects.filter(questions=instance.question_id).update(
+        version=F('version') + 1, updated_at=timezone.now()
+    )
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Module)
+@receiver(post_delete, sender=Module)
+@receiver(post_save, sender=Lesson)
+@receiver(post_delete, sender=Lesson)
+def invalidate_catalog_responses(sender, **kwargs):
+    """Drop cached anonymous catalog responses that depend on the changed model"""
+    invalidate_for_model(sender._meta.model_name)
+
+
+@receiver(post_save, sender=User)
+def touch_taught_courses(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Course responses show the instructor's name; move their validators and cached copies"""
+    if raw or update_fields and set(update_fields) == {'last_login'}:
+        return
+    if Course.objects.filter(instructor=instance).update(updated_at=timezone.now()):
+        invalidate_for_model('user')
+
+
+@receiver(post_delete, sender=User)
+def invalidate_catalog_responses_on_user_delete(sender, instance, **kwargs):
+    invalidate_for_model('user')
+
+
+@receiver(post_delete, sender=Token)
+def revoke_cached_token(sender, instance, **kwargs):
+    revoke_token(instance.key)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def revoke_cached_user(sender, instance, update_fields=None, **kwargs):
+    """Deactivation, password or permission changes must apply to the next request"""
+    if update_fields and set(update_fields) == {'last_login'}:
+        return
+    revoke_user(instance)
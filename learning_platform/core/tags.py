@@ -0,0 +1,79 @@
+"""
+Normalized course tags.
+
+``Course.tags`` stays the editable comma-separated string; every save
+re-syncs it into Tag/CourseTag rows (core.signals) so tag filtering and
+facet counts can use exact, indexed lookups.
+"""
+from django.db.models import Count
+from django.utils.text import slugify
+
+from .models import Tag, CourseTag
+
+TAG_NAME_MAX_LENGTH = Tag._meta.get_field('name').max_length
+
+
+def parse_tags(value):
+    """Split a comma-separated tag string into {slug: name}, keeping the first spelling"""
+    tags = {}
+    for name in (value or '').split(','):
+        name = ' '.join(name.split())[:TAG_NAME_MAX_LENGTH]
+        slug = slugify(name)
+        if slug and slug not in tags:
+            tags[slug] = name
+    return tags
+
+
+def get_or_create_tags(tags):
+    """Tag rows for a {slug: name} mapping, creating the missing ones in bulk"""
+    existing = {tag.slug: tag for tag in Tag.objects.filter(slug__in=tags)}
+    missing = [Tag(slug=slug, name=name) for slug, name in tags.items() if slug not in existing]
+    if missing:
+        Tag.objects.bulk_create(missing, ignore_conflicts=True)
+        existing = {tag.slug: tag for tag in Tag.objects.filter(slug__in=tags)}
+    return existing
+
+
+def sync_course_tags(course):
+    """Make the CourseTag rows of ``course`` match its ``tags`` string"""
+    wanted = parse_tags(course.tags)
+    current = dict(
+        CourseTag.objects.filter(course=course).values_list('tag__slug', 'pk')
+    )
+
+    stale = [pk for slug, pk in current.items() if slug not in wanted]
+    if stale:
+        CourseTag.objects.filter(pk__in=stale).delete()
+
+    added = {slug: name for slug, name in wanted.items() if slug not in current}
+    if added:
+        tags = get_or_create_tags(added)
+        CourseTag.objects.bulk_create(
+            [CourseTag(course=course, tag=tags[slug]) for slug in added],
+            ignore_conflicts=True,
+        )
+
+
+def filter_by_tags(queryset, values):
+    """Courses tagged with every one of ``values`` (tag slugs or names)"""
+    slugs = {slugify(value) for value in values} - {''}
+    if not slugs:
+        return queryset
+    tagged = (
+        CourseTag.objects.filter(tag__slug__in=slugs)
+        .values('course')
+        .annotate(matched=Count('tag'))
+        .filter(matched=len(slugs))
+        .values('course')
+    )
+    return queryset.filter(pk__in=tagged)
+
+
+def tag_facets(queryset):
+    """Tag counts over the courses in ``queryset``, computed with one grouped query"""
+    return list(
+        CourseTag.objects.filter(course__in=queryset.order_by().values('pk'))
+        .values('tag__slug', 'tag__name')
+        .annotate(course_count=Count('course'))
+        .order_by('-course_count', 'tag__name')
+    )
@@ -0,0 +1,101 @@
+"""
+Tasks runnable as background jobs (core.jobs). Each one takes its job's
+payload as keyword arguments and returns a JSON-serializable summary,
+stored as the job's result.
+"""
+import secrets
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .activity import rollup_events
+from .analytics import refresh_analytics, refresh_courses
+from .certificates import KINDS, completed_enrollments, generate_certificates
+from .counters import refresh_course_counters, refresh_enrollment_progress, refresh_module_counters
+from .exports import ExportError, export_chunks
+from .item_analysis import refresh_item_analysis
+from .jobs import JobError, task
+from .models import Module, Quiz
+from .search import get_search_backend
+
+
+def get_export_root():
+    """Directory of exports written by jobs; not under MEDIA_ROOT, as they hold personal data"""
+    return Path(getattr(settings, 'EXPORT_ROOT', Path(settings.BASE_DIR) / 'exports'))
+
+
+@task('certificates.generate')
+def generate_certificates_task(courses=(), user_ids=(), since=None, kinds=None, force=False):
+    """Store the certificates of completed enrollments, rendered in the job's own worker"""
+    since = parse_date(since) if since else None
+    enrollments = completed_enrollments(courses, user_ids, since)
+    return generate_certificates(enrollments, kinds or list(KINDS), workers=1, force=force)
+
+
+@task('exports.write')
+def write_export_task(kind, export_format='csv', courses=(), date_from=None, date_to=None, users=()):
+    """Write an export to a file (served by ``GET /api/jobs/{id}/download/``) rather than streaming it"""
+    name = f'{kind}-{timezone.now():%Y%m%d-%H%M%S}-{secrets.token_hex(4)}.{export_format}'
+    try:
+        chunks = export_chunks(
+            kind, export_format, courses=courses, date_from=date_from, date_to=date_to, users=users
+        )
+    except ExportError as e:
+        raise JobError(str(e))
+    path = get_export_root() / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    size = 0
+    with open(path, 'wb') as export_file:
+        for chunk in chunks:
+            export_file.write(chunk)
+            size += len(chunk)
+    return {'file': name, 'bytes': size}
+
+
+@task('activity.rollup')
+def rollup_activity_task():
+    total = 0
+    while True:
+        folded, watermark, moved = rollup_events()
+        if not moved:
+            return {'events': total, 'watermark': watermark}
+        total += folded
+
+
+@task('analytics.refresh')
+def refresh_analytics_task(course_ids=None):
+    """Refresh the instructor analytics of changed courses (or of ``course_ids``)"""
+    if course_ids is not None:
+        return {'courses': refresh_courses(course_ids)}
+    return {'courses': refresh_analytics()}
+
+
+@task('counters.refresh')
+def refresh_counters_task(course_ids=None):
+    """Recompute the stored course/module counters and enrollment progress"""
+    module_ids = None
+    if course_ids is not None:
+        module_ids = list(Module.objects.filter(course__in=course_ids).values_list('pk', flat=True))
+    return {
+        'modules': refresh_module_counters(module_ids),
+        'courses': refresh_course_counters(course_ids),
+        'enrollments': refresh_enrollment_progress(course_ids),
+    }
+
+
+@task('quizzes.item_analysis')
+def item_analysis_task(quiz_id):
+    """Analyze the stored responses of a quiz's attempts (served by ``GET /api/quizzes/{id}/item-analysis/``)"""
+    if not Quiz.objects.filter(pk=quiz_id).exists():
+        raise JobError(f'Unknown quiz {quiz_id}')
+    analysis = refresh_item_analysis(quiz_id)
+    return {'quiz': quiz_id, 'attempts': analysis.attempts, 'questions': len(analysis.results['questions'])}
+
+
+@task('search.rebuild')
+def rebuild_search_index_task():
+    backend = get_search_backend()
+    backend.rebuild()
+    return {'backend': backend.__class__.__name__}
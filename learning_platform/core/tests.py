@@ -1,3 +1,1683 @@
-from django.test import TestCase
+import asyncio
+import importlib
+import io
+import json
+import shutil
+import struct
+import tempfile
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import clear_url_caches, resolve
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed, ParseError
+from rest_framework.parsers import JSONParser as StdlibJSONParser
+from rest_framework.renderers import JSONRenderer as StdlibJSONRenderer
+from rest_framework.response import Response
+from rest_framework.test import APIClient, APIRequestFactory
+
+from . import response_cache, search, time_tracking
+from .activity import record_events, record_lesson_completed, rollup_events, time_spent_event
+from .analytics import refresh_analytics
+from .async_views import _semaphores, concurrency_slot
+from .authentication import CachedTokenAuthentication, auth_cache
+from .certificates import certificate_data, certificate_path, completed_enrollments, generate_certificates
+from .cohorts import bulk_enroll, lock_courses
+from .conditional import conditional_get
+from .fast_serializers import (
+    FastCourseListSerializer, FastEnrollmentSerializer, FastLessonSerializer, FastModuleSerializer
+)
+from .grading import CORRECT, get_answer_key, grade_answers
+from .item_analysis import refresh_item_analysis
+from .jobs import claim_jobs, enqueue, requeue_stale_jobs, retry_delay, run_job, task
+from .models import (
+    ActivityEvent, Category, Course, CourseAnalytics, DailyCourseActivity, Enrollment, Job, Lesson,
+    LessonProgress, Module, Quiz, QuizAttempt, QuizAttemptSummary, QuizOption, QuizQuestion,
+    QuizResponseLayout, UserProfile
+)
+from .parsers import JSONParser
+from .progress_sync import apply_progress_events
+from .renderers import JSONRenderer
+from .search import BasicCourseSearch, SQLiteCourseSearch, get_search_backend
+from .serializers import (
+    CourseListSerializer, EnrollmentSerializer, LessonSerializer, ModuleSerializer
+)
+from .time_tracking import TimeTrackingBuffer, add_time
+
+
+class CourseCounterTests(TestCase):
+    """Module and lesson counters follow creates, moves and deletes"""
+
+    def setUp(self):
+        instructor = User.objects.create_user('instructor', 'instructor@example.com', 'x')
+        self.course, self.other_course = [
+            Course.objects.create(
+                title=title, slug=title.lower(), description='', short_description='',
+                instructor=instructor, status='published',
+            )
+            for title in ('Forklift', 'Cranes')
+        ]
+        self.module = Module.objects.create(course=self.course, title='M1', order=1)
+        self.lessons = [Lesson.objects.create(module=self.module, title=f'L{n}', order=n) for n in (1, 2)]
+
+    def assertCounters(self, obj, *counters):
+        obj.refresh_from_db()
+        if isinstance(obj, Course):
+            self.assertEqual((obj.module_count, obj.lesson_count), counters)
+        else:
+            self.assertEqual((obj.lesson_count,), counters)
+
+    def test_create(self):
+        self.assertCounters(self.course, 1, 2)
+        self.assertCounters(self.module, 2)
+        Module.objects.create(course=self.course, title='M2', order=2)
+        self.assertCounters(self.course, 2, 2)
+        self.assertCounters(self.other_course, 0, 0)
+
+    def test_move(self):
+        other_module = Module.objects.create(course=self.other_course, title='M1', order=2)
+        lesson = self.lessons[0]
+        lesson.module = other_module
+        lesson.save()
+        self.assertCounters(self.module, 1)
+        self.assertCounters(other_module, 1)
+        self.assertCounters(self.course, 1, 1)
+        self.assertCounters(self.other_course, 1, 1)
+
+        self.module.course = self.other_course
+        self.module.save()
+        self.assertCounters(self.course, 0, 0)
+        self.assertCounters(self.other_course, 2, 2)
+
+    def test_delete(self):
+        self.lessons[0].delete()
+        self.assertCounters(self.module, 1)
+        self.assertCounters(self.course, 1, 1)
+        self.module.delete()
+        self.assertCounters(self.course, 0, 0)
+
+    def test_sync_course_counters_repairs_drift(self):
+        Course.objects.filter(pk=self.course.pk).update(module_count=5, lesson_count=0)
+        Module.objects.filter(pk=self.module.pk).update(lesson_count=9)
+
+        with self.assertRaises(CommandError):
+            call_command('sync_course_counters', '--check', stdout=io.StringIO())
+        out = io.StringIO()
+        call_command('sync_course_counters', stdout=out)
+        self.assertIn(f'Course {self.course.pk}: modules 5 -> 1, lessons 0 -> 2', out.getvalue())
+        self.assertCounters(self.course, 1, 2)
+        self.assertCounters(self.module, 2)
+        call_command('sync_course_counters', '--check', stdout=io.StringIO())
+
+
+class EnrollmentProgressTests(TestCase):
+    """Stored enrollment progress completes automatically and follows lesson changes"""
+
+    def setUp(self):
+        instructor = User.objects.create_user('instructor', 'instructor@example.com', 'x')
+        self.student = User.objects.create_user('student', 'student@example.com', 'x')
+        self.course = Course.objects.create(
+            title='Forklift', slug='forklift', description='', short_description='',
+            instructor=instructor, status='published',
+        )
+        self.module = Module.objects.create(course=self.course, title='M1', order=1)
+        self.lessons = [Lesson.objects.create(module=self.module, title=f'L{n}', order=n) for n in (1, 2)]
+        self.enrollment = Enrollment.objects.create(student=self.student, course=self.course)
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+
+    def complete(self, lesson):
+        self.assertEqual(self.client.post(f'/api/lessons/{lesson.pk}/complete/').status_code, 200)
+        self.enrollment.refresh_from_db()
+
+    def test_set_progress(self):
+        enrollment = Enrollment(student=self.student, course=self.course)
+        enrollment.set_progress(1, 3)
+        self.assertEqual((enrollment.progress_percentage, enrollment.is_completed), (33.33, False))
+        enrollment.set_progress(3, 3)
+        self.assertEqual((enrollment.progress_percentage, enrollment.is_completed), (100, True))
+        self.assertIsNotNone(enrollment.completed_at)
+        enrollment.set_progress(0, 0)
+        self.assertEqual(enrollment.progress_percentage, 0)
+
+    def test_completing_every_lesson_completes_the_enrollment(self):
+        self.complete(self.lessons[0])
+        self.assertEqual((self.enrollment.completed_lessons, self.enrollment.is_completed), (1, False))
+        self.assertEqual(self.enrollment.progress_percentage, 50)
+        self.complete(self.lessons[1])
+        self.assertEqual((self.enrollment.progress_percentage, self.enrollment.is_completed), (100, True))
+        self.assertIsNotNone(self.enrollment.completed_at)
+
+    def test_added_lesson_lowers_progress(self):
+        self.complete(self.lessons[0])
+        Lesson.objects.create(module=self.module, title='L3', order=3)
+        self.enrollment.refresh_from_db()
+        self.assertEqual((self.enrollment.completed_lessons, self.enrollment.progress_percentage), (1, 33.33))
+
+    def test_removed_lesson_can_complete_the_enrollment(self):
+        self.complete(self.lessons[0])
+        self.lessons[1].delete()
+        self.enrollment.refresh_from_db()
+        self.assertEqual((self.enrollment.progress_percentage, self.enrollment.is_completed), (100, True))
+
+        self.lessons[0].delete()
+        self.enrollment.refresh_from_db()
+        self.assertEqual((self.enrollment.completed_lessons, self.enrollment.progress_percentage), (0, 0))
+
+    def test_cascades_refresh_once(self):
+        def enrollment_updates(obj):
+            with CaptureQueriesContext(connection) as queries:
+                obj.delete()
+            return sum(query['sql'].startswith('UPDATE "core_enrollment"') for query in queries)
+
+        single_lesson = enrollment_updates(Lesson.objects.create(module=self.module, title='L3', order=3))
+        self.assertGreater(single_lesson, 0)
+        # A module's lessons are not refreshed one by one; the module refreshes its course once
+        self.assertEqual(enrollment_updates(self.module), single_lesson)
+
+        module = Module.objects.create(course=self.course, title='M2', order=2)
+        Lesson.objects.bulk_create([Lesson(module=module, title=f'L{n}', order=n) for n in (1, 2)])
+        self.assertEqual(enrollment_updates(self.course), 0)
+        self.assertFalse(Enrollment.objects.exists())
+
+
+@override_settings(FAST_SERIALIZERS=False)
+class LessonProgressContextTests(TestCase):
+    """Course tree reads load the user's lesson progress in one query, whatever the lesson count"""
+
+    PATHS = ['/api/courses/forklift/', '/api/courses/forklift/modules/', '/api/modules/']
+
+    def setUp(self):
+        instructor = User.objects.create_user('instructor', 'instructor@example.com', 'x')
+        self.student = User.objects.create_user('student', 'student@example.com', 'x')
+        self.course = Course.objects.create(
+            title='Forklift', slug='forklift', description='', short_description='',
+            instructor=instructor, status='published',
+        )
+        self.modules = [Module.objects.create(course=self.course, title=f'M{n}', order=n) for n in (1, 2)]
+        Enrollment.objects.create(student=self.student, course=self.course)
+        self.add_lessons(1)
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+
+    def add_lessons(self, count):
+        start = Lesson.objects.count()
+        for n in range(start, start + count):
+            lesson = Lesson.objects.create(module=self.modules[n % 2], title=f'L{n}', order=n)
+            if n % 3 == 0:
+                LessonProgress.objects.create(
+                    student=self.student, lesson=lesson, is_completed=True,
+                    completed_at=timezone.now(), time_spent_minutes=n,
+                )
+            elif n % 3 == 1:
+                LessonProgress.objects.create(student=self.student, lesson=lesson, time_spent_minutes=n)
+
+    def query_counts(self):
+        counts = {}
+        for path in self.PATHS:
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.client.get(path).status_code, 200)
+            counts[path] = len(queries)
+        return counts
+
+    def lesson_progress(self, data):
+        """{lesson id: progress} from a course detail, a module list or a paginated module list"""
+        if isinstance(data, dict):
+            data = data['modules'] if 'modules' in data else data['results']
+        return {lesson['id']: lesson['progress'] for module in data for lesson in module['lessons']}
+
+    def test_query_count_does_not_grow_with_lessons(self):
+        one_lesson = self.query_counts()
+        self.add_lessons(19)
+        self.assertEqual(Lesson.objects.count(), 20)
+        for path, count in one_lesson.items():
+            with self.assertNumQueries(count):
+                self.assertEqual(self.client.get(path).status_code, 200)
+
+    def test_progress_matches_the_per_lesson_lookup(self):
+        self.add_lessons(19)
+        request = APIRequestFactory().get('/')
+        request.user = self.student
+        # Without a lesson_progress map the serializer queries each lesson's progress itself
+        expected = {
+            lesson.pk: LessonSerializer(lesson, context={'request': request}).data['progress']
+            for lesson in Lesson.objects.all()
+        }
+        self.assertEqual(sum(progress is not None for progress in expected.values()), 14)
+        for path in self.PATHS:
+            self.assertEqual(self.lesson_progress(self.client.get(path).json()), expected, path)
+
+
+class QuizGradingTests(TestCase):
+    """Submissions are graded by points from the compiled answer key"""
+
+    def setUp(self):
+        instructor = User.objects.create_user('instructor', 'instructor@example.com', 'x')
+        self.student = User.objects.create_user('student', 'student@example.com', 'x')
+        course = Course.objects.create(
+            title='Forklift', slug='forklift', description='', short_description='',
+            instructor=instructor, status='published',
+        )
+        module = Module.objects.create(course=course, title='M1', order=1)
+        self.quiz = Quiz.objects.create(
+            lesson=Lesson.objects.create(module=module, title='L1'), title='Quiz', passing_score=50
+        )
+        Enrollment.objects.create(student=self.student, course=course)
+
+        self.choice = QuizQuestion.objects.create(quiz=self.quiz, question_text='Max load?', points=3, order=1)
+        self.right, self.wrong = [
+            QuizOption.objects.create(question=self.choice, option_text=text, is_correct=correct, order=n)
+            for n, (text, correct) in enumerate([('1000 kg', True), ('5000 kg', False)], 1)
+        ]
+        self.true_false = QuizQuestion.objects.create(
+            quiz=self.quiz, question_text='Forks down when parked?', question_type='true_false', order=2
+        )
+        self.true, self.false = [
+            QuizOption.objects.create(question=self.true_false, option_text=text, is_correct=text == 'True', order=n)
+            for n, text in enumerate(['True', 'False'], 1)
+        ]
+        self.quiz.refresh_from_db()
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+
+    def grade(self, answers):
+        return grade_answers(get_answer_key(self.quiz), answers)
+
+    def test_score_is_weighted_by_points(self):
+        self.assertEqual(self.grade([
+            {'question_id': self.choice.pk, 'option_id': self.right.pk},
+            {'question_id': self.true_false.pk, 'option_id': self.false.pk},
+        ]), (75, 3, 4, 1))
+        self.assertEqual(self.grade([
+            {'question_id': self.choice.pk, 'option_id': self.wrong.pk},
+            {'question_id': self.true_false.pk, 'option_id': self.true.pk},
+        ]), (25, 1, 4, 1))
+
+    def test_true_false(self):
+        self.assertEqual(self.grade([{'question_id': self.true_false.pk, 'option_id': self.true.pk}]).earned_points, 1)
+        self.assertEqual(self.grade([{'question_id': self.true_false.pk, 'option_id': self.false.pk}]).earned_points, 0)
+        # Picking both options is not a correct answer; the last answer to a question wins
+        self.assertEqual(self.grade([
+            {'question_id': self.true_false.pk, 'option_ids': [self.true.pk, self.false.pk]},
+        ]).earned_points, 0)
+        self.assertEqual(self.grade([
+            {'question_id': self.true_false.pk, 'option_id': self.false.pk},
+            {'question_id': self.true_false.pk, 'option_id': self.true.pk},
+        ]).earned_points, 1)
+
+    def test_submit(self):
+        response = self.client.post(f'/api/quizzes/{self.quiz.pk}/submit/', {'answers': [
+            {'question_id': self.choice.pk, 'option_id': self.right.pk},
+            {'question_id': self.true_false.pk, 'option_id': 'junk'},
+            'junk',
+        ]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()['score'], response.json()['passed']), (75, True))
+
+    def test_answers_must_be_a_list(self):
+        for data in ({'answers': 5}, {'answers': {'question_id': self.choice.pk}}, [1, 2]):
+            response = self.client.post(f'/api/quizzes/{self.quiz.pk}/submit/', data, format='json')
+            self.assertEqual(response.status_code, 400)
+        self.assertFalse(QuizAttempt.objects.exists())
+
+
+class CourseSearchTests(TestCase):
+    """Catalog search ranks by field weight and follows course saves and deletes"""
+
+    def setUp(self):
+        cache.clear()
+        self.instructor = User.objects.create_user('instructor', 'instructor@example.com', 'x')
+        self.in_title = self.create_course('Forklift Safety', 'Operating lift trucks.')
+        self.in_description = self.create_course('Warehouse Basics', 'Includes a short forklift module.')
+        self.create_course('Crane Rigging', 'Slings and hitches.')
+
+    def create_course(self, title, description, **fields):
+        return Course.objects.create(
+            title=title, slug=title.lower().replace(' ', '-'), description=description,
+            short_description='', instructor=self.instructor, status='published', **fields
+        )
+
+    def search(self, query):
+        return list(get_search_backend().search(Course.objects.all(), query)
+                    .order_by('-search_rank').values_list('title', flat=True))
+
+    def test_title_matches_rank_first(self):
+        self.assertIsInstance(get_search_backend(), SQLiteCourseSearch)
+        response = APIClient().get('/api/courses/', {'search': 'forklift'})
+        self.assertEqual(response.status_code, 200)
+        titles = [course['title'] for course in response.json()['results']]
+        self.assertEqual(titles, ['Forklift Safety', 'Warehouse Basics'])
+
+    def test_prefix_and_tag_matches(self):
+        self.create_course('Ladders', 'Three points of contact.', tags='osha, fall protection')
+        self.assertEqual(self.search('fork'), ['Forklift Safety', 'Warehouse Basics'])
+        self.assertEqual(self.search('osha'), ['Ladders'])
+        self.assertEqual(self.search('!!!'), [])
+
+    def test_signals_keep_the_index_current(self):
+        self.in_title.title = 'Pallet Jacks'
+        self.in_title.description = 'Manual pallet handling.'
+        self.in_title.save()
+        self.assertEqual(self.search('forklift'), ['Warehouse Basics'])
+        self.assertEqual(self.search('pallet'), ['Pallet Jacks'])
+
+        self.in_description.delete()
+        self.assertEqual(self.search('forklift'), [])
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT count(*) FROM core_course_fts')
+            self.assertEqual(cursor.fetchone()[0], 2)
+
+    def test_falls_back_to_substring_search_without_fts5(self):
+        self.addCleanup(setattr, search, '_backend', search._backend)
+        search._backend = None
+        with mock.patch('core.search.sqlite_has_fts5', return_value=False):
+            self.assertIsInstance(get_search_backend(), BasicCourseSearch)
+        self.assertEqual(sorted(self.search('forklift')), ['Forklift Safety', 'Warehouse Basics'])
+        self.assertEqual(self.search('rigging'), ['Crane Rigging'])
+
+
+class TagFacetTests(TestCase):
+    """Tag facets have their own route and follow the catalog filters"""
+
+    def setUp(self):
+        cache.clear()
+        instructor = User.objects.create_user('instructor', 'instructor@example.com', 'x')
+        for title, tags, status in [
+            ('Forklift', 'OSHA, forklift', 'published'),
+            ('Tags', 'OSHA', 'published'),
+            ('Cranes', 'rigging', 'draft'),
+        ]:
+            Course.objects.create(
+                title=title, slug=title.lower(), description='', short_description='',
+                instructor=instructor, status=status, tags=tags,
+            )
+
+    def test_facets(self):
+        client = APIClient()
+        self.assertEqual(client.get('/api/tags/').json(), [
+            {'slug': 'osha', 'name': 'OSHA', 'course_count': 2},
+            {'slug': 'forklift', 'name': 'forklift', 'course_count': 1},
+        ])
+        self.assertEqual(
+            {row['slug'] for row in client.get('/api/tags/', {'tag': 'forklift'}).json()}, {'forklift', 'osha'}
+        )
+        self.assertEqual(client.get('/api/tags/', {'search': 'tags'}).json(), [
+            {'slug': 'osha', 'name': 'OSHA', 'course_count': 1},
+        ])
+
+    def test_course_slug_tags_is_reachable(self):
+        response = APIClient().get('/api/courses/tags/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['title'], 'Tags')
+
+
+class CursorPaginationTests(TestCase):
+    """Cursor pages cover every row once, even when the ordering timestamps tie"""
+
+    ROWS = 45
+
+    def setUp(self):
+        self.student = User.objects.create_user('student', 'student@example.com', 'x', is_staff=True)
+        instructor = User.objects.create_user('instructor', 'instructor@example.com', 'x')
+        courses = Course.objects.bulk_create([
+            Course(title=f'C{n}', slug=f'c{n}', description='', short_description='', instructor=instructor)
+            for n in range(self.ROWS)
+        ])
+        Enrollment.objects.bulk_create([Enrollment(student=self.student, course=course) for course in courses])
+        lesson = Lesson.objects.create(module=Module.objects.create(course=courses[0], title='M1'), title='L1')
+        quiz = Quiz.objects.create(lesson=lesson, title='Quiz')
+        QuizAttempt.objects.bulk_create([QuizAttempt(student=self.student, quiz=quiz) for _ in range(self.ROWS)])
+        users = User.objects.bulk_create([User(username=f'u{n}') for n in range(self.ROWS - 1)])
+        UserProfile.objects.bulk_create([UserProfile(user=user) for user in [self.student, *users]])
+
+        # Every row of a kind shares its timestamp, the cursor position alone cannot tell them apart
+        tied = datetime(2026, 5, 1, 9, tzinfo=dt_timezone.utc)
+        Enrollment.objects.update(enrolled_at=tied)
+        QuizAttempt.objects.update(started_at=tied)
+        UserProfile.objects.update(created_at=tied)
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+
+    def walk(self, path):
+        ids = []
+        url = f'{path}?pagination=cursor'
+        pages = 0
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse([query for query in queries if 'COUNT(' in query['sql'].upper()], url)
+            data = response.json()
+            self.assertNotIn('count', data)
+            ids += [row['id'] for row in data['results']]
+            url = data['next']
+            pages += 1
+        self.assertEqual(pages, 3)
+        return ids
+
+    def test_pages_have_no_duplicates_or_gaps(self):
+        for path, model in [
+            ('/api/enrollments/', Enrollment),
+            ('/api/quiz-attempts/', QuizAttempt),
+            ('/api/profiles/', UserProfile),
+        ]:
+            expected = list(model.objects.order_by('-id').values_list('pk', flat=True))
+            self.assertEqual(len(expected), self.ROWS)
+            self.assertEqual(self.walk(path), expected, path)
+
+    def test_previous_pages(self):
+        first = self.client.get('/api/enrollments/?pagination=cursor').json()
+        second = self.client.get(first['next']).json()
+        self.assertEqual(self.client.get(second['previous']).json()['results'], first['results'])
+
+    def test_runs_of_ties_across_page_boundaries(self):
+        tied = datetime(2026, 5, 1, 9, tzinfo=dt_timezone.utc)
+        for enrollment in Enrollment.objects.all():
+            enrollment.enrolled_at = tied + timedelta(minutes=enrollment.pk % 4)
+            enrollment.save(update_fields=['enrolled_at'])
+        expected = list(Enrollment.objects.order_by('-enrolled_at', '-id').values_list('pk', flat=True))
+        self.assertEqual(self.walk('/api/enrollments/'), expected)
+
+        # Walk back from the last page
+        url = '/api/enrollments/?pagination=cursor'
+        while url:
+            data = self.client.get(url).json()
+            url = data['next']
+        ids = [row['id'] for row in data['results']]
+        while data['previous']:
+            data = self.client.get(data['previous']).json()
+            ids = [row['id'] for row in data['results']] + ids
+        self.assertEqual(ids, expected)
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get('/api/enrollments/?cursor=bm9wZQ==').status_code, 404)
+
+
+class ConditionalGetTests(TestCase):
+    """Course tree reads answer 304 while their validators match and change with the tree"""
+
+    def setUp(self):
+        self.instructor = User.objects.create_user('instructor', 'instructor@example.com', 'x')
+        self.student = User.objects.create_user('student', 'student@example.com', 'x')
+        self.category = Category.objects.create(name='Safety', slug='safety')
+        self.course = Course.objects.create(
+            title='Forklift', slug='forklift', description='', short_description='',
+            instructor=self.instructor, status='published', category=self.category,
+        )
+        self.module = Module.objects.create(course=self.course, title='M1', order=1)
+        self.lesson = Lesson.objects.create(module=self.module, title='L1')
+        quiz = Quiz.objects.create(lesson=self.lesson, title='Quiz')
+        question = QuizQuestion.objects.create(quiz=quiz, question_text='Q1')
+        self.option = QuizOption.objects.create(question=question, option_text='A', is_correct=True)
+        Enrollment.objects.create(student=self.student, course=self.course)
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+        self.paths = [
+            '/api/categories/', '/api/categories/safety/', '/api/categories/safety/courses/',
+            '/api/courses/', '/api/courses/forklift/', '/api/courses/forklift/modules/',
+            '/api/modules/', f'/api/modules/{self.module.pk}/',
+            '/api/lessons/', f'/api/lessons/{self.lesson.pk}/',
+        ]
+        # Endpoints showing the lessons, their quizzes and the user's progress
+        self.tree_paths = self.paths[4:]
+
+    def etags(self, paths, client=None, **headers):
+        etags = {}
+        for path in paths:
+            response = (client or self.client).get(path, **headers)
+            self.assertEqual(response.status_code, 200, path)
+            etags[path] = response['ETag']
+        return etags
+
+    def test_matching_validators_answer_304_with_one_query(self):
+        for path in self.paths:
+            response = self.client.get(path)
+            with self.assertNumQueries(1):
+                not_modified = self.client.get(path, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual((not_modified.status_code, not_modified.content), (304, b''), path)
+            self.assertEqual(not_modified['ETag'], response['ETag'])
+            with self.assertNumQueries(1):
+                not_modified = self.client.get(path, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+            self.assertEqual(not_modified.status_code, 304, path)
+            self.assertEqual(self.client.get(path, HTTP_IF_NONE_MATCH='"stale"').status_code, 200)
+
+    def test_tree_changes_move_the_etags(self):
+        # Lessons do not show their module
+        module_paths = self.tree_paths[:-2]
+        changes = [
+            (lambda: self.lesson.save(), self.tree_paths),
+            (lambda: self.module.save(), module_paths),
+            (lambda: self.option.save(), self.tree_paths),
+            (lambda: add_time(self.student.pk, self.lesson.pk, self.course.pk, 5), self.tree_paths),
+        ]
+        for change, paths in changes:
+            before = self.etags(self.tree_paths)
+            change()
+            after = self.etags(self.tree_paths)
+            for path in self.tree_paths:
+                if path in paths:
+                    self.assertNotEqual(before[path], after[path], path)
+                else:
+                    self.assertEqual(before[path], after[path], path)
+
+    def test_etags_depend_on_user_and_format(self):
+        etags = self.etags(self.paths)
+        other = APIClient()
+        other.force_authenticate(self.instructor)
+        for name, other_etags in [
+            ('user', self.etags(self.paths, other)),
+            ('accept', self.etags(self.paths, HTTP_ACCEPT='application/json; indent=2')),
+        ]:
+            for path in self.paths:
+                self.assertNotEqual(etags[path], other_etags[path], (name, path))
+        self.assertEqual(self.etags(self.paths), etags)
+
+    def test_post_is_never_answered_with_304(self):
+        class View:
+            def get_freshness(self):
+                return [{'version': 1}]
+
+            @conditional_get('get_freshness')
+            def handle(self, request):
+                return Response({'method': request.method})
+
+        def request(method, **headers):
+            request = getattr(APIRequestFactory(), method)('/', **headers)
+            request.user = AnonymousUser()
+            return request
+
+        etag = View().handle(request('get'))['ETag']
+        self.assertEqual(View().handle(request('get', HTTP_IF_NONE_MATCH=etag)).status_code, 304)
+        response = View().handle(request('post', HTTP_IF_NONE_MATCH=etag))
+        self.assertEqual((response.status_code, response.data), (200, {'method': 'POST'}))
+        self.assertFalse(response.has_header('ETag'))
+
+
+class CatalogResponseCacheTests(TestCase):
+    """Anonymous catalog responses are served from the cache until a dependent model changes"""
+
+    def setUp(self):
+        cache.clear()
+        self.instructor = User.objects.create_user('instructor', 'instructor@example.com', 'x')
+        self.course = Course.objects.create(
+            title='Forklift', slug='forklift', description='', short_description='',
+            instructor=self.instructor, status='published',
+        )
+
+    def get_titles(self, client=None, **params):
+        response = (client or APIClient()).get('/api/courses/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.get('X-Cache'), [course['title'] for course in response.json()['results']]
+
+    def test_hit_until_invalidated(self):
+        self.assertEqual(self.get_titles(), ('MISS', ['Forklift']))
+        self.assertEqual(self.get_titles(), ('HIT', ['Forklift']))
+        # Query strings are part of the key, in any order
+        self.assertEqual(self.get_titles(difficulty='beginner', featured='false')[0], 'MISS')
+        self.assertEqual(self.get_titles(featured='false', difficulty='beginner')[0], 'HIT')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.course.title = 'Forklift Safety'
+            self.course.save()
+        self.assertEqual(self.get_titles(), ('MISS', ['Forklift Safety']))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Module.objects.create(course=self.course, title='M1', order=1)
+        self.assertEqual(self.get_titles()[0], 'MISS')
+
+    def test_authenticated_requests_bypass_the_cache(self):
+        self.get_titles()
+        client = APIClient()
+        client.force_authenticate(self.instructor)
+        self.assertEqual(self.get_titles(client), (None, ['Forklift']))
+        self.assertEqual(response_cache.get_stats()['misses'], 1)
+
+    def test_instructor_changes_reach_the_course_lists(self):
+        self.course.category = Category.objects.create(name='Safety', slug='safety')
+        self.course.save()
+        paths = ['/api/courses/', '/api/categories/safety/courses/']
+        etags = {path: APIClient().get(path)['ETag'] for path in paths}
+
+        # Logins do not touch the catalog
+        with self.captureOnCommitCallbacks(execute=True):
+            self.instructor.last_login = timezone.now()
+            self.instructor.save(update_fields=['last_login'])
+        for path in paths:
+            self.assertEqual(APIClient().get(path)['X-Cache'], 'HIT')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.instructor.first_name, self.instructor.last_name = 'Pat', 'Lee'
+            self.instructor.save()
+        for path in paths:
+            response = APIClient().get(path, HTTP_IF_NONE_MATCH=etags[path])
+            self.assertEqual((response.status_code, response['X-Cache']), (200, 'MISS'))
+            self.assertNotEqual(response['ETag'], etags[path])
+            courses = response.json()
+            courses = courses['results'] if isinstance(courses, dict) else courses
+            self.assertEqual([course['instructor_name'] for course in courses], ['Pat Lee'])
+
+
+class FastSerializerParityTests(TestCase):
+    """The fast serializers render exactly what the DRF serializers render"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.instructor = User.objects.create_user(
+            'instructor', 'instructor@example.com', 'x', first_name='Ada', last_name='Byron'
+        )
+        cls.student = User.objects.create_user('student', 'student@example.com', 'x')
+        category = Category.objects.create(name='Equipment Safety', slug='equipment-safety')
+
+        cls.course = Course.objects.create(
+            title='Forklift Safety', slug='forklift-safety', description='Long description',
+            short_description='Short', instructor=cls.instructor, category=category,
+            thumbnail='course_thumbnails/forklift.png', price=Decimal('149.99'),
+            status='published', is_featured=True, tags='forklift, osha',
+        )
+        # No category, no thumbnail, an instructor without a name
+        cls.bare_course = Course.objects.create(
+            title='Bare', slug='bare', description='', short_description='',
+            instructor=cls.student, status='published',
+        )
+        Course.objects.create(
+            title='Draft', slug='draft', description='', short_description='',
+            instructor=cls.instructor, status='draft',
+        )
+
+        lessons = []
+        for module_order in (1, 2):
+            module = Module.objects.create(
+                course=cls.course, title=f'Module {module_order}', order=module_order,
+                description='About' if module_order == 1 else None,
+            )
+            for lesson_order in (1, 2, 3):
+                lessons.append(Lesson.objects.create(
+                    module=module, title=f'Lesson {module_order}.{lesson_order}', order=lesson_order,
+                    content_type='video' if lesson_order == 1 else 'text', content='Text',
+                    video_url='https://example.com/v' if lesson_order == 1 else None,
+                    duration_minutes=10 * lesson_order, is_free=lesson_order == 1,
+                ))
+        Module.objects.create(course=cls.course, title='Empty module', order=3)
+        Module.objects.create(course=cls.bare_course, title='Bare module', order=1)
+
+        quiz = Quiz.objects.create(lesson=lessons[2], title='Checkpoint', description='Quiz')
+        question = QuizQuestion.objects.create(quiz=quiz, question_text='Safe?', order=1)
+        QuizOption.objects.create(question=question, option_text='Yes', is_correct=True, order=1)
+        QuizOption.objects.create(question=question, option_text='No', order=2)
+        Quiz.objects.create(lesson=lessons[4], title='Empty quiz')
+
+        LessonProgress.objects.create(
+            student=cls.student, lesson=lessons[0], is_completed=True, time_spent_minutes=12
+        )
+        LessonProgress.objects.create(student=cls.student, lesson=lessons[3], time_spent_minutes=3)
+
+        enrollment = Enrollment.objects.create(student=cls.student, course=cls.course)
+        enrollment.set_progress(1, 6)
+        enrollment.save()
+        Enrollment.objects.create(student=cls.student, course=cls.bare_course, is_completed=True)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+
+    def get_both(self, url, client=None):
+        """(fast, DRF) responses to a GET of ``url``"""
+        client = client or self.client
+        responses = []
+        for fast in (True, False):
+            cache.clear()
+            with override_settings(FAST_SERIALIZERS=fast):
+                responses.append(client.get(url))
+        return responses
+
+    def assertSameResponse(self, url, client=None):
+        fast, drf = self.get_both(url, client)
+        self.assertEqual(fast.status_code, 200, fast.content)
+        self.assertEqual(fast.status_code, drf.status_code)
+        self.assertEqual(fast.content, drf.content)
+        return fast
+
+    def test_course_list(self):
+        response = self.assertSameResponse('/api/courses/')
+        courses = {course['slug']: course for course in response.json()['results']}
+        self.assertNotIn('category_name', courses['bare'])
+        self.assertEqual(courses['forklift-safety']['price'], '149.99')
+        self.assertEqual(
+            courses['forklift-safety']['thumbnail'], 'http://testserver/media/course_thumbnails/forklift.png'
+        )
+        self.assertSameResponse('/api/courses/', client=APIClient())
+        self.assertSameResponse('/api/courses/?search=forklift')
+
+    def test_course_detail_and_modules(self):
+        for url in ('/api/courses/forklift-safety/', '/api/courses/forklift-safety/modules/',
+                    '/api/courses/bare/'):
+            self.assertSameResponse(url)
+            self.assertSameResponse(url, client=APIClient())
+
+    def test_module_and_lesson_lists(self):
+        self.assertSameResponse('/api/modules/')
+        self.assertSameResponse('/api/lessons/')
+        self.assertSameResponse('/api/lessons/', client=APIClient())
+
+    def test_enrollment_list(self):
+        self.assertSameResponse('/api/enrollments/')
+        self.assertSameResponse('/api/enrollments/?pagination=cursor')
+
+    def test_sparse_requests_keep_drf_serializers(self):
+        fast, drf = self.get_both('/api/courses/?fields=title,slug')
+        self.assertEqual(fast.content, drf.content)
+        self.assertEqual(list(fast.json()['results'][0]), ['title', 'slug'])
+
+    def test_serializers_without_request(self):
+        cases = [
+            (FastCourseListSerializer, CourseListSerializer, Course.objects.select_related('instructor', 'category')),
+            (FastModuleSerializer, ModuleSerializer, Module.objects.all()),
+            (FastLessonSerializer, LessonSerializer, Lesson.objects.all()),
+            (FastEnrollmentSerializer, EnrollmentSerializer, Enrollment.objects.all()),
+        ]
+        for fast_class, serializer_class, queryset in cases:
+            with self.subTest(serializer=serializer_class.__name__):
+                fast = fast_class({})
+                expected = serializer_class(queryset.order_by('pk'), many=True).data
+                self.assertEqual(fast.serialize(fast.values(queryset.order_by('pk'))), expected)
+
+
+class JSONRendererParserTests(TestCase):
+    """core.renderers / core.parsers give the same results as DRF's stdlib versions"""
+
+    def setUp(self):
+        instructor = User.objects.create_user('instructor', 'instructor@example.com', 'x')
+        self.course = Course.objects.create(
+            title='Forklift', slug='forklift', description='', short_description='',
+            instructor=instructor, thumbnail='course_thumbnails/forklift.png', price=Decimal('149.99'),
+        )
+
+    def test_render_matches_stdlib(self):
+        data = {
+            'price': self.course.price,
+            'created_at': self.course.created_at,
+            'offset': datetime(2024, 5, 1, 9, 30, tzinfo=dt_timezone(timedelta(hours=2))),
+            'day': date(2024, 5, 1),
+            'duration': timedelta(minutes=90),
+            'label': gettext_lazy('Course'),
+            'text': 'Ünïcode ✓ line\u2028separator\u2029',
+            'ratio': 33.33,
+            'ids': (1, 2, 3),
+            2: None,
+            'nested': [{'completed': True, 'score': None}],
+        }
+        rendered = JSONRenderer().render(data)
+        self.assertEqual(rendered, StdlibJSONRenderer().render(data))
+        self.assertIn(b'\\u2028', rendered)
+        indented = 'application/json; indent=4'
+        self.assertEqual(
+            JSONRenderer().render(data, indented), StdlibJSONRenderer().render(data, indented)
+        )
+
+    def test_render_file_fields(self):
+        bare = Course(thumbnail=None)
+        rendered = JSONRenderer().render({'thumbnail': self.course.thumbnail, 'none': bare.thumbnail})
+        self.assertEqual(rendered, b'{"thumbnail":"/media/course_thumbnails/forklift.png","none":null}')
+
+    def test_parse_matches_stdlib(self):
+        def parse(parser, body):
+            return parser.parse(io.BytesIO(body), parser_context={'encoding': 'utf-8'})
+
+        for body in (b'{"answers": {"1": [2, 3]}, "ratio": 0.5}', b'[18446744073709551616]', '"✓"'.encode()):
+            self.assertEqual(parse(JSONParser(), body), parse(StdlibJSONParser(), body))
+        for body in (b'{"answers": ', b'[NaN]'):
+            with self.assertRaises(ParseError) as expected:
+                parse(StdlibJSONParser(), body)
+            with self.assertRaises(ParseError) as parsed:
+                parse(JSONParser(), body)
+            self.assertEqual(str(parsed.exception), str(expected.exception))
+
+
+class AuthCacheTests(TestCase):
+    """Cached token and session lookups are revoked per user, on the next request"""
+
+    def setUp(self):
+        cache.clear()
+        auth_cache.clear()
+        self.users = [User.objects.create_user(f'u{n}', f'u{n}@example.com', 'secret-pass') for n in range(2)]
+        self.tokens = [Token.objects.create(user=user) for user in self.users]
+        self.authentication = CachedTokenAuthentication()
+
+    def authenticate(self, token):
+        return self.authentication.authenticate_credentials(token.key)[0]
+
+    def test_token_and_user_revocation(self):
+        self.assertEqual(self.authenticate(self.tokens[0]), self.users[0])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.users[0].is_active = False
+            self.users[0].save()
+        with self.assertRaisesMessage(AuthenticationFailed, 'User inactive or deleted.'):
+            self.authenticate(self.tokens[0])
+
+        key = self.tokens[1].key
+        self.authentication.authenticate_credentials(key)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tokens[1].delete()
+        with self.assertRaisesMessage(AuthenticationFailed, 'Invalid token.'):
+            self.authentication.authenticate_credentials(key)
+
+    def test_user_save_keeps_other_users_cached(self):
+        self.authenticate(self.tokens[0])
+        self.authenticate(self.tokens[1])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.users[0].first_name = 'Renamed'
+            self.users[0].save()
+        auth_cache.stats.reset()
+        self.assertEqual(self.authenticate(self.tokens[0]).first_name, 'Renamed')
+        self.authenticate(self.tokens[1])
+        stats = auth_cache.stats.get_stats()
+        self.assertEqual((stats['local_hits'], stats['misses']), (1, 1))
+
+    @override_settings(
+        AUTHENTICATION_BACKENDS=['core.authentication.CachedModelBackend'], SESSION_ENGINE='core.sessions'
+    )
+    def test_cached_sessions_logout_and_password_change(self):
+        client = APIClient()
+        self.assertTrue(client.login(username='u0', password='secret-pass'))
+        self.assertEqual(client.get('/api/enrollments/').status_code, 200)
+        client.logout()
+        self.assertEqual(client.get('/api/enrollments/').status_code, 403)
+
+        client.login(username='u0', password='secret-pass')
+        self.assertEqual(client.get('/api/enrollments/').status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.users[0].set_password('changed-pass')
+            self.users[0].save()
+        self.assertEqual(client.get('/api/enrollments/').status_code, 403)
+
+
+class CohortEnrollmentTests(TestCase):
+    """Bulk enrollment reports only the enrollments it actually created"""
+
+    def setUp(self):
+        self.staff = User.objects.create_user('staff', 'staff@example.com', 'x', is_staff=True)
+        self.course = Course.objects.create(
+            title='Forklift', slug='forklift', description='', short_description='',
+            instructor=self.staff, status='published',
+        )
+        self.students = [User.objects.create_user(f's{n}', f's{n}@example.com', 'x') for n in range(3)]
+        Enrollment.objects.create(student=self.students[0], course=self.course)
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def enroll(self, students):
+        return self.client.post('/api/enrollments/bulk/', {'courses': ['forklift'], 'students': students},
+                                format='json')
+
+    def test_statuses_and_totals(self):
+        response = self.enroll(['s0@example.com', str(self.students[1].pk), 'S1@example.com', 'nobody@example.com', 'x'])
+        self.assertEqual(response.status_code, 201)
+        summary = response.json()
+        self.assertEqual([result['status'] for result in summary['results']],
+                         ['already_enrolled', 'enrolled', 'duplicate', 'not_found', 'invalid'])
+        self.assertEqual(summary['totals']['enrollments_created'], 1)
+        self.assertEqual(self.enroll(['s1@example.com']).status_code, 200)
+
+    def test_existing_enrollments_are_read_under_the_course_lock(self):
+        identifiers = ['s1@example.com', 's2@example.com']
+
+        def lock_after_concurrent_enroll(course_ids):
+            # s2 enrolled by a request that held the lock until now
+            Enrollment.objects.create(student=self.students[2], course=self.course)
+            lock_courses(course_ids)
+
+        with mock.patch('core.cohorts.lock_courses', side_effect=lock_after_concurrent_enroll) as lock:
+            summary = bulk_enroll(identifiers, [self.course])
+        lock.assert_called_once_with([self.course.pk])
+        self.assertEqual([result['status'] for result in summary['results']], ['enrolled', 'already_enrolled'])
+        self.assertEqual(summary['totals']['enrollments_created'], 1)
+
+    def test_single_enrollment_takes_the_course_lock(self):
+        client = APIClient()
+        client.force_authenticate(self.students[1])
+        with mock.patch('core.views.lock_courses', wraps=lock_courses) as lock:
+            self.assertEqual(client.post('/api/courses/forklift/enroll/').status_code, 201)
+        lock.assert_called_once_with([self.course.pk])
+
+
+class ProgressSyncTests(TestCase):
+    """Batched progress events report a status per event and never overwrite concurrent heartbeats"""
+
+    def setUp(self):
+        instructor = User.objects.create_user('instructor', 'instructor@example.com', 'x')
+        self.student = User.objects.create_user('student', 'student@example.com', 'x')
+        self.course = Course.objects.create(
+            title='Forklift', slug='forklift', description='', short_description='',
+            instructor=instructor, status='published',
+        )
+        self.lesson = Lesson.objects.create(
+            module=Module.objects.create(course=self.course, title='M1', order=1), title='L1'
+        )
+        Enrollment.objects.create(student=self.student, course=self.course)
+
+    def test_heartbeat_during_batch_is_kept(self):
+        def heartbeat_then_event(*args):
+            # A track_time heartbeat that lands after the batch loaded its progress rows
+            add_time(self.student.pk, self.lesson.pk, self.course.pk, 5)
+            return time_spent_event(*args)
+
+        events = [
+            {'lesson': self.lesson.pk, 'type': 'time', 'time_spent_minutes': 10},
+            {'lesson': self.lesson.pk, 'type': 'complete'},
+        ]
+        with mock.patch('core.progress_sync.time_spent_event', side_effect=heartbeat_then_event):
+            results, progress = apply_progress_events(self.student, events)
+
+        self.assertEqual([result['status'] for result in results], ['applied', 'applied'])
+        self.assertEqual(len(progress), 1)
+        self.assertTrue(progress[0].is_completed)
+        self.assertEqual(progress[0].time_spent_minutes, 15)
+        self.assertEqual(
+            ActivityEvent.objects.filter(event_type=ActivityEvent.TIME_SPENT).count(), 2
+        )
+
+    def test_batch_statuses(self):
+        other_course = Course.objects.create(
+            title='Cranes', slug='cranes', description='', short_description='',
+            instructor=self.course.instructor, status='published',
+        )
+        not_enrolled = Lesson.objects.create(
+            module=Module.objects.create(course=other_course, title='M1', order=1), title='L1'
+        )
+        client = APIClient()
+        client.force_authenticate(self.student)
+        response = client.post('/api/progress/batch/', {'events': [
+            {'id': 'a', 'lesson': self.lesson.pk, 'type': 'complete', 'timestamp': '2026-01-05T08:00:00Z'},
+            {'id': 'b', 'lesson': self.lesson.pk, 'type': 'complete'},
+            {'id': 'c', 'lesson': self.lesson.pk, 'type': 'time', 'time_spent_minutes': 7},
+            {'id': 'd', 'lesson': not_enrolled.pk, 'type': 'complete'},
+            {'id': 'e', 'lesson': 0, 'type': 'complete'},
+            {'id': 'f', 'lesson': self.lesson.pk, 'type': 'skip'},
+            {'id': 'g', 'lesson': self.lesson.pk, 'type': 'time', 'time_spent_minutes': -1},
+            'junk',
+        ]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual(
+            [(result.get('id'), result['status']) for result in results],
+            [('a', 'applied'), ('b', 'already_completed'), ('c', 'applied'), ('d', 'rejected'),
+             ('e', 'rejected'), ('f', 'rejected'), ('g', 'rejected'), (None, 'rejected')],
+        )
+        self.assertEqual(results[3]['error'], 'Not enrolled in this course')
+        self.assertEqual(results[4]['error'], 'Lesson not found')
+
+        [progress] = response.json()['progress']
+        self.assertEqual((progress['is_completed'], progress['time_spent_minutes']), (True, 7))
+        self.assertTrue(progress['completed_at'].startswith('2026-01-05T08:00:00'))
+        enrollment = Enrollment.objects.get(student=self.student, course=self.course)
+        self.assertEqual((enrollment.completed_lessons, enrollment.is_completed), (1, True))
+
+        self.assertEqual(client.post('/api/progress/batch/', {'events': []}, format='json').status_code, 400)
+
+
+@mock.patch.object(TimeTrackingBuffer, '_start_timer')
+@override_settings(TIME_TRACKING_BUFFERED=True, TIME_TRACKING_FLUSH_SECONDS=3600, TIME_TRACKING_MAX_PENDING=2)
+class TimeTrackingBufferTests(TestCase):
+    """Buffered heartbeats are summed in memory and written as increments"""
+
+    def setUp(self):
+        instructor = User.objects.create_user('instructor', 'instructor@example.com', 'x')
+        self.student = User.objects.create_user('student', 'student@example.com', 'x')
+        self.course = Course.objects.create(
+            title='Forklift', slug='forklift', description='', short_description='',
+            instructor=instructor, status='published',
+        )
+        module = Module.objects.create(course=self.course, title='M1', order=1)
+        self.lessons = [Lesson.objects.create(module=module, title=f'L{n}', order=n) for n in (1, 2, 3)]
+        Enrollment.objects.create(student=self.student, course=self.course)
+        self.buffer = TimeTrackingBuffer()
+        patcher = mock.patch.object(time_tracking, 'buffer', self.buffer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def heartbeat(self, lesson, minutes):
+        client = APIClient()
+        client.force_authenticate(self.student)
+        response = client.post(f'/api/lessons/{lesson.pk}/track_time/', {'time_spent_minutes': minutes}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()['time_spent_minutes']
+
+    def minutes(self, lesson):
+        progress = LessonProgress.objects.filter(student=self.student, lesson=lesson).first()
+        return progress.time_spent_minutes if progress else None
+
+    def test_heartbeats_are_summed_until_flushed(self, start_timer):
+        self.assertEqual(self.heartbeat(self.lessons[0], 2), 2)
+        self.assertEqual(self.heartbeat(self.lessons[0], 3), 5)
+        self.assertIsNone(self.minutes(self.lessons[0]))
+
+        # Heartbeats written directly in the meantime are added to, not overwritten
+        add_time(self.student.pk, self.lessons[0].pk, self.course.pk, 10)
+        self.buffer.flush()
+        self.assertEqual(self.minutes(self.lessons[0]), 15)
+        self.assertEqual(self.buffer.get_stats(), {
+            'heartbeats': 2, 'flushes': 1, 'rows_written': 1, 'pending_pairs': 0,
+        })
+        self.assertEqual(
+            ActivityEvent.objects.filter(event_type=ActivityEvent.TIME_SPENT, lesson=self.lessons[0]).count(), 2
+        )
+
+    def test_flush_when_max_pending_is_reached(self, start_timer):
+        self.heartbeat(self.lessons[0], 1)
+        self.heartbeat(self.lessons[1], 2)
+        self.assertEqual((self.minutes(self.lessons[0]), self.minutes(self.lessons[1])), (1, 2))
+        self.heartbeat(self.lessons[2], 4)
+        self.assertIsNone(self.minutes(self.lessons[2]))
+        self.assertEqual(self.buffer.pending(self.student.pk, self.lessons[2].pk, self.course.pk), 4)
+
+    def test_failed_flush_keeps_the_minutes(self, start_timer):
+        self.buffer.add(self.student.pk, self.lessons[0].pk, self.course.pk, 3)
+        with mock.patch('core.time_tracking.apply_increments', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.buffer.flush()
+        self.assertEqual(self.buffer.pending(self.student.pk, self.lessons[0].pk, self.course.pk), 3)
+        self.buffer.flush()
+        self.assertEqual(self.minutes(self.lessons[0]), 3)
+
+
+class ActivityRollupTests(TestCase):
+    """Events fold into the daily rollups and the watermark moves past them"""
+
+    def setUp(self):
+        instructor = User.objects.create_user('instructor', 'instructor@example.com', 'x')
+        self.course = Course.objects.create(
+            title='Forklift', slug='forklift', description='', short_description='',
+            instructor=instructor, status='published',
+        )
+        self.lesson = Lesson.objects.create(
+            module=Module.objects.create(course=self.course, title='M1', order=1), title='L1'
+        )
+        self.students = [User.objects.create_user(f's{n}', f's{n}@example.com', 'x') for n in range(2)]
+
+    def test_events_of_deleted_students_are_skipped(self):
+        for student in self.students:
+            record_lesson_completed(student.pk, self.course.pk, self.lesson.pk)
+            record_events([time_spent_event(student.pk, self.course.pk, self.lesson.pk, 15)])
+        last_event = ActivityEvent.objects.latest('pk').pk
+        self.students[1].delete()
+
+        self.assertEqual(rollup_events(settle_seconds=0), (2, last_event, True))
+        self.assertEqual(rollup_events(settle_seconds=0), (0, last_event, False))
+        day = DailyCourseActivity.objects.get(course=self.course)
+        self.assertEqual(
+            (day.active_students, day.lessons_completed, day.minutes_spent), (1, 1, 15)
+        )
+
+    def test_runs_go_on_past_batches_of_skipped_events(self):
+        # A whole batch of a deleted student's events, followed by live ones
+        record_events([time_spent_event(self.students[1].pk, self.course.pk, self.lesson.pk, 5)] * 2)
+        record_events([time_spent_event(self.students[0].pk, self.course.pk, self.lesson.pk, 15)])
+        self.students[1].delete()
+
+        out = io.StringIO()
+        call_command('rollup_activity', '--batch-size', '2', '--settle-seconds', '0', stdout=out)
+        self.assertIn('Rolled up 1 event(s)', out.getvalue())
+        self.assertEqual(DailyCourseActivity.objects.get(course=self.course).minutes_spent, 15)
+
+
+@override_settings(ASYNC_READ_CONCURRENCY=1, ASYNC_READ_QUEUE_TIMEOUT=0.01)
+class AsyncReadConcurrencyTests(TestCase):
+    """Requests waiting for a concurrency slot time out without leaking it"""
+
+    async def test_timed_out_waiters_leave_the_slot_free(self):
+        async with concurrency_slot():
+            for _ in range(3):
+                with self.assertRaises(asyncio.TimeoutError):
+                    async with concurrency_slot():
+                        pass
+        semaphore = _semaphores[asyncio.get_running_loop()]
+        self.assertFalse(semaphore.locked())
+        async with concurrency_slot():
+            self.assertTrue(semaphore.locked())
+
+
+class AsyncReadParityTests(TransactionTestCase):
+    """The async read endpoints answer like the sync DRF views they stand in for"""
+
+    def setUp(self):
+        instructor = User.objects.create_user('instructor', 'instructor@example.com', 'x')
+        self.student = User.objects.create_user('student', 'student@example.com', 'x')
+        category = Category.objects.create(name='Safety', slug='safety')
+        self.course = Course.objects.create(
+            title='Forklift', slug='forklift', description='', short_description='',
+            instructor=instructor, status='published', category=category,
+        )
+        Course.objects.create(
+            title='Cranes', slug='cranes', description='', short_description='',
+            instructor=instructor, status='published',
+        )
+        module = Module.objects.create(course=self.course, title='M1', order=1)
+        lessons = [Lesson.objects.create(module=module, title=f'L{n}', order=n) for n in (1, 2)]
+        quiz = Quiz.objects.create(lesson=lessons[0], title='Quiz')
+        QuizOption.objects.create(
+            question=QuizQuestion.objects.create(quiz=quiz, question_text='Q1'), option_text='A', is_correct=True
+        )
+        LessonProgress.objects.create(student=self.student, lesson=lessons[0], is_completed=True)
+        Enrollment.objects.create(student=self.student, course=self.course)
+        self.token = Token.objects.create(user=self.student)
+
+    @staticmethod
+    def reload_urls():
+        # The async views are only mounted if ASYNC_READ_ENDPOINTS is set when the urlconf is imported
+        for name in ('core.urls', settings.ROOT_URLCONF):
+            importlib.reload(importlib.import_module(name))
+        clear_url_caches()
+
+    @contextmanager
+    def async_read_endpoints(self, **extra_settings):
+        with override_settings(ASYNC_READ_ENDPOINTS=True, **extra_settings):
+            self.reload_urls()
+            try:
+                yield
+            finally:
+                clear_url_caches()
+        self.reload_urls()
+
+    def compare(self, path, **headers):
+        """The sync view's response, after checking the async view answers the same"""
+        cache.clear()
+        expected = self.client.get(path, headers=headers)
+        cache.clear()
+        with self.async_read_endpoints():
+            self.assertTrue(asyncio.iscoroutinefunction(resolve(path.split('?')[0]).func), path)
+            response = async_to_sync(self.async_client.get)(path, headers=headers)
+        self.assertEqual(response.status_code, expected.status_code, path)
+        for header in ('Content-Type', 'ETag', 'Last-Modified', 'Vary'):
+            self.assertEqual(response.get(header), expected.get(header), f'{path} {header}')
+        if expected.status_code != 304:
+            self.assertEqual(response.json(), expected.json(), path)
+        return expected
+
+    def test_anonymous(self):
+        for fast in (True, False):
+            with override_settings(FAST_SERIALIZERS=fast):
+                for path in [
+                    '/api/courses/', '/api/courses/?search=fork', '/api/courses/?fields=id,title',
+                    '/api/courses/forklift/', '/api/courses/forklift/modules/', '/api/enrollments/',
+                ]:
+                    self.compare(path)
+
+    def test_token_auth(self):
+        auth = {'Authorization': f'Token {self.token.key}'}
+        for fast in (True, False):
+            with override_settings(FAST_SERIALIZERS=fast):
+                for path in [
+                    '/api/courses/', '/api/courses/forklift/', '/api/courses/forklift/modules/',
+                    '/api/enrollments/',
+                ]:
+                    self.assertEqual(self.compare(path, **auth).status_code, 200, path)
+                detail = self.compare('/api/courses/forklift/', **auth).json()
+                self.assertTrue(detail['modules'][0]['lessons'][0]['progress']['is_completed'])
+        self.assertEqual(self.compare('/api/courses/', Authorization='Token nope').status_code, 403)
+
+    def test_not_modified(self):
+        for path in ['/api/courses/', '/api/courses/forklift/', '/api/courses/forklift/modules/']:
+            etag = self.compare(path)['ETag']
+            self.assertEqual(self.compare(path, **{'If-None-Match': etag}).status_code, 304, path)
+
+    def test_not_found(self):
+        for path in ['/api/courses/missing/', '/api/courses/missing/modules/', '/api/courses/?page=9']:
+            self.assertEqual(self.compare(path).status_code, 404, path)
+
+    def test_cursor_pagination_falls_back_to_the_sync_view(self):
+        auth = {'Authorization': f'Token {self.token.key}'}
+        data = self.compare('/api/enrollments/?pagination=cursor', **auth).json()
+        self.assertNotIn('count', data)
+        self.assertEqual(len(data['results']), 1)
+
+    async def test_busy_when_no_slot_frees_up(self):
+        with self.async_read_endpoints(ASYNC_READ_CONCURRENCY=1, ASYNC_READ_QUEUE_TIMEOUT=0.01):
+            async with concurrency_slot():
+                response = await self.async_client.get('/api/courses/')
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response['Retry-After'], '1')
+            self.assertEqual((await self.async_client.get('/api/courses/')).status_code, 200)
+
+
+class ExportTests(TestCase):
+    """Compliance exports stream filtered rows as CSV or NDJSON to staff"""
+
+    def setUp(self):
+        self.staff = User.objects.create_user('staff', 'staff@example.com', 'x', is_staff=True)
+        self.courses = [
+            Course.objects.create(
+                title=title, slug=title.lower(), description='', short_description='',
+                instructor=self.staff, status='published',
+            )
+            for title in ('Forklift', 'Cranes')
+        ]
+        self.lesson = Lesson.objects.create(
+            module=Module.objects.create(course=self.courses[0], title='M1', order=1), title='L1'
+        )
+        self.students = [
+            User.objects.create_user(f's{n}', f's{n}@example.com', 'x', first_name=f'Pat{n}') for n in range(2)
+        ]
+        for student in self.students:
+            for course in self.courses:
+                Enrollment.objects.create(student=student, course=course)
+        Enrollment.objects.filter(course=self.courses[1]).update(
+            enrolled_at=datetime(2026, 3, 1, 12, tzinfo=dt_timezone.utc)
+        )
+        LessonProgress.objects.create(student=self.students[0], lesson=self.lesson, is_completed=True,
+                                      time_spent_minutes=12)
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def export(self, path, method='get', **params):
+        response = getattr(self.client, method)(f'/api/exports/{path}', params)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv(self):
+        lines = self.export('enrollments.csv').splitlines()
+        self.assertEqual(lines[0].split(',')[:3], ['enrollment_id', 'user_id', 'username'])
+        self.assertEqual(len(lines), 5)
+        first = dict(zip(lines[0].split(','), lines[1].split(',')))
+        self.assertEqual((first['email'], first['course_slug'], first['is_completed']),
+                         ('s0@example.com', 'forklift', 'false'))
+        self.assertTrue(first['enrolled_at'].endswith('Z'))
+
+    def test_ndjson(self):
+        [row] = [json.loads(line) for line in self.export('progress.ndjson').splitlines()]
+        self.assertEqual((row['username'], row['lesson_title'], row['is_completed'], row['time_spent_minutes']),
+                         ('s0', 'L1', True, 12))
+
+    def test_filters(self):
+        def users(**params):
+            rows = [json.loads(line) for line in self.export('enrollments.ndjson', **params).splitlines()]
+            return [f'{row["username"]}:{row["course_slug"]}' for row in rows]
+
+        self.assertEqual(users(course='cranes'), ['s0:cranes', 's1:cranes'])
+        self.assertEqual(users(**{'from': '2026-03-01', 'to': '2026-03-01'}), ['s0:cranes', 's1:cranes'])
+        self.assertEqual(users(to='2026-02-28'), [])
+        self.assertEqual(users(user='S1@example.com', course='forklift'), ['s1:forklift'])
+        self.assertEqual(users(user=str(self.students[0].pk), course='forklift'), ['s0:forklift'])
+        upload = io.BytesIO(b'email\ns1@example.com\n')
+        upload.name = 'users.csv'
+        self.assertEqual(
+            [line.split(',')[2] for line in self.export(
+                'enrollments.csv', method='post', file=upload, course='cranes').splitlines()[1:]],
+            ['s1'],
+        )
+
+    def test_bad_parameters(self):
+        for path, params, error in [
+            ('enrollments.csv', {'user': 'nobody@example.com'}, 'Unknown users: nobody@example.com'),
+            ('enrollments.csv', {'from': '2026-13-01'}, 'from must be a date (YYYY-MM-DD)'),
+            ('enrollments.csv', {'to': 'yesterday'}, 'to must be a date (YYYY-MM-DD)'),
+            ('grades.csv', {}, None),
+            ('enrollments.xlsx', {}, None),
+        ]:
+            response = self.client.get(f'/api/exports/{path}', params)
+            self.assertEqual(response.status_code, 400)
+            if error:
+                self.assertEqual(response.json()['error'], error)
+
+    def test_staff_only(self):
+        client = APIClient()
+        self.assertIn(client.get('/api/exports/enrollments.csv').status_code, (401, 403))
+        client.force_authenticate(self.students[0])
+        self.assertEqual(client.get('/api/exports/enrollments.csv').status_code, 403)
+
+    def test_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = f'{directory}/enrollments.csv'
+            call_command('export_training_records', 'enrollments', '--course', 'forklift', '--user', 's0@example.com',
+                         '--output', path, '--chunk-size', '1', stderr=io.StringIO())
+            with open(path) as output:
+                self.assertEqual(len(output.read().splitlines()), 2)
+        with self.assertRaises(CommandError):
+            call_command('export_training_records', 'enrollments', '--from', 'soon', stdout=io.StringIO())
+
+
+class CertificateTests(TestCase):
+    """Certificates are rendered once, stored by content hash and served from disk"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+        instructor = User.objects.create_user('instructor', 'instructor@example.com', 'x')
+        self.student = User.objects.create_user('student', 'student@example.com', 'x', first_name='Pat')
+        course = Course.objects.create(
+            title='Forklift', slug='forklift', description='', short_description='', instructor=instructor,
+        )
+        other = Course.objects.create(
+            title='Crane', slug='crane', description='', short_description='', instructor=instructor,
+        )
+        self.enrollment = Enrollment.objects.create(
+            student=self.student, course=course, is_completed=True, completed_at=timezone.now()
+        )
+        self.incomplete = Enrollment.objects.create(student=self.student, course=other)
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+
+    def test_download_is_stored_and_reused(self):
+        url = f'/api/enrollments/{self.enrollment.pk}/certificate/'
+        response = self.client.get(url, HTTP_ACCEPT='application/pdf')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+
+        path = certificate_path('certificate', certificate_data(self.enrollment))
+        mtime = path.stat().st_mtime_ns
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(path.stat().st_mtime_ns, mtime)
+
+        # A new name is a new certificate
+        self.student.last_name = 'Smith'
+        self.student.save()
+        self.enrollment.refresh_from_db()
+        self.assertNotEqual(certificate_path('certificate', certificate_data(self.enrollment)), path)
+
+    def test_incomplete_enrollment(self):
+        response = self.client.get(f'/api/enrollments/{self.incomplete.pk}/certificate/')
+        self.assertEqual(response.status_code, 400)
+
+    def test_batch(self):
+        self.assertEqual(
+            generate_certificates(completed_enrollments(), workers=1),
+            {'certificates': 2, 'rendered': 2, 'cached': 0},
+        )
+        self.assertEqual(
+            generate_certificates(completed_enrollments(), workers=1),
+            {'certificates': 2, 'rendered': 0, 'cached': 2},
+        )
+
+
+@task('tests.flaky')
+def flaky_task(fail=False):
+    if fail:
+        raise RuntimeError('Temporary failure')
+    return {'ok': True}
+
+
+class JobQueueTests(TestCase):
+    """Claiming, retries with backoff and stale job recovery of core.jobs"""
+
+    def test_claim_run_and_retry(self):
+        job = enqueue('tests.flaky', {'fail': True}, max_attempts=2)
+        later = enqueue('tests.flaky', delay=60)
+        self.assertEqual(claim_jobs('worker-1', 5), [job.pk])
+        self.assertEqual(claim_jobs('worker-2', 5), [])
+
+        self.assertEqual(run_job(job.pk, 'worker-1'), 'retried')
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertGreater(job.run_after, timezone.now() + timedelta(seconds=retry_delay(1) - 5))
+        self.assertIn('Temporary failure', job.last_error)
+
+        Job.objects.filter(pk__in=[job.pk, later.pk]).update(run_after=timezone.now())
+        self.assertEqual(claim_jobs('worker-1', 5), [job.pk, later.pk])
+        self.assertEqual(run_job(job.pk, 'worker-1'), 'failed')
+        self.assertEqual(run_job(later.pk, 'worker-1'), 'succeeded')
+        self.assertEqual(Job.objects.get(pk=later.pk).result, {'ok': True})
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.FAILED)
+
+    def test_stale_jobs_are_requeued(self):
+        job = enqueue('tests.flaky')
+        claim_jobs('lost-worker', 1)
+        Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(hours=2))
+        self.assertEqual(requeue_stale_jobs(3600), (1, 0))
+        self.assertEqual(claim_jobs('worker', 1), [job.pk])
+        # The lost worker's late result is not recorded
+        self.assertEqual(run_job(job.pk, 'lost-worker'), 'succeeded')
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.RUNNING)
+
+    def test_api(self):
+        staff = User.objects.create_user('staff', 'staff@example.com', 'x', is_staff=True)
+        client = APIClient()
+        client.force_authenticate(staff)
+        response = client.post('/api/jobs/', {'task': 'tests.flaky', 'payload': {}}, format='json')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()['status'], Job.QUEUED)
+        response = client.post('/api/jobs/', {'task': 'tests.flaky', 'payload': {'x': 1}}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(client.get('/api/jobs/stats/').json()['jobs']['queued'], 1)
+
+        client.force_authenticate(User.objects.create_user('student', 'student@example.com', 'x'))
+        self.assertEqual(client.get('/api/jobs/').status_code, 403)
+
+
+class CourseAnalyticsTests(TestCase):
+    """Analytics are computed per course and module and refreshed from the watermarks"""
+
+    def setUp(self):
+        self.instructor = User.objects.create_user('instructor', 'instructor@example.com', 'x')
+        self.course = Course.objects.create(
+            title='Forklift', slug='forklift', description='', short_description='',
+            instructor=self.instructor, status='published',
+        )
+        self.modules = [Module.objects.create(course=self.course, title=f'M{n}', order=n) for n in (1, 2)]
+        self.lessons = [
+            Lesson.objects.create(module=module, title=f'L{n}', order=n, content='')
+            for module in self.modules for n in (1, 2)
+        ]
+        self.quiz = Quiz.objects.create(lesson=self.lessons[0], title='Quiz')
+
+        started = timezone.now() - timedelta(days=4)
+        self.students = [User.objects.create_user(f's{n}', f's{n}@example.com', 'x') for n in range(3)]
+        for n, student in enumerate(self.students):
+            Enrollment.objects.create(student=student, course=self.course)
+            # s0 completes everything, s1 the first module, s2 nothing
+            for lesson in self.lessons[:[4, 2, 0][n]]:
+                LessonProgress.objects.create(
+                    student=student, lesson=lesson, is_completed=True, time_spent_minutes=10 * (n + 1)
+                )
+        Enrollment.objects.filter(student=self.students[0]).update(
+            enrolled_at=started, is_completed=True, completed_at=started + timedelta(days=2)
+        )
+        for student, score in ((self.students[0], 90), (self.students[1], 60), (self.students[1], 80)):
+            QuizAttempt.objects.create(
+                student=student, quiz=self.quiz, score=score, passed=score >= 70, completed_at=timezone.now()
+            )
+
+    def test_statistics(self):
+        self.assertEqual(refresh_analytics(settle_seconds=0), 1)
+        client = APIClient()
+        client.force_authenticate(self.instructor)
+        with CaptureQueriesContext(connection) as queries:
+            data = client.get('/api/courses/forklift/analytics/').json()
+        self.assertLessEqual(len(queries), 4)
+
+        self.assertEqual(
+            {key: data[key] for key in ('enrollments', 'completions', 'completion_rate', 'quiz_attempts',
+                                        'average_quiz_score', 'pass_rate', 'median_days_to_complete',
+                                        'median_minutes_to_complete')},
+            {'enrollments': 3, 'completions': 1, 'completion_rate': 33.33, 'quiz_attempts': 3,
+             'average_quiz_score': 76.67, 'pass_rate': 66.67, 'median_days_to_complete': 2.0,
+             'median_minutes_to_complete': 40.0},
+        )
+        first, second = data['modules']
+        self.assertEqual(
+            (first['students_started'], first['students_completed'], first['completion_rate'],
+             first['median_minutes_to_complete'], first['quiz_attempts']),
+            (2, 2, 66.67, 30.0, 3),
+        )
+        self.assertEqual((second['students_completed'], second['quiz_attempts'], second['pass_rate']), (1, 0, None))
+
+        client.force_authenticate(self.students[0])
+        self.assertEqual(client.get('/api/courses/forklift/analytics/').status_code, 403)
+
+    def test_incremental_refresh(self):
+        refresh_analytics(settle_seconds=0)
+        self.assertEqual(refresh_analytics(settle_seconds=0), 0)
+        Enrollment.objects.create(student=self.instructor, course=self.course)
+        self.assertEqual(refresh_analytics(settle_seconds=0), 1)
+        self.assertEqual(CourseAnalytics.objects.get(course=self.course).enrollments, 4)
+
+
+class ItemAnalysisTests(TestCase):
+    """Submitted answers are stored packed and analyzed per question and option"""
+
+    def setUp(self):
+        self.instructor = User.objects.create_user('instructor', 'instructor@example.com', 'x')
+        course = Course.objects.create(
+            title='Forklift', slug='forklift', description='', short_description='',
+            instructor=self.instructor, status='published',
+        )
+        module = Module.objects.create(course=course, title='M1', order=1)
+        self.quiz = Quiz.objects.create(lesson=Lesson.objects.create(module=module, title='L1'), title='Quiz')
+        self.questions = []
+        for n in (1, 2):
+            question = QuizQuestion.objects.create(quiz=self.quiz, question_text=f'Q{n}', order=n)
+            options = [
+                QuizOption.objects.create(question=question, option_text=f'{n}{letter}', is_correct=letter == 'a')
+                for letter in 'abc'
+            ]
+            self.questions.append((question, options))
+        self.quiz.refresh_from_db()
+
+        # Students answer Q1 with a, a, b, c; Q2 with a, a, a and one blank
+        self.client = APIClient()
+        for n, (first, second) in enumerate([(0, 0), (0, 0), (1, 0), (2, None)]):
+            student = User.objects.create_user(f's{n}', f's{n}@example.com', 'x')
+            Enrollment.objects.create(student=student, course=course)
+            answers = [{'question_id': self.questions[0][0].pk, 'option_id': self.questions[0][1][first].pk}]
+            if second is not None:
+                answers.append({'question_id': self.questions[1][0].pk, 'option_id': self.questions[1][1][second].pk})
+            self.client.force_authenticate(student)
+            self.assertEqual(self.client.post(f'/api/quizzes/{self.quiz.pk}/submit/', {'answers': answers},
+                                              format='json').status_code, 200)
+
+    def test_packed_responses(self):
+        attempt = QuizAttempt.objects.get(student__username='s2')
+        layout = QuizResponseLayout.objects.get(quiz=self.quiz)
+        self.assertEqual(attempt.layout_id, layout.pk)
+        self.assertEqual(layout.questions, [
+            [question.pk, [option.pk for option in options]] for question, options in self.questions
+        ])
+        # Q1: option b, wrong; Q2: option a, correct
+        self.assertEqual(bytes(attempt.responses), struct.pack('<2I', 0b010, 0b001 | CORRECT))
+
+    def test_item_analysis(self):
+        refresh_item_analysis(self.quiz.pk)
+        self.client.force_authenticate(self.instructor)
+        data = self.client.get(f'/api/quizzes/{self.quiz.pk}/item-analysis/').json()
+        self.assertEqual((data['attempts'], data['upper_group'], data['lower_group']), (4, 1, 1))
+
+        first, second = data['questions']
+        self.assertEqual((first['difficulty'], first['discrimination'], first['omitted_rate']), (0.5, 1.0, 0.0))
+        self.assertEqual([option['selection_rate'] for option in first['options']], [0.5, 0.25, 0.25])
+        self.assertEqual((second['difficulty'], second['omitted_rate']), (0.75, 0.25))
+        self.assertEqual((second['discrimination'], first['flags'], second['flags']), (1.0, [], []))
+
+        self.client.force_authenticate(User.objects.get(username='s0'))
+        self.assertEqual(self.client.get(f'/api/quizzes/{self.quiz.pk}/item-analysis/').status_code, 403)
+
+
+class QuizAttemptSummaryTests(TestCase):
+    """The attempt limit and best score come from the per-student summary row"""
+
+    def setUp(self):
+        instructor = User.objects.create_user('instructor', 'instructor@example.com', 'x')
+        course = Course.objects.create(
+            title='Forklift', slug='forklift', description='', short_description='',
+            instructor=instructor, status='published',
+        )
+        module = Module.objects.create(course=course, title='M1', order=1)
+        self.quiz = Quiz.objects.create(
+            lesson=Lesson.objects.create(module=module, title='L1'), title='Quiz', max_attempts=2
+        )
+        question = QuizQuestion.objects.create(quiz=self.quiz, question_text='Q1')
+        self.right = QuizOption.objects.create(question=question, option_text='a', is_correct=True)
+        self.wrong = QuizOption.objects.create(question=question, option_text='b')
+        self.question = question
+        self.student = User.objects.create_user('student', 'student@example.com', 'x')
+        Enrollment.objects.create(student=self.student, course=course)
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+
+    def submit(self, option):
+        answers = [{'question_id': self.question.pk, 'option_id': option.pk}]
+        return self.client.post(f'/api/quizzes/{self.quiz.pk}/submit/', {'answers': answers}, format='json')
+
+    def test_attempt_limit(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.submit(self.right).status_code, 200)
+        self.assertFalse([q for q in queries if 'COUNT(' in q['sql'] and 'core_quizattempt"' in q['sql']])
+        self.assertEqual(self.submit(self.wrong).status_code, 200)
+        response = self.submit(self.right)
+        self.assertEqual((response.status_code, response.json()), (400, {'error': 'Maximum attempts reached'}))
+        self.assertEqual(QuizAttempt.objects.filter(student=self.student).count(), 2)
+
+        summary, = self.client.get('/api/quiz-attempts/summary/', {'quiz': self.quiz.pk}).json()
+        self.assertEqual(
+            {key: summary[key] for key in ('quiz', 'attempts', 'attempts_remaining', 'best_score', 'passed')},
+            {'quiz': self.quiz.pk, 'attempts': 2, 'attempts_remaining': 0, 'best_score': 100, 'passed': True},
+        )
+
+    def test_deleted_attempt_frees_a_retry(self):
+        self.submit(self.right)
+        self.submit(self.wrong)
+        QuizAttempt.objects.filter(score=100).delete()
+        summary = QuizAttemptSummary.objects.get(student=self.student, quiz=self.quiz)
+        self.assertEqual((summary.attempts, summary.best_score, summary.passed), (1, 0, False))
+        self.assertEqual(self.submit(self.right).status_code, 200)
+
+
+class HotQueryPlanTests(TestCase):
+    """The hot read paths are served by indexes, never by a scan of the whole table"""
+
+    def setUp(self):
+        instructor = User.objects.create_user('instructor', 'instructor@example.com', 'x')
+        self.student = User.objects.create_user('student', 'student@example.com', 'x')
+        for n in range(20):
+            course = Course.objects.create(
+                title=f'Course {n}', slug=f'course-{n}', description='', short_description='',
+                instructor=instructor, status=['published', 'draft'][n % 2], is_featured=n % 5 == 0,
+            )
+            module = Module.objects.create(course=course, title='M1', order=1)
+            lesson = Lesson.objects.create(module=module, title='L1')
+            Enrollment.objects.create(student=self.student, course=course, is_completed=n % 3 == 0)
+            LessonProgress.objects.create(student=self.student, lesson=lesson, is_completed=n % 2 == 0)
+            quiz = Quiz.objects.create(lesson=lesson, title=f'Quiz {n}')
+            QuizAttempt.objects.create(student=self.student, quiz=quiz, score=50)
+        self.course, self.quiz = course, quiz
+
+    def hot_queries(self):
+        return {
+            'published catalog': Course.objects.filter(status='published').order_by('-created_at'),
+            'featured courses': Course.objects.filter(status='published', is_featured=True).order_by('-created_at'),
+            'login by email': User.objects.filter(email='student@example.com'),
+            'completed lessons': LessonProgress.objects.filter(student=self.student, is_completed=True),
+            'quiz attempt history': QuizAttempt.objects.filter(student=self.student, quiz=self.quiz),
+            'attempt summary': QuizAttemptSummary.objects.filter(student=self.student, quiz=self.quiz),
+            'course completions': Enrollment.objects.filter(course=self.course, is_completed=True),
+        }
+
+    def test_no_table_scans(self):
+        if connection.vendor == 'postgresql':
+            # Tiny tables are cheaper to scan; ask whether an index can serve the query at all
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+            full_scan = 'Seq Scan'
+        else:
+            full_scan = 'SCAN '
+
+        for name, queryset in self.hot_queries().items():
+            with self.subTest(name):
+                plan = queryset.explain()
+                self.assertNotIn(full_scan, plan, f'{name} scans a whole table:\n{plan}')
@@ -0,0 +1,181 @@
+"""
+Lesson time tracking.
+
+Heartbeats from ``LessonViewSet.track_time`` are applied as database-side
+increments (``time_spent_minutes = time_spent_minutes + n``), so
+concurrent heartbeats never lose minutes and only the time and
+``last_accessed`` columns are written. Every write also appends a
+``time_spent`` event to the activity log.
+
+With ``TIME_TRACKING_BUFFERED = True`` heartbeats are first summed per
+(student, lesson) in an in-process buffer, which is written in bulk every
+``TIME_TRACKING_FLUSH_SECONDS``, as soon as ``TIME_TRACKING_MAX_PENDING``
+pairs are pending, and when the worker process exits.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.db.models.functions import Now
+
+from .activity import record_events, time_spent_event
+from .models import LessonProgress
+
+logger = logging.getLogger(__name__)
+
+# Pairs per UPDATE statement when flushing
+FLUSH_CHUNK_SIZE = 200
+
+
+def _ensure_rows(pairs):
+    """Create missing progress rows for (student id, lesson id) pairs, leaving existing ones alone"""
+    LessonProgress.objects.bulk_create(
+        [LessonProgress(student_id=student_id, lesson_id=lesson_id) for student_id, lesson_id in pairs],
+        ignore_conflicts=True,
+    )
+
+
+def add_time(student_id, lesson_id, course_id, minutes):
+    """Atomically add ``minutes`` to one progress row, creating the row if needed"""
+    rows = LessonProgress.objects.filter(student_id=student_id, lesson_id=lesson_id)
+    update = {'time_spent_minutes': F('time_spent_minutes') + minutes, 'last_accessed': Now()}
+    with transaction.atomic():
+        if not rows.update(**update):
+            _ensure_rows([(student_id, lesson_id)])
+            rows.update(**update)
+        if minutes:
+            record_events([time_spent_event(student_id, course_id, lesson_id, minutes)])
+
+
+def apply_increments(increments, record_activity=True):
+    """
+    Atomically add minutes to many progress rows; ``increments`` maps
+    (student id, lesson id, course id) to minutes. Callers that log their
+    own timestamped events pass ``record_activity=False``.
+    """
+    items = [(key, minutes) for key, minutes in increments.items() if minutes]
+    if not items:
+        return
+    with transaction.atomic():
+        _ensure_rows((student_id, lesson_id) for (student_id, lesson_id, course_id), minutes in items)
+        for start in range(0, len(items), FLUSH_CHUNK_SIZE):
+            chunk = items[start:start + FLUSH_CHUNK_SIZE]
+            matches = Q()
+            whens = []
+            for (student_id, lesson_id, course_id), minutes in chunk:
+                matches |= Q(student_id=student_id, lesson_id=lesson_id)
+                whens.append(When(student_id=student_id, lesson_id=lesson_id, then=Value(minutes)))
+            LessonProgress.objects.filter(matches).update(
+                time_spent_minutes=F('time_spent_minutes') + Case(
+                    *whens, default=Value(0), output_field=IntegerField()
+                ),
+                last_accessed=Now(),
+            )
+        if record_activity:
+            record_events([
+                time_spent_event(student_id, course_id, lesson_id, minutes)
+                for (student_id, lesson_id, course_id), minutes in items
+            ])
+
+
+class TimeTrackingBuffer:
+    """Sums heartbeats per (student, lesson, course) and writes them in bulk"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = Counter()
+        self._last_flush = time.monotonic()
+        self._timer = None
+        self.stats = Counter()
+
+    @property
+    def flush_seconds(self):
+        return getattr(settings, 'TIME_TRACKING_FLUSH_SECONDS', 10)
+
+    @property
+    def max_pending(self):
+        return getattr(settings, 'TIME_TRACKING_MAX_PENDING', 500)
+
+    def add(self, student_id, lesson_id, course_id, minutes):
+        with self._lock:
+            self._pending[(student_id, lesson_id, course_id)] += minutes
+            self.stats['heartbeats'] += 1
+            due = (
+                len(self._pending) >= self.max_pending
+                or time.monotonic() - self._last_flush >= self.flush_seconds
+            )
+        self._start_timer()
+        if due:
+            self.flush()
+
+    def pending(self, student_id, lesson_id, course_id):
+        """Minutes not yet written for one (student, lesson, course)"""
+        with self._lock:
+            return self._pending.get((student_id, lesson_id, course_id), 0)
+
+    def flush(self):
+        """Write every pending increment; failed writes are put back for the next flush"""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, Counter()
+                self._last_flush = time.monotonic()
+            if not pending:
+                return
+            try:
+                apply_increments(pending)
+            except Exception:
+                with self._lock:
+                    self._pending.update(pending)
+                raise
+            with self._lock:
+                self.stats['flushes'] += 1
+                self.stats['rows_written'] += len(pending)
+
+    def _start_timer(self):
+        if self._timer is not None:
+            return
+        with self._lock:
+            if self._timer is None:
+                self._timer = threading.Thread(
+                    target=self._run_timer, name='time-tracking-flush', daemon=True
+                )
+                self._timer.start()
+
+    def _run_timer(self):
+        while True:
+            time.sleep(self.flush_seconds)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Flushing buffered lesson time failed, retrying on the next flush')
+            finally:
+                # The timer thread owns its own connection
+                connection.close()
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats['pending_pairs'] = len(self._pending)
+        return stats
+
+
+buffer = TimeTrackingBuffer()
+atexit.register(buffer.flush)
+
+
+def is_buffered():
+    return getattr(settings, 'TIME_TRACKING_BUFFERED', False)
+
+
+def track_time(student_id, lesson_id, course_id, minutes):
+    """Record a heartbeat, buffered or written straight away depending on the settings"""
+    if is_buffered():
+        buffer.add(student_id, lesson_id, course_id, minutes)
+    else:
+        add_time(student_id, lesson_id, course_id, minutes)
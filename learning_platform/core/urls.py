@@ -1,11 +1,12 @@
-from django.urls import path, include
+from django.conf import settings
+from django.urls import path, re_path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework.authtoken.views import obtain_auth_token
 from django.contrib.auth import views as auth_views
 from .views import (
     CategoryViewSet, CourseViewSet, ModuleViewSet, LessonViewSet,
     EnrollmentViewSet, QuizViewSet, QuizAttemptViewSet, UserProfileViewSet,
-    RegisterView, LoginView
+    RegisterView, LoginView, ProgressBatchView, TagFacetView, CacheStatsView, ExportView, JobViewSet
 )
 
 # Create router and register viewsets
@@ -18,13 +19,32 @@ router.register(r'enrollments', EnrollmentViewSet, basename='enrollment')
 router.register(r'quizzes', QuizViewSet)
 router.register(r'quiz-attempts', QuizAttemptViewSet, basename='quizattempt')
 router.register(r'profiles', UserProfileViewSet, basename='profile')
+router.register(r'jobs', JobViewSet)
 
 app_name = 'core'
 
+# Natively async GET/HEAD for the hottest read routes (core.async_views);
+# the router's sync views still serve every other method and format
+async_read_patterns = []
+if settings.ASYNC_READ_ENDPOINTS:
+    from .async_views import get_views
+    sync_views = {pattern.name: pattern.callback for pattern in router.urls if pattern.name}
+    async_views = get_views(sync_views)
+    async_read_patterns = [
+        re_path(pattern.pattern.regex.pattern, async_views[pattern.name], name=pattern.name)
+        for pattern in router.urls
+        if pattern.name in async_views and 'format' not in pattern.pattern.regex.groupindex
+    ]
+
 urlpatterns = [
+    path('api/', include(async_read_patterns)),
     path('api/', include(router.urls)),
     # Authentication endpoints
     path('api/auth/login/', LoginView.as_view(), name='login'),
     path('api/auth/register/', RegisterView.as_view(), name='register'),
     path('api/auth/token/', obtain_auth_token, name='obtain_token'),
+    path('api/tags/', TagFacetView.as_view(), name='tag_facets'),
+    path('api/progress/batch/', ProgressBatchView.as_view(), name='progress_batch'),
+    path('api/cache-stats/', CacheStatsView.as_view(), name='cache_stats'),
+    path('api/exports/<str:kind>.<str:extension>', ExportView.as_view(), name='export'),
 ]
@@ -6,42 +6,186 @@ from rest_framework.views import APIView
 from rest_framework.authtoken.models import Token
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate
-from django.db.models import Q, Count, Avg
+from django.db import transaction
+from django.db.models import Q, Count, Avg, Max, OuterRef, Sum
+from django.http import FileResponse
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_date
+from pathlib import Path
 from .models import (
     UserProfile, Category, Course, Module, Lesson, 
     Enrollment, LessonProgress, Quiz, QuizQuestion, 
-    QuizOption, QuizAttempt
+    QuizOption, QuizAttempt, QuizAttemptSummary, QuizItemAnalysis, Job
 )
+from .activity import course_activity, record_lesson_completed, record_quiz_submitted
+from .analytics import get_course_analytics
+from .authentication import auth_cache
+from .certificates import CertificateError, get_certificate
+from .cohorts import MAX_API_ROWS, bulk_enroll, get_cohort_courses, lock_courses, read_identifiers_csv
+from .conditional import conditional_get, latest, progress_aggregates, total
+from .exports import ExportError, export_chunks, streaming_export_response
+from .fast_serializers import (
+    FastCourseListSerializer, FastEnrollmentSerializer, FastLessonSerializer,
+    FastModuleSerializer, use_fast_serializers
+)
+from .fieldsets import get_request_shape, shape_queryset
+from .grading import get_answer_key, get_response_layout, grade_answers, pack_responses
+from .jobs import JobError, enqueue, queue_stats
+from .parsers import JSONParser
+from .progress_sync import MAX_EVENTS, apply_progress_events
+from .response_cache import cache_anonymous_response, get_stats as get_response_cache_stats
+from .search import get_search_backend
+from .sessions import stats as session_stats
+from .tags import filter_by_tags, tag_facets
+from . import time_tracking
 from .serializers import (
     UserSerializer, UserProfileSerializer, CategorySerializer,
     CourseListSerializer, CourseDetailSerializer, ModuleSerializer,
     LessonSerializer, EnrollmentSerializer, LessonProgressSerializer,
-    QuizSerializer, QuizAttemptSerializer, CourseCreateUpdateSerializer,
-    LessonCreateUpdateSerializer, QuizCreateUpdateSerializer,
-    QuizQuestionCreateUpdateSerializer
+    QuizSerializer, QuizAttemptSerializer, QuizAttemptSummarySerializer,
+    CourseCreateUpdateSerializer, LessonCreateUpdateSerializer, QuizCreateUpdateSerializer,
+    QuizQuestionCreateUpdateSerializer, JobSerializer
 )
+from .tasks import get_export_root
+
+
+class LessonProgressContextMixin:
+    """Preload the user's lesson progress for nested lesson serializers"""
+    
+    def get_progress_context(self, path, **lesson_filter):
+        """
+        Serializer context with the user's LessonProgress rows keyed by lesson
+        id, if the requested fields include ``path`` (e.g. ``lessons.progress``)
+        """
+        context = self.get_serializer_context()
+        user = self.request.user
+        if user.is_authenticated and get_request_shape(self.request).includes_path(path):
+            progress = LessonProgress.objects.filter(student=user, **lesson_filter)
+            context['lesson_progress'] = {p.lesson_id: p for p in progress}
+        return context
+
+
+class FastListMixin:
+    """Render list responses from ``.values()`` rows with ``fast_serializer_class``"""
+    fast_serializer_class = None
+    
+    def get_fast_serializer(self):
+        """The fast serializer for this request, or None if it needs the DRF serializer"""
+        if not use_fast_serializers(self.request):
+            return None
+        return self.fast_serializer_class(self.get_serializer_context())
+    
+    def fast_list(self, fast):
+        rows = fast.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        data = fast.serialize(page if page is not None else rows)
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+    
+    def list(self, request, *args, **kwargs):
+        fast = self.get_fast_serializer()
+        if fast is None:
+            return super().list(request, *args, **kwargs)
+        return self.fast_list(fast)
 
 
 class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
     """ViewSet for categories (read-only)"""
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
+    permission_classes = [permissions.AllowAny]
     lookup_field = 'slug'
     
+    def get_queryset(self):
+        queryset = Category.objects.all()
+        if get_request_shape(self.request).includes('course_count'):
+            # One grouped count instead of a COUNT query per category
+            queryset = queryset.annotate(course_total=Count('course'))
+        return queryset
+    
+    def get_category_freshness(self):
+        categories = Category.objects.all()
+        if self.action != 'list':
+            categories = categories.filter(slug=self.kwargs['slug'])
+        return [categories.aggregate(
+            categories=Max('updated_at'),
+            category_count=Count('pk', distinct=True),
+            courses=Max('course__updated_at'),
+            course_count=Count('course', distinct=True),
+        )]
+    
+    def get_category_courses_freshness(self):
+        courses = Course.objects.filter(category__slug=self.kwargs['slug'], status='published')
+        return [courses.aggregate(
+            courses=Max('updated_at'),
+            course_count=Count('pk'),
+            category=Max('category__updated_at'),
+        )]
+    
+    @cache_anonymous_response('category-list')
+    @conditional_get('get_category_freshness')
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+    
+    @conditional_get('get_category_freshness')
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+    
     @action(detail=True, methods=['get'])
+    @cache_anonymous_response('category-courses')
+    @conditional_get('get_category_courses_freshness')
     def courses(self, request, slug=None):
         """Get all courses in a category"""
         category = self.get_object()
-        courses = Course.objects.filter(category=category, status='published')
+        courses = shape_queryset(
+            Course.objects.filter(category=category, status='published'), CourseListSerializer, request
+        )
         serializer = CourseListSerializer(courses, many=True, context={'request': request})
         return Response(serializer.data)
 
 
-class CourseViewSet(viewsets.ModelViewSet):
+def filter_catalog(request, queryset):
+    """Courses of ``queryset`` visible to the user, narrowed by the catalog query parameters"""
+    # Filter by status for non-owners
+    if not request.user.is_authenticated:
+        queryset = queryset.filter(status='published')
+    elif not request.user.is_staff:
+        # Show published courses + user's own courses
+        queryset = queryset.filter(
+            Q(status='published') | Q(instructor=request.user)
+        )
+    
+    # Apply filters
+    category = request.query_params.get('category')
+    if category:
+        queryset = queryset.filter(category__slug=category)
+    
+    difficulty = request.query_params.get('difficulty')
+    if difficulty:
+        queryset = queryset.filter(difficulty=difficulty)
+    
+    featured = request.query_params.get('featured')
+    if featured and featured.lower() == 'true':
+        queryset = queryset.filter(is_featured=True)
+    
+    # ?tag=osha&tag=forklift matches courses carrying every tag
+    tags = request.query_params.getlist('tag')
+    if tags:
+        queryset = filter_by_tags(queryset, tags)
+    
+    search = request.query_params.get('search')
+    if search:
+        queryset = get_search_backend().search(queryset, search)
+    return queryset
+
+
+class CourseViewSet(LessonProgressContextMixin, FastListMixin, viewsets.ModelViewSet):
     """ViewSet for courses"""
     queryset = Course.objects.all()
+    fast_serializer_class = FastCourseListSerializer
     lookup_field = 'slug'
     parser_classes = [MultiPartParser, FormParser]
     
@@ -53,37 +197,37 @@ class CourseViewSet(viewsets.ModelViewSet):
         return CourseDetailSerializer
     
     def get_queryset(self):
-        queryset = Course.objects.select_related('instructor', 'category').prefetch_related('modules__lessons')
-        
-        # Filter by status for non-owners
-        if not self.request.user.is_authenticated:
-            queryset = queryset.filter(status='published')
-        elif not self.request.user.is_staff:
-            # Show published courses + user's own courses
-            queryset = queryset.filter(
-                Q(status='published') | Q(instructor=self.request.user)
-            )
+        # Joins and prefetches follow the requested ?fields= / ?expand= shape
+        queryset = Course.objects.all()
+        # The fast serializers load the module tree from rows of their own
+        fast = use_fast_serializers(self.request)
+        if self.action == 'list':
+            queryset = shape_queryset(queryset, CourseListSerializer, self.request)
+        elif self.action == 'modules':
+            if not fast:
+                queryset = shape_queryset(queryset, ModuleSerializer, self.request, through='modules')
+        elif self.action == 'retrieve':
+            if fast:
+                queryset = queryset.select_related('instructor', 'category')
+            else:
+                queryset = shape_queryset(queryset, CourseDetailSerializer, self.request)
+            # Counts shown by CourseDetailSerializer, instead of two COUNT queries per course
+            shape = get_request_shape(self.request)
+            if shape.includes('enrollment_count'):
+                queryset = queryset.annotate(
+                    enrollment_total=total(Enrollment.objects.filter(course=OuterRef('pk')), 'course'),
+                )
+            if shape.includes_path('category.course_count'):
+                queryset = queryset.annotate(
+                    category_course_total=total(Course.objects.filter(category=OuterRef('category')), 'category'),
+                )
+        else:
+            queryset = queryset.select_related('instructor', 'category')
         
-        # Apply filters
-        category = self.request.query_params.get('category')
-        if category:
-            queryset = queryset.filter(category__slug=category)
-        
-        difficulty = self.request.query_params.get('difficulty')
-        if difficulty:
-            queryset = queryset.filter(difficulty=difficulty)
-        
-        featured = self.request.query_params.get('featured')
-        if featured and featured.lower() == 'true':
-            queryset = queryset.filter(is_featured=True)
-        
-        search = self.request.query_params.get('search')
-        if search:
-            queryset = queryset.filter(
-                Q(title__icontains=search) | 
-                Q(description__icontains=search) |
-                Q(tags__icontains=search)
-            )
+        queryset = filter_catalog(self.request, queryset)
+        if self.request.query_params.get('search'):
+            # Most relevant first, see core.search for the backends
+            return queryset.order_by('-search_rank', '-created_at')
         
         return queryset.order_by('-created_at')
     
@@ -103,6 +247,57 @@ class CourseViewSet(viewsets.ModelViewSet):
             raise permissions.PermissionDenied("You can only edit your own courses.")
         serializer.save()
     
+    # The *_freshness_query methods return (queryset, aggregates) so the
+    # async read path (core.async_views) can run the same aggregate
+    def catalog_freshness_query(self):
+        return self.get_queryset(), dict(
+            courses=Max('updated_at'),
+            course_count=Count('pk'),
+            categories=Max('category__updated_at'),
+        )
+    
+    def get_catalog_freshness(self):
+        queryset, aggregates = self.catalog_freshness_query()
+        return [queryset.aggregate(**aggregates)]
+    
+    def course_tree_freshness_query(self):
+        courses = self.get_queryset().filter(slug=self.kwargs['slug'])
+        course = OuterRef('pk')
+        quizzes = Quiz.objects.filter(lesson__module__course=course)
+        return courses, dict(
+            course=Max('updated_at'),
+            category=Max('category__updated_at'),
+            modules=Max(latest(Module.objects.filter(course=course), 'course', 'updated_at')),
+            lessons=Max(latest(
+                Lesson.objects.filter(module__course=course), 'module__course', 'updated_at'
+            )),
+            quizzes=Max(latest(quizzes, 'lesson__module__course', 'updated_at')),
+            quiz_versions=Max(total(quizzes, 'lesson__module__course', 'version')),
+            enrollments=Max(total(Enrollment.objects.filter(course=course), 'course')),
+            **progress_aggregates(self.request.user, 'lesson__module__course'),
+        )
+    
+    def get_course_tree_freshness(self):
+        queryset, aggregates = self.course_tree_freshness_query()
+        return [queryset.aggregate(**aggregates)]
+    
+    @cache_anonymous_response('course-list')
+    @conditional_get('get_catalog_freshness')
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+    
+    @conditional_get('get_course_tree_freshness')
+    def retrieve(self, request, *args, **kwargs):
+        course = self.get_object()
+        if use_fast_serializers(request):
+            context = self.get_serializer_context()
+            fast = FastModuleSerializer(context)
+            context['course_modules'] = fast.serialize(fast.values(course.modules.all()))
+        else:
+            context = self.get_progress_context('modules.lessons.progress', lesson__module__course=course)
+        serializer = CourseDetailSerializer(course, context=context)
+        return Response(serializer.data)
+    
     @action(detail=True, methods=['post'])
     def enroll(self, request, slug=None):
         """Enroll in a course"""
@@ -117,11 +312,14 @@ class CourseViewSet(viewsets.ModelViewSet):
             return Response({'error': 'Course is not available for enrollment'}, 
                           status=status.HTTP_400_BAD_REQUEST)
         
-        enrollment, created = Enrollment.objects.get_or_create(
-            student=user,
-            course=course,
-            defaults={'enrolled_at': timezone.now()}
-        )
+        with transaction.atomic():
+            # Serialized with bulk enrollment (core.cohorts)
+            lock_courses([course.pk])
+            enrollment, created = Enrollment.objects.get_or_create(
+                student=user,
+                course=course,
+                defaults={'enrolled_at': timezone.now()}
+            )
         
         if created:
             serializer = EnrollmentSerializer(enrollment, context={'request': request})
@@ -131,11 +329,47 @@ class CourseViewSet(viewsets.ModelViewSet):
                           status=status.HTTP_400_BAD_REQUEST)
     
     @action(detail=True, methods=['get'])
+    def activity(self, request, slug=None):
+        """Daily activity totals for the course instructor and staff (?from=&to=, YYYY-MM-DD)"""
+        course = self.get_object()
+        if course.instructor_id != request.user.pk and not request.user.is_staff:
+            return Response({'error': 'Only the course instructor or staff can view activity'}, 
+                          status=status.HTTP_403_FORBIDDEN)
+        
+        dates = {}
+        for name in ('from', 'to'):
+            value = request.query_params.get(name)
+            try:
+                dates[name] = parse_date(value) if value else None
+            except ValueError:
+                dates[name] = None
+            if value and dates[name] is None:
+                return Response({'error': f'{name} must be a date (YYYY-MM-DD)'}, 
+                              status=status.HTTP_400_BAD_REQUEST)
+        
+        days = course_activity(course, dates['from'], dates['to'])
+        return Response({'course': course.slug, 'days': list(days)})
+    
+    @action(detail=True, methods=['get'])
+    def analytics(self, request, slug=None):
+        """Completion, quiz and time-to-complete statistics per course and module (instructor/staff)"""
+        course = self.get_object()
+        if course.instructor_id != request.user.pk and not request.user.is_staff:
+            return Response({'error': 'Only the course instructor or staff can view analytics'}, 
+                          status=status.HTTP_403_FORBIDDEN)
+        return Response({'course': course.slug, **get_course_analytics(course)})
+    
+    @action(detail=True, methods=['get'])
+    @conditional_get('get_course_tree_freshness')
     def modules(self, request, slug=None):
         """Get course modules with lessons"""
         course = self.get_object()
         modules = course.modules.all()
-        serializer = ModuleSerializer(modules, many=True, context={'request': request})
+        if use_fast_serializers(request):
+            fast = FastModuleSerializer(self.get_serializer_context())
+            return Response(fast.serialize(fast.values(modules)))
+        context = self.get_progress_context('lessons.progress', lesson__module__course=course)
+        serializer = ModuleSerializer(modules, many=True, context=context)
         return Response(serializer.data)
     
     @action(detail=True, methods=['get'])
@@ -149,7 +383,9 @@ class CourseViewSet(viewsets.ModelViewSet):
                           status=status.HTTP_401_UNAUTHORIZED)
         
         try:
-            enrollment = Enrollment.objects.get(student=user, course=course)
+            enrollment = Enrollment.objects.select_related(
+                'student', 'course__instructor', 'course__category'
+            ).get(student=user, course=course)
             serializer = EnrollmentSerializer(enrollment, context={'request': request})
             return Response(serializer.data)
         except Enrollment.DoesNotExist:
@@ -157,18 +393,57 @@ class CourseViewSet(viewsets.ModelViewSet):
                           status=status.HTTP_404_NOT_FOUND)
 
 
-class ModuleViewSet(viewsets.ReadOnlyModelViewSet):
+class ModuleViewSet(LessonProgressContextMixin, FastListMixin, viewsets.ReadOnlyModelViewSet):
     """ViewSet for modules (read-only)"""
     queryset = Module.objects.all()
     serializer_class = ModuleSerializer
+    fast_serializer_class = FastModuleSerializer
     
     def get_queryset(self):
-        return Module.objects.select_related('course').prefetch_related('lessons')
+        return shape_queryset(Module.objects.select_related('course'), ModuleSerializer, self.request)
+    
+    def get_module_freshness(self):
+        modules = self.get_queryset()
+        if self.action != 'list':
+            modules = modules.filter(pk=self.kwargs['pk'])
+        module = OuterRef('pk')
+        quizzes = Quiz.objects.filter(lesson__module=module)
+        return [modules.aggregate(
+            modules=Max('updated_at'),
+            module_count=Count('pk'),
+            lessons=Max(latest(Lesson.objects.filter(module=module), 'module', 'updated_at')),
+            lesson_count=Sum('lesson_count'),
+            quizzes=Max(latest(quizzes, 'lesson__module', 'updated_at')),
+            quiz_versions=Sum(total(quizzes, 'lesson__module', 'version')),
+            **progress_aggregates(self.request.user, 'lesson__module'),
+        )]
+    
+    @conditional_get('get_module_freshness')
+    def list(self, request, *args, **kwargs):
+        fast = self.get_fast_serializer()
+        if fast is not None:
+            return self.fast_list(fast)
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        modules = page if page is not None else list(queryset)
+        context = self.get_progress_context('lessons.progress', lesson__module__in=modules)
+        serializer = ModuleSerializer(modules, many=True, context=context)
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
+    
+    @conditional_get('get_module_freshness')
+    def retrieve(self, request, *args, **kwargs):
+        module = self.get_object()
+        context = self.get_progress_context('lessons.progress', lesson__module=module)
+        serializer = ModuleSerializer(module, context=context)
+        return Response(serializer.data)
 
 
-class LessonViewSet(viewsets.ModelViewSet):
+class LessonViewSet(FastListMixin, viewsets.ModelViewSet):
     """ViewSet for lessons"""
     queryset = Lesson.objects.all()
+    fast_serializer_class = FastLessonSerializer
     
     def get_serializer_class(self):
         if self.action in ['create', 'update', 'partial_update']:
@@ -176,7 +451,10 @@ class LessonViewSet(viewsets.ModelViewSet):
         return LessonSerializer
     
     def get_queryset(self):
-        return Lesson.objects.select_related('module__course').prefetch_related('quiz__questions__options')
+        queryset = Lesson.objects.select_related('module__course')
+        if self.action in ['list', 'retrieve']:
+            queryset = shape_queryset(queryset, LessonSerializer, self.request)
+        return queryset
     
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
@@ -185,6 +463,26 @@ class LessonViewSet(viewsets.ModelViewSet):
             permission_classes = [permissions.AllowAny]
         return [permission() for permission in permission_classes]
     
+    def get_lesson_freshness(self):
+        lessons = self.get_queryset()
+        if self.action != 'list':
+            lessons = lessons.filter(pk=self.kwargs['pk'])
+        return [lessons.aggregate(
+            lessons=Max('updated_at'),
+            lesson_count=Count('pk'),
+            quizzes=Max('quiz__updated_at'),
+            quiz_versions=Sum('quiz__version'),
+            **progress_aggregates(self.request.user, 'lesson'),
+        )]
+    
+    @conditional_get('get_lesson_freshness')
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+    
+    @conditional_get('get_lesson_freshness')
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+    
     @action(detail=True, methods=['post'])
     def complete(self, request, pk=None):
         """Mark lesson as completed"""
@@ -195,25 +493,35 @@ class LessonViewSet(viewsets.ModelViewSet):
             return Response({'error': 'Authentication required'}, 
                           status=status.HTTP_401_UNAUTHORIZED)
         
-        # Check if user is enrolled in the course
         course = lesson.module.course
-        try:
-            enrollment = Enrollment.objects.get(student=user, course=course)
-        except Enrollment.DoesNotExist:
-            return Response({'error': 'Not enrolled in this course'}, 
-                          status=status.HTTP_403_FORBIDDEN)
-        
-        # Update or create progress
-        progress, created = LessonProgress.objects.get_or_create(
-            student=user,
-            lesson=lesson,
-            defaults={'is_completed': True, 'completed_at': timezone.now()}
-        )
-        
-        if not created:
-            progress.is_completed = True
-            progress.completed_at = timezone.now()
-            progress.save()
+        with transaction.atomic():
+            # Check if user is enrolled in the course; the row lock serializes
+            # concurrent completions so the stored counter cannot drift
+            try:
+                enrollment = Enrollment.objects.select_for_update().get(student=user, course=course)
+            except Enrollment.DoesNotExist:
+                return Response({'error': 'Not enrolled in this course'}, 
+                              status=status.HTTP_403_FORBIDDEN)
+            
+            # Update or create progress
+            progress, created = LessonProgress.objects.get_or_create(
+                student=user,
+                lesson=lesson,
+                defaults={'is_completed': True, 'completed_at': timezone.now()}
+            )
+            newly_completed = created or not progress.is_completed
+            
+            if not created:
+                progress.is_completed = True
+                progress.completed_at = timezone.now()
+                progress.save()
+            
+            if newly_completed:
+                enrollment.set_progress(enrollment.completed_lessons + 1, course.lesson_count)
+                enrollment.save(update_fields=[
+                    'completed_lessons', 'progress_percentage', 'is_completed', 'completed_at'
+                ])
+                record_lesson_completed(user.pk, course.pk, lesson.pk)
         
         serializer = LessonProgressSerializer(progress)
         return Response(serializer.data)
@@ -223,34 +531,118 @@ class LessonViewSet(viewsets.ModelViewSet):
         """Track time spent on lesson"""
         lesson = self.get_object()
         user = request.user
-        time_spent = request.data.get('time_spent_minutes', 0)
         
         if not user.is_authenticated:
             return Response({'error': 'Authentication required'}, 
                           status=status.HTTP_401_UNAUTHORIZED)
         
-        progress, created = LessonProgress.objects.get_or_create(
-            student=user,
-            lesson=lesson,
-            defaults={'time_spent_minutes': time_spent}
-        )
+        try:
+            time_spent = int(request.data.get('time_spent_minutes', 0))
+        except (TypeError, ValueError):
+            time_spent = -1
+        if time_spent < 0:
+            return Response({'error': 'time_spent_minutes must be a non-negative integer'}, 
+                          status=status.HTTP_400_BAD_REQUEST)
+        
+        # Database-side increment (or the coalescing buffer), never read-modify-write
+        time_tracking.track_time(user.pk, lesson.pk, lesson.module.course_id, time_spent)
         
-        if not created:
-            progress.time_spent_minutes += time_spent
-            progress.save()
+        progress = LessonProgress.objects.filter(student=user, lesson=lesson).first()
+        if progress is None:
+            progress = LessonProgress(student=user, lesson=lesson)
+        if time_tracking.is_buffered():
+            progress.time_spent_minutes += time_tracking.buffer.pending(
+                user.pk, lesson.pk, lesson.module.course_id
+            )
         
         serializer = LessonProgressSerializer(progress)
         return Response(serializer.data)
 
 
-class EnrollmentViewSet(viewsets.ReadOnlyModelViewSet):
+class EnrollmentViewSet(FastListMixin, viewsets.ReadOnlyModelViewSet):
     """ViewSet for enrollments (read-only for students)"""
     serializer_class = EnrollmentSerializer
+    fast_serializer_class = FastEnrollmentSerializer
+    cursor_ordering = ('-enrolled_at', '-id')
     
     def get_queryset(self):
         if self.request.user.is_authenticated:
-            return Enrollment.objects.filter(student=self.request.user).select_related('course', 'student')
+            return shape_queryset(
+                Enrollment.objects.filter(student=self.request.user), EnrollmentSerializer, self.request
+            )
         return Enrollment.objects.none()
+    
+    def perform_content_negotiation(self, request, force=False):
+        # The certificate is a PDF whatever the Accept header says; errors are still JSON
+        return super().perform_content_negotiation(request, force=force or self.action == 'certificate')
+    
+    @action(detail=True, methods=['get'])
+    def certificate(self, request, pk=None):
+        """The completion certificate (or ``?kind=wallet-card``) PDF, rendered once and then served from disk"""
+        enrollment = get_object_or_404(
+            Enrollment.objects.select_related('student', 'course__instructor'),
+            pk=pk, student=request.user,
+        )
+        kind = request.query_params.get('kind', 'certificate')
+        try:
+            path = get_certificate(enrollment, kind)
+        except CertificateError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        # The file name is the hash of what the certificate shows
+        etag = f'"{kind}-{path.stem}"'
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = FileResponse(
+                open(path, 'rb'), content_type='application/pdf',
+                filename=f'{enrollment.course.slug}-{kind}.pdf',
+            )
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, max-age=3600'
+        return response
+    
+    def get_list_param(self, name):
+        """A list from JSON, repeated form fields or a comma/newline separated string"""
+        data = self.request.data
+        values = data.getlist(name) if hasattr(data, 'getlist') else data.get(name) or []
+        if isinstance(values, (str, int)):
+            values = [values]
+        items = []
+        for value in values:
+            if isinstance(value, str):
+                items.extend(part.strip() for part in value.replace('\n', ',').split(','))
+            else:
+                items.append(value)
+        return [item for item in items if item != '']
+    
+    @action(detail=False, methods=['post'], parser_classes=[JSONParser, MultiPartParser, FormParser])
+    def bulk(self, request):
+        """Enroll a cohort (emails or user ids, or a CSV file) in one or more courses"""
+        courses, errors = get_cohort_courses(self.get_list_param('courses'))
+        if errors or not courses:
+            return Response({'error': 'Invalid courses', 'courses': errors or 'No courses given'},
+                          status=status.HTTP_400_BAD_REQUEST)
+        
+        # Staff may enroll anyone; instructors only in their own courses
+        if not request.user.is_staff and any(course.instructor_id != request.user.pk for course in courses):
+            return Response({'error': 'Only staff or the course instructor can enroll cohorts'},
+                          status=status.HTTP_403_FORBIDDEN)
+        
+        students = self.get_list_param('students')
+        upload = request.FILES.get('file')
+        if upload is not None:
+            try:
+                students += read_identifiers_csv(upload.read().decode('utf-8-sig'))
+            except UnicodeDecodeError:
+                return Response({'error': 'CSV file must be UTF-8 encoded'},
+                              status=status.HTTP_400_BAD_REQUEST)
+        if not students:
+            return Response({'error': 'No students given'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(students) > MAX_API_ROWS:
+            return Response({'error': f'At most {MAX_API_ROWS} students per request'},
+                          status=status.HTTP_400_BAD_REQUEST)
+        
+        summary = bulk_enroll(students, courses)
+        return Response(summary, status=status.HTTP_201_CREATED if summary['totals']['enrollments_created'] else status.HTTP_200_OK)
 
 
 class QuizViewSet(viewsets.ModelViewSet):
@@ -263,7 +655,10 @@ class QuizViewSet(viewsets.ModelViewSet):
         return QuizSerializer
     
     def get_queryset(self):
-        return Quiz.objects.select_related('lesson').prefetch_related('questions__options')
+        if self.action in ['submit', 'item_analysis']:
+            # Grading works from the compiled answer key, not the question tree
+            return Quiz.objects.select_related('lesson__module__course')
+        return shape_queryset(Quiz.objects.select_related('lesson'), QuizSerializer, self.request)
     
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
@@ -283,75 +678,101 @@ class QuizViewSet(viewsets.ModelViewSet):
                           status=status.HTTP_401_UNAUTHORIZED)
         
         # Check if user is enrolled in the course
-        course = quiz.lesson.module.course
+        course_id = quiz.lesson.module.course_id
         try:
-            enrollment = Enrollment.objects.get(student=user, course=course)
+            enrollment = Enrollment.objects.get(student=user, course_id=course_id)
         except Enrollment.DoesNotExist:
             return Response({'error': 'Not enrolled in this course'}, 
                           status=status.HTTP_403_FORBIDDEN)
         
-        # Check attempt limit
-        attempts = QuizAttempt.objects.filter(student=user, quiz=quiz)
-        if attempts.count() >= quiz.max_attempts:
-            return Response({'error': 'Maximum attempts reached'}, 
+        answers = request.data.get('answers', []) if isinstance(request.data, dict) else None
+        if not isinstance(answers, list):
+            return Response({'error': 'answers must be a list'},
                           status=status.HTTP_400_BAD_REQUEST)
-        
+
         # Calculate score
-        answers = request.data.get('answers', [])
-        correct_answers = 0
-        total_questions = quiz.questions.count()
-        
-        for answer in answers:
-            question_id = answer.get('question_id')
-            selected_option_id = answer.get('option_id')
-            
-            try:
-                question = QuizQuestion.objects.get(id=question_id, quiz=quiz)
-                if question.question_type == 'multiple_choice':
-                    correct_option = question.options.filter(is_correct=True).first()
-                    if correct_option and str(correct_option.id) == str(selected_option_id):
-                        correct_answers += 1
-                elif question.question_type == 'true_false':
-                    # Handle true/false logic here
-                    pass
-            except QuizQuestion.DoesNotExist:
-                continue
-        
-        score = round((correct_answers / total_questions) * 100) if total_questions > 0 else 0
+        answer_key = get_answer_key(quiz)
+        result = grade_answers(answer_key, answers)
+        score = result.score
         passed = score >= quiz.passing_score
+        layout_id = get_response_layout(quiz, answer_key)
         
-        # Create attempt
-        attempt = QuizAttempt.objects.create(
-            student=user,
-            quiz=quiz,
-            score=score,
-            passed=passed,
-            completed_at=timezone.now()
-        )
+        with transaction.atomic():
+            # Check attempt limit; the row lock on the summary serializes
+            # concurrent submits so a double submit cannot exceed it
+            QuizAttemptSummary.objects.get_or_create(student=user, quiz=quiz)
+            summary = QuizAttemptSummary.objects.select_for_update().get(student=user, quiz=quiz)
+            if summary.attempts >= quiz.max_attempts:
+                return Response({'error': 'Maximum attempts reached'}, 
+                              status=status.HTTP_400_BAD_REQUEST)
+            
+            # Create attempt, keeping the answers for item analysis
+            attempt = QuizAttempt.objects.create(
+                student=user,
+                quiz=quiz,
+                score=score,
+                passed=passed,
+                completed_at=timezone.now(),
+                layout_id=layout_id,
+                responses=pack_responses(answer_key, answers),
+            )
+            summary.add_attempt(attempt)
+            summary.save(update_fields=['attempts', 'best_score', 'passed', 'last_attempt_at'])
+        record_quiz_submitted(user.pk, course_id, quiz.lesson_id, score, passed)
         
         serializer = QuizAttemptSerializer(attempt)
         return Response(serializer.data)
+    
+    @action(detail=True, methods=['get', 'post'], url_path='item-analysis')
+    def item_analysis(self, request, pk=None):
+        """The stored per-question item analysis; POST queues a fresh one (instructor/staff)"""
+        quiz = self.get_object()
+        if quiz.lesson.module.course.instructor_id != request.user.pk and not request.user.is_staff:
+            return Response({'error': 'Only the course instructor or staff can view item analysis'}, 
+                          status=status.HTTP_403_FORBIDDEN)
+        if request.method == 'POST':
+            job = enqueue('quizzes.item_analysis', {'quiz_id': quiz.pk}, created_by=request.user)
+            return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+        analysis = QuizItemAnalysis.objects.filter(quiz=quiz).first()
+        if analysis is None:
+            return Response({'quiz': quiz.pk, 'analyzed_at': None, 'attempts': 0, 'questions': []})
+        return Response({'quiz': quiz.pk, 'analyzed_at': analysis.analyzed_at, **analysis.results})
 
 
 class QuizAttemptViewSet(viewsets.ReadOnlyModelViewSet):
     """ViewSet for quiz attempts (read-only for students)"""
     serializer_class = QuizAttemptSerializer
+    cursor_ordering = ('-started_at', '-id')
     
     def get_queryset(self):
         if self.request.user.is_authenticated:
-            return QuizAttempt.objects.filter(student=self.request.user).select_related('quiz', 'student')
+            return shape_queryset(
+                QuizAttempt.objects.filter(student=self.request.user), QuizAttemptSerializer, self.request
+            )
         return QuizAttempt.objects.none()
+    
+    @action(detail=False, methods=['get'])
+    def summary(self, request):
+        """Attempts used, attempts remaining, best score and pass status per quiz (``?quiz=`` for one)"""
+        summaries = QuizAttemptSummary.objects.filter(student=request.user).select_related('quiz')
+        quiz = request.query_params.get('quiz')
+        if quiz:
+            if not quiz.isdigit():
+                return Response({'error': 'quiz must be a quiz id'}, status=status.HTTP_400_BAD_REQUEST)
+            summaries = summaries.filter(quiz_id=quiz)
+        return Response(QuizAttemptSummarySerializer(summaries.order_by('quiz_id'), many=True).data)
 
 
 class UserProfileViewSet(viewsets.ModelViewSet):
     """ViewSet for user profiles"""
     serializer_class = UserProfileSerializer
     parser_classes = [MultiPartParser, FormParser]
+    cursor_ordering = ('-created_at', '-id')
     
     def get_queryset(self):
         if self.request.user.is_authenticated:
             if self.request.user.is_staff:
-                return UserProfile.objects.all()
+                return shape_queryset(UserProfile.objects.all(), UserProfileSerializer, self.request)
             return UserProfile.objects.filter(user=self.request.user)
         return UserProfile.objects.none()
     
@@ -372,6 +793,145 @@ class UserProfileViewSet(viewsets.ModelViewSet):
         serializer.save()
 
 
+class ProgressBatchView(APIView):
+    """Apply an ordered batch of lesson completion and time events (offline sync)"""
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def post(self, request):
+        events = request.data.get('events') if isinstance(request.data, dict) else request.data
+        if not isinstance(events, list) or not events:
+            return Response({'error': 'events must be a non-empty list'}, 
+                          status=status.HTTP_400_BAD_REQUEST)
+        if len(events) > MAX_EVENTS:
+            return Response({'error': f'At most {MAX_EVENTS} events per batch'}, 
+                          status=status.HTTP_400_BAD_REQUEST)
+        
+        results, progress = apply_progress_events(request.user, events)
+        return Response({
+            'results': results,
+            'progress': LessonProgressSerializer(progress, many=True).data,
+        })
+
+
+class TagFacetView(APIView):
+    """
+    Tag facet counts for the courses matching the catalog filters of
+    ``/api/courses/``; a route of its own, so no course slug is shadowed
+    """
+    permission_classes = [permissions.AllowAny]
+    
+    def get(self, request):
+        facets = tag_facets(filter_catalog(request, Course.objects.all()))
+        return Response([
+            {'slug': row['tag__slug'], 'name': row['tag__name'], 'course_count': row['course_count']}
+            for row in facets
+        ])
+
+
+class CacheStatsView(APIView):
+    """Hit/miss counters of the server-side caches (staff only)"""
+    permission_classes = [permissions.IsAdminUser]
+    
+    def get(self, request):
+        return Response({
+            'catalog_responses': get_response_cache_stats(),
+            # Per worker process
+            'authentication': auth_cache.stats.get_stats(),
+            'sessions': session_stats.get_stats(),
+            'time_tracking_buffer': time_tracking.buffer.get_stats(),
+        })
+
+
+class ExportView(APIView):
+    """
+    Stream the enrollments, lesson progress or quiz attempts as CSV or NDJSON
+    (staff only). Filters: ``course`` slugs, ``from`` / ``to`` dates and
+    ``user`` emails or ids, as query parameters or, for long user lists, in
+    a POST body (optionally with a CSV ``file`` of users).
+    """
+    permission_classes = [permissions.IsAdminUser]
+    
+    def perform_content_negotiation(self, request, force=False):
+        # The export sets its own content type; errors are still JSON
+        return super().perform_content_negotiation(request, force=True)
+    
+    def get_list(self, data, name):
+        if hasattr(data, 'getlist'):
+            return data.getlist(name)
+        values = data.get(name) or []
+        return values if isinstance(values, list) else [values]
+    
+    def export(self, request, data, kind, extension):
+        users = self.get_list(data, 'user')
+        upload = request.FILES.get('file') if request.method == 'POST' else None
+        if upload is not None:
+            try:
+                users += read_identifiers_csv(upload.read().decode('utf-8-sig'))
+            except UnicodeDecodeError:
+                return Response({'error': 'CSV file must be UTF-8 encoded'},
+                              status=status.HTTP_400_BAD_REQUEST)
+        filters = {
+            'courses': self.get_list(data, 'course'),
+            'date_from': data.get('from'),
+            'date_to': data.get('to'),
+            'users': users,
+        }
+        try:
+            chunks = export_chunks(kind, extension, **filters)
+        except ExportError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if str(data.get('background', '')).lower() in ('1', 'true'):
+            # Validated above; a worker writes the file, fetched from the job once it succeeds
+            job = enqueue('exports.write', {'kind': kind, 'export_format': extension, **filters},
+                          created_by=request.user)
+            return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+        return streaming_export_response(request._request, kind, extension, chunks)
+    
+    def get(self, request, kind, extension):
+        return self.export(request, request.query_params, kind, extension)
+    
+    def post(self, request, kind, extension):
+        return self.export(request, request.data, kind, extension)
+
+
+class JobViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Background jobs (staff only): queue a registered task with POST
+    ``{"task": ..., "payload": {...}}``, then poll the job for its result.
+    """
+    serializer_class = JobSerializer
+    permission_classes = [permissions.IsAdminUser]
+    queryset = Job.objects.all()
+    
+    def perform_content_negotiation(self, request, force=False):
+        # Downloads are CSV/NDJSON files whatever the Accept header says
+        return super().perform_content_negotiation(request, force=force or self.action == 'download')
+    
+    def create(self, request):
+        data = request.data if isinstance(request.data, dict) else {}
+        try:
+            delay = max(int(data.get('delay', 0)), 0)
+            job = enqueue(data.get('task'), data.get('payload'), delay=delay, created_by=request.user)
+        except (TypeError, ValueError) as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.get_serializer(job).data, status=status.HTTP_202_ACCEPTED)
+    
+    @action(detail=False, methods=['get'])
+    def stats(self, request):
+        """Job counts per status and task, the oldest due job's age and average run times"""
+        return Response(queue_stats())
+    
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        """The file written by a succeeded export job"""
+        job = self.get_object()
+        name = (job.result or {}).get('file') if job.status == Job.SUCCEEDED else None
+        path = get_export_root() / Path(name).name if name else None
+        if path is None or not path.is_file():
+            return Response({'error': 'This job has no file to download'}, status=status.HTTP_404_NOT_FOUND)
+        return FileResponse(open(path, 'rb'), as_attachment=True, filename=name)
+
+
 # Authentication Views
 class LoginView(APIView):
     """Custom login view that accepts email and password"""
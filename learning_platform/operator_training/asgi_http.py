@@ -0,0 +1,19 @@
+"""
+HTTP protocol for running the ASGI app under uvicorn with several workers.
+
+uvicorn's multi-worker supervisor binds its socket without a protocol
+number, so asyncio never sets TCP_NODELAY on the accepted connections and
+every keep-alive response body waits ~40 ms on the client's delayed ACK.
+Pass ``--http operator_training.asgi_http:H11Protocol`` to uvicorn.
+"""
+import socket
+
+from uvicorn.protocols.http.h11_impl import H11Protocol as BaseH11Protocol
+
+
+class H11Protocol(BaseH11Protocol):
+    def connection_made(self, transport):
+        sock = transport.get_extra_info('socket')
+        if sock is not None and sock.family in (socket.AF_INET, socket.AF_INET6):
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        super().connection_made(transport)
@@ -55,7 +55,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    # WhiteNoise with async support, see core.middleware
+    'core.middleware.WhiteNoiseMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -98,7 +99,8 @@ if DATABASE_URL:
     DATABASES = {
         'default': dj_database_url.config(
             default=DATABASE_URL,
-            conn_max_age=600
+            # Set DB_CONN_MAX_AGE=0 when serving through ASGI (persistent connections are per thread)
+            conn_max_age=int(os.getenv('DB_CONN_MAX_AGE', '600'))
         )
     }
 else:
@@ -111,6 +113,66 @@ else:
     }
 
 
+# Cache
+# Local memory by default; point CACHE_BACKEND/CACHE_LOCATION at a file
+# directory or a shared server to share cached data between workers
+# (Redis or memcached also enables the authentication and session caches)
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'operator-training'),
+    }
+}
+
+# Seconds anonymous catalog responses stay in the response cache
+CATALOG_CACHE_TIMEOUT = int(os.getenv('CATALOG_CACHE_TIMEOUT', '300'))
+
+
+# Authentication and session lookups are served from the cache (core.authentication)
+# only when the cache is shared by every process: revocations must reach all workers
+SHARED_CACHE_BACKENDS = {
+    'django.core.cache.backends.redis.RedisCache',
+    'django.core.cache.backends.memcached.PyMemcacheCache',
+    'django.core.cache.backends.memcached.PyLibMCCache',
+}
+AUTH_CACHE_ENABLED = CACHES['default']['BACKEND'] in SHARED_CACHE_BACKENDS
+if AUTH_CACHE_ENABLED:
+    AUTHENTICATION_BACKENDS = ['core.authentication.CachedModelBackend']
+    SESSION_ENGINE = 'core.sessions'
+    TOKEN_AUTHENTICATION_CLASS = 'core.authentication.CachedTokenAuthentication'
+else:
+    AUTHENTICATION_BACKENDS = ['django.contrib.auth.backends.ModelBackend']
+    SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+    TOKEN_AUTHENTICATION_CLASS = 'rest_framework.authentication.TokenAuthentication'
+
+# Size of the in-process auth cache and seconds entries live in either tier
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv('AUTH_CACHE_MAX_ENTRIES', '1024'))
+AUTH_CACHE_TIMEOUT = int(os.getenv('AUTH_CACHE_TIMEOUT', '300'))
+
+
+# Sum lesson time heartbeats in memory and write them in bulk (core.time_tracking)
+TIME_TRACKING_BUFFERED = os.getenv('TIME_TRACKING_BUFFERED', 'False').lower() == 'true'
+TIME_TRACKING_FLUSH_SECONDS = int(os.getenv('TIME_TRACKING_FLUSH_SECONDS', '10'))
+TIME_TRACKING_MAX_PENDING = int(os.getenv('TIME_TRACKING_MAX_PENDING', '500'))
+
+
+# Serve the hottest read endpoints with native async views (core.async_views);
+# only useful when running under an ASGI server
+ASYNC_READ_ENDPOINTS = os.getenv('ASYNC_READ_ENDPOINTS', 'False').lower() == 'true'
+# Concurrent async reads per worker (bounds DB connections), and seconds a request may queue
+ASYNC_READ_CONCURRENCY = int(os.getenv('ASYNC_READ_CONCURRENCY', '8'))
+ASYNC_READ_QUEUE_TIMEOUT = float(os.getenv('ASYNC_READ_QUEUE_TIMEOUT', '10'))
+
+
+# Render course, module, lesson and enrollment lists from .values() rows
+# (core.fast_serializers); False falls back to the DRF serializers
+FAST_SERIALIZERS = os.getenv('FAST_SERIALIZERS', 'True').lower() == 'true'
+
+
+# Files written by background export jobs (core.tasks), kept outside MEDIA_ROOT
+EXPORT_ROOT = os.getenv('EXPORT_ROOT', str(BASE_DIR / 'exports'))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -162,12 +224,23 @@ CORS_ALLOW_ALL_ORIGINS = os.getenv('CORS_ALLOW_ALL_ORIGINS', 'True').lower() ==
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.SessionAuthentication',
-        'rest_framework.authentication.TokenAuthentication',
+        TOKEN_AUTHENTICATION_CLASS,
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    # JSON through orjson when installed, stdlib otherwise (core.renderers, core.parsers)
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.JSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.parsers.JSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    # Page numbers by default; ?pagination=cursor opts into keyset pages where supported
+    'DEFAULT_PAGINATION_CLASS': 'core.pagination.OptionalCursorPagination',
     'PAGE_SIZE': 20,
 }
 